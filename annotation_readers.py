@@ -0,0 +1,242 @@
+"""
+Readers of COCO json and YOLO txt annotations into the `xml_to_csv` columns
+(filename, width, height, class, xmin, ymin, xmax, ymax, in pixels).
+
+Every format goes through `xml_to_csv.read_chunks`, so all of them are read
+on the same process pool and give the same table to `generate_tfrecord`.
+"""
+import io
+import os
+import glob
+import json
+import array
+import functools
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from image_size import get_image_size_from_file
+from validate_labels import column_name
+from xml_to_csv import DEFAULT_PARSER, parse_xml_chunk, read_chunks
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.JPG', '.JPEG', '.PNG')
+YOLO_CLASS_NAMES = 'classes.txt'
+
+_WHITESPACE = ' \t\n\r'
+_DECODER = json.JSONDecoder()
+
+
+class _JSONStream(object):
+    """Text buffer over a file that decodes one JSON value at a time."""
+
+    def __init__(self, fid, read_size):
+        self.fid = fid
+        self.read_size = read_size
+        self.buffer = ''
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self):
+        data = self.fid.read(self.read_size)
+        if not data:
+            self.eof = True
+            return False
+        self.buffer = self.buffer[self.pos:] + data
+        self.pos = 0
+        return True
+
+    def peek(self):
+        """Return the next non-whitespace character, or '' at the end of the file."""
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self._fill():
+                return ''
+
+    def expect(self, chars):
+        char = self.peek()
+        if not char or char not in chars:
+            raise ValueError('Expected one of {!r} in json, found {!r}'.format(chars, char))
+        self.pos += 1
+        return char
+
+    def value(self):
+        self.peek()
+        while True:
+            try:
+                value, end = _DECODER.raw_decode(self.buffer, self.pos)
+            except ValueError:
+                if not self._fill():
+                    raise
+                continue
+            # A number at the end of the buffer may go on in the next read.
+            if end == len(self.buffer) and not self.eof and self._fill():
+                continue
+            self.pos = end
+            return value
+
+
+def iter_json_members(fid, read_size=1 << 20):
+    """Yield (key, value) for every member of the top-level json object read from `fid`.
+
+    Array members are yielded once per element, so only one element is in
+    memory at a time.
+    """
+    stream = _JSONStream(fid, read_size)
+    stream.expect('{')
+    if stream.peek() == '}':
+        return
+    while True:
+        key = stream.value()
+        stream.expect(':')
+        if stream.peek() == '[':
+            stream.pos += 1
+            if stream.peek() == ']':
+                stream.pos += 1
+            else:
+                while True:
+                    yield key, stream.value()
+                    if stream.expect(',]') == ']':
+                        break
+        else:
+            yield key, stream.value()
+        if stream.expect(',}') == '}':
+            return
+
+
+def _box_columns(filenames, widths, heights, classes, boxes):
+    """Return the `column_name` lists from per-box arrays; boxes are rounded to pixels."""
+    boxes = np.rint(boxes).astype(np.int64)
+    return [list(filenames), np.asarray(widths).tolist(), np.asarray(heights).tolist(), list(classes),
+            boxes[:, 0].tolist(), boxes[:, 1].tolist(), boxes[:, 2].tolist(), boxes[:, 3].tolist()]
+
+
+def read_coco(json_file):
+    """Return the columns of the boxes of one COCO instances file, in annotation order.
+
+    The file is streamed; annotations are kept as compact numeric arrays until
+    their images and categories are resolved at the end.
+    """
+    image_keys, image_rows = [], []
+    categories = {}
+    image_ids = array.array('q')
+    category_ids = array.array('q')
+    bboxes = array.array('d')
+    with io.open(json_file, encoding='utf8') as fid:
+        for key, item in iter_json_members(fid):
+            if key == 'annotations':
+                image_ids.append(item['image_id'])
+                category_ids.append(item['category_id'])
+                bboxes.extend(item['bbox'])
+            elif key == 'images':
+                image_keys.append(item['id'])
+                image_rows.append((item['file_name'], item['width'], item['height']))
+            elif key == 'categories':
+                categories[item['id']] = item['name']
+
+    image_index = pd.Index(image_keys).get_indexer(np.frombuffer(image_ids, dtype=np.int64))
+    if (image_index < 0).any():
+        raise ValueError('{}: annotations refer to unknown image ids'.format(json_file))
+    unknown = set(category_ids) - set(categories)
+    if unknown:
+        raise ValueError('{}: unknown category ids {}'.format(json_file, ', '.join(map(str, sorted(unknown)))))
+    image_columns = zip(*image_rows) if image_rows else ([], [], [])
+    filenames, widths, heights = (np.asarray(column, dtype=object)[image_index] for column in image_columns)
+    x, y, w, h = np.frombuffer(bboxes, dtype=np.float64).reshape(-1, 4).T
+    return _box_columns(filenames, widths, heights, [categories[category] for category in category_ids],
+                        np.stack([x, y, x + w, y + h], axis=1))
+
+
+def find_image(image_dir, stem):
+    for extension in IMAGE_EXTENSIONS:
+        image_path = os.path.join(image_dir, stem + extension)
+        if os.path.isfile(image_path):
+            return image_path
+    raise IOError('No image for {} in {}'.format(stem, image_dir))
+
+
+def read_yolo(txt_file, image_dir, class_names):
+    """Return the columns of the boxes of one YOLO txt file.
+
+    Lines hold `class_index x_center y_center width height`, normalized to
+    the image, whose size is read from the header of the image of the same
+    name in `image_dir`.
+    """
+    with open(txt_file) as fid:
+        values = [line.split()[:5] for line in fid if line.strip()]
+    image_path = find_image(image_dir, os.path.splitext(os.path.basename(txt_file))[0])
+    if not values:
+        return [[] for _ in column_name]
+    width, height = get_image_size_from_file(image_path)
+    values = np.asarray(values, dtype=np.float64)
+    class_index = values[:, 0].astype(np.int64)
+    if (class_index < 0).any() or (class_index >= len(class_names)).any():
+        raise ValueError('{}: class index out of range of the {} class names'.format(txt_file, len(class_names)))
+    center_x, center_y = values[:, 1] * width, values[:, 2] * height
+    half_width, half_height = values[:, 3] * width / 2, values[:, 4] * height / 2
+    num_boxes = len(values)
+    return _box_columns([os.path.basename(image_path)] * num_boxes, [width] * num_boxes, [height] * num_boxes,
+                        [class_names[index] for index in class_index],
+                        np.stack([center_x - half_width, center_y - half_height,
+                                  center_x + half_width, center_y + half_height], axis=1))
+
+
+def _concat_chunk(read_one, sources):
+    columns = [[] for _ in column_name]
+    for source in sources:
+        for column, values in zip(columns, read_one(source)):
+            column.extend(values)
+    return columns
+
+
+def read_coco_chunk(json_files):
+    return _concat_chunk(read_coco, json_files)
+
+
+def read_yolo_chunk(txt_files, image_dir, class_names):
+    return _concat_chunk(functools.partial(read_yolo, image_dir=image_dir, class_names=class_names), txt_files)
+
+
+def load_class_names(path):
+    with open(path) as fid:
+        return [line.strip() for line in fid if line.strip()]
+
+
+def voc_reader(path, chunk_size, parser=DEFAULT_PARSER, **_):
+    return glob.glob(path + '/*.xml'), functools.partial(parse_xml_chunk, parser=parser), chunk_size
+
+
+def coco_reader(path, chunk_size, **_):
+    # A json file can only be streamed by one process, so each file is a task of its own.
+    json_files = [path] if os.path.isfile(path) else sorted(glob.glob(os.path.join(path, '*.json')))
+    return json_files, read_coco_chunk, 1
+
+
+def yolo_reader(path, chunk_size, image_dir=None, class_names_path=None, **_):
+    class_names_path = class_names_path or os.path.join(path, YOLO_CLASS_NAMES)
+    txt_files = sorted(txt_file for txt_file in glob.glob(os.path.join(path, '*.txt'))
+                       if os.path.abspath(txt_file) != os.path.abspath(class_names_path))
+    read_chunk = functools.partial(read_yolo_chunk, image_dir=image_dir or path,
+                                   class_names=load_class_names(class_names_path))
+    return txt_files, read_chunk, chunk_size
+
+
+# Each reader returns (sources, read_chunk, chunk_size) for `read_chunks`.
+READERS = OrderedDict([
+    ('voc', voc_reader),
+    ('coco', coco_reader),
+    ('yolo', yolo_reader),
+])
+
+
+def read_annotations(path, annotation_format='voc', num_workers=1, chunk_size=256, **options):
+    """Read the annotations at `path` in one of the `READERS` formats into one DataFrame.
+
+    `options` go to the reader: `parser` for voc, `image_dir` and
+    `class_names_path` for yolo.
+    """
+    sources, read_chunk, chunk_size = READERS[annotation_format](path, chunk_size, **options)
+    return read_chunks(sources, read_chunk, num_workers, chunk_size)
@@ -0,0 +1,337 @@
+"""
+Usage:
+  # Box statistics and anchor suggestions for ssd_anchor_generator:
+  python annotation_stats.py --csv_input=data/train_labels.csv
+
+  # Keep the statistics in a json state and only add the images not yet counted:
+  python annotation_stats.py --csv_input=data/train_labels.csv --state_path=data/box_stats.json
+
+Boxes are measured relative to their image, as the detector sees them after
+the fixed shape resize: aspect ratio is normalized width / normalized height,
+and scale is sqrt(normalized width * normalized height), the quantities of
+`ssd_anchor_generator`.
+
+All statistics are counts over fixed bins, so adding a table of new boxes is
+one vectorized pass over those boxes, and the state of two runs can be
+merged. Anchors are clustered with k-means (1 - IoU distance) over the
+weighted cells of a log-spaced (width, height) grid instead of every box.
+"""
+from __future__ import division
+from __future__ import print_function
+
+import os
+import json
+import argparse
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from label_store import LabelStore, is_label_store
+
+STATS_VERSION = 1
+# log2 aspect ratio bins from 1/8 to 8; ratios outside go to the first or last bin.
+ASPECT_EDGES = np.linspace(-3.0, 3.0, 25)
+SCALE_EDGES = np.linspace(0.0, 1.0, 51)
+# log2 normalized width and height, from 1/1024 of the image to all of it.
+GRID_EDGES = np.linspace(-10.0, 0.0, 81)
+DEFAULT_NUM_ANCHORS = 6
+
+
+def _bin_index(values, edges):
+    return np.clip(np.searchsorted(edges, values, side='right') - 1, 0, len(edges) - 2)
+
+
+def box_shapes(df):
+    """Return the normalized (width, height) of the boxes of `df` and a mask of the usable ones."""
+    image_width = df['width'].values.astype(np.float64)
+    image_height = df['height'].values.astype(np.float64)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        width = (df['xmax'].values - df['xmin'].values) / image_width
+        height = (df['ymax'].values - df['ymin'].values) / image_height
+    usable = np.isfinite(width) & np.isfinite(height) & (width > 0) & (height > 0)
+    return np.minimum(width, 1.0), np.minimum(height, 1.0), usable
+
+
+def box_iou(shapes, anchors):
+    """IoU of every (width, height) in `shapes` with every anchor, both centered at the origin."""
+    intersection = (np.minimum(shapes[:, None, 0], anchors[None, :, 0]) *
+                    np.minimum(shapes[:, None, 1], anchors[None, :, 1]))
+    union = (shapes[:, 0] * shapes[:, 1])[:, None] + (anchors[:, 0] * anchors[:, 1])[None, :] - intersection
+    return intersection / union
+
+
+def kmeans_anchors(shapes, weights, num_anchors, seed=0, max_iterations=100):
+    """Cluster weighted (width, height) pairs into `num_anchors` anchors with the 1 - IoU distance.
+
+    Returns the anchors sorted by area and the weighted mean IoU of every
+    shape with its best anchor.
+    """
+    shapes = np.asarray(shapes, dtype=np.float64)
+    weights = np.asarray(weights, dtype=np.float64)
+    num_anchors = min(num_anchors, len(shapes))
+    if num_anchors == 0:
+        return np.zeros((0, 2)), 0.0
+    # k-means++ seeding, weighted by the box count of every shape.
+    random = np.random.RandomState(seed)
+    anchors = [shapes[random.choice(len(shapes), p=weights / weights.sum())]]
+    for _ in range(1, num_anchors):
+        distance = 1 - box_iou(shapes, np.asarray(anchors)).max(axis=1)
+        probability = weights * distance ** 2
+        if probability.sum() <= 0:
+            break
+        anchors.append(shapes[random.choice(len(shapes), p=probability / probability.sum())])
+    anchors = np.asarray(anchors)
+
+    assignment = None
+    for _ in range(max_iterations):
+        new_assignment = box_iou(shapes, anchors).argmax(axis=1)
+        if assignment is not None and (new_assignment == assignment).all():
+            break
+        assignment = new_assignment
+        cluster_weights = np.bincount(assignment, weights=weights, minlength=len(anchors))
+        filled = cluster_weights > 0
+        for axis in range(2):
+            sums = np.bincount(assignment, weights=weights * shapes[:, axis], minlength=len(anchors))
+            anchors[filled, axis] = sums[filled] / cluster_weights[filled]
+    anchors = anchors[np.argsort(anchors[:, 0] * anchors[:, 1])]
+    mean_iou = float(np.average(box_iou(shapes, anchors).max(axis=1), weights=weights))
+    return anchors, mean_iou
+
+
+def histogram_quantiles(counts, edges, quantiles):
+    """Interpolate `quantiles` of the values counted in histogram bins."""
+    counts = np.asarray(counts, dtype=np.float64)
+    total = counts.sum()
+    if total == 0:
+        return [None for _ in quantiles]
+    cumulative = np.concatenate([[0.0], np.cumsum(counts)]) / total
+    return [float(np.interp(quantile, cumulative, edges)) for quantile in quantiles]
+
+
+class AnnotationStats(object):
+    """Mergeable box statistics: per-class aspect and scale histograms, boxes per image and a shape grid."""
+
+    def __init__(self):
+        self.aspect_counts = OrderedDict()
+        self.scale_counts = OrderedDict()
+        self.image_boxes = {}
+        self.shape_grid = np.zeros((len(GRID_EDGES) - 1,) * 2, dtype=np.int64)
+        self.skipped = 0
+
+    @property
+    def num_boxes(self):
+        return int(self.shape_grid.sum())
+
+    def _add_class_counts(self, counts, class_names, values):
+        for class_name, row in zip(class_names, values):
+            if class_name in counts:
+                counts[class_name] += row
+            else:
+                counts[class_name] = row.copy()
+
+    def update(self, df):
+        """Add the boxes of a label table; images already counted are skipped.
+
+        Returns the number of images added. To count changed annotations of
+        an image again, start from a fresh state.
+        """
+        new_images = ~df['filename'].isin(self.image_boxes).values
+        df = df[new_images]
+        if not len(df):
+            return 0
+        num_images = len(self.image_boxes)
+        width, height, usable = box_shapes(df)
+        self.skipped += int((~usable).sum())
+        for filename, count in df['filename'].value_counts().items():
+            self.image_boxes[filename] = int(count)
+        width, height = width[usable], height[usable]
+        codes, class_names = pd.factorize(df['class'].values[usable])
+        num_classes = len(class_names)
+
+        aspect_bins = _bin_index(np.log2(width / height), ASPECT_EDGES)
+        scale_bins = _bin_index(np.sqrt(width * height), SCALE_EDGES)
+        for counts, bins, edges in ((self.aspect_counts, aspect_bins, ASPECT_EDGES),
+                                    (self.scale_counts, scale_bins, SCALE_EDGES)):
+            num_bins = len(edges) - 1
+            per_class = np.bincount(codes * num_bins + bins, minlength=num_classes * num_bins)
+            self._add_class_counts(counts, class_names, per_class.reshape(num_classes, num_bins))
+
+        num_cells = len(GRID_EDGES) - 1
+        cells = _bin_index(np.log2(width), GRID_EDGES) * num_cells + _bin_index(np.log2(height), GRID_EDGES)
+        self.shape_grid += np.bincount(cells, minlength=num_cells * num_cells).reshape(num_cells, num_cells)
+        return len(self.image_boxes) - num_images
+
+    def merge(self, other):
+        """Add the statistics of another state, for images not counted here."""
+        for filename, count in other.image_boxes.items():
+            if filename in self.image_boxes:
+                raise ValueError('{} is counted in both states'.format(filename))
+            self.image_boxes[filename] = count
+        for counts, other_counts in ((self.aspect_counts, other.aspect_counts),
+                                     (self.scale_counts, other.scale_counts)):
+            self._add_class_counts(counts, other_counts.keys(), other_counts.values())
+        self.shape_grid += other.shape_grid
+        self.skipped += other.skipped
+
+    def boxes_per_image(self):
+        """Return the number of images with 0, 1, 2, ... boxes."""
+        return np.bincount(np.fromiter(self.image_boxes.values(), dtype=np.int64, count=len(self.image_boxes)))
+
+    def anchors(self, num_anchors=DEFAULT_NUM_ANCHORS, seed=0):
+        """Return k-means anchors as normalized (width, height) rows and their mean IoU with the boxes."""
+        centers = 2 ** ((GRID_EDGES[:-1] + GRID_EDGES[1:]) / 2)
+        width_bins, height_bins = np.nonzero(self.shape_grid)
+        shapes = np.stack([centers[width_bins], centers[height_bins]], axis=1)
+        return kmeans_anchors(shapes, self.shape_grid[width_bins, height_bins], num_anchors, seed=seed)
+
+    def anchor_suggestion(self, num_anchors=DEFAULT_NUM_ANCHORS, seed=0):
+        """Suggest `ssd_anchor_generator` settings.
+
+        The scales span the 5th to 95th percentile of the box scales, and the
+        aspect ratios are those of the k-means anchors.
+        """
+        anchors, mean_iou = self.anchors(num_anchors, seed)
+        total_scales = sum(self.scale_counts.values()) if self.scale_counts else np.zeros(len(SCALE_EDGES) - 1)
+        min_scale, max_scale = histogram_quantiles(total_scales, SCALE_EDGES, [0.05, 0.95])
+        # Ratios within a quarter octave of each other share one anchor generator ratio.
+        aspect_ratios = sorted(set(round(float(2 ** (np.round(4 * np.log2(width / height)) / 4)), 2)
+                                   for width, height in anchors))
+        return OrderedDict([
+            ('anchors', [OrderedDict([('width', float(width)), ('height', float(height)),
+                                      ('aspect_ratio', float(width / height)),
+                                      ('scale', float(np.sqrt(width * height)))]) for width, height in anchors]),
+            ('mean_iou', mean_iou),
+            ('min_scale', min_scale),
+            ('max_scale', max_scale),
+            ('aspect_ratios', aspect_ratios),
+        ])
+
+    def class_summary(self):
+        summary = OrderedDict()
+        for class_name in sorted(self.aspect_counts):
+            aspect_quantiles = histogram_quantiles(self.aspect_counts[class_name], ASPECT_EDGES, [0.1, 0.5, 0.9])
+            summary[class_name] = OrderedDict([
+                ('boxes', int(self.aspect_counts[class_name].sum())),
+                ('aspect_ratio_p10_p50_p90', [2 ** value for value in aspect_quantiles]),
+                ('scale_p10_p50_p90', histogram_quantiles(self.scale_counts[class_name], SCALE_EDGES,
+                                                          [0.1, 0.5, 0.9])),
+            ])
+        return summary
+
+    def summary(self, num_anchors=DEFAULT_NUM_ANCHORS, seed=0):
+        return OrderedDict([
+            ('images', len(self.image_boxes)),
+            ('boxes', self.num_boxes),
+            ('skipped_boxes', self.skipped),
+            ('boxes_per_image', self.boxes_per_image().tolist()),
+            ('classes', self.class_summary()),
+            ('anchor_suggestion', self.anchor_suggestion(num_anchors, seed)),
+        ])
+
+    def report(self, num_anchors=DEFAULT_NUM_ANCHORS, num_layers=6, seed=0):
+        """Return a readable report ending with an `ssd_anchor_generator` block to paste into the config."""
+        boxes_per_image = self.boxes_per_image()
+        lines = ['Images: {}, boxes: {}, skipped empty boxes: {}'.format(
+            len(self.image_boxes), self.num_boxes, self.skipped)]
+        if len(self.image_boxes):
+            counts = np.repeat(np.arange(len(boxes_per_image)), boxes_per_image)
+            lines.append('Boxes per image: mean {:.2f}, median {:g}, max {}'.format(
+                counts.mean(), np.median(counts), counts.max()))
+        lines.append('{:<20} {:>8}  {:>20}  {:>20}'.format('class', 'boxes', 'aspect p10/p50/p90',
+                                                           'scale p10/p50/p90'))
+        for class_name, stats in self.class_summary().items():
+            lines.append('{:<20} {:>8}  {:>20}  {:>20}'.format(
+                class_name, stats['boxes'], '/'.join('{:.2f}'.format(value) for value in
+                                                     stats['aspect_ratio_p10_p50_p90']),
+                '/'.join('{:.2f}'.format(value) for value in stats['scale_p10_p50_p90'])))
+        if not self.num_boxes:
+            return '\n'.join(lines)
+        suggestion = self.anchor_suggestion(num_anchors, seed)
+        lines.append('k-means anchors (mean IoU {:.3f}):'.format(suggestion['mean_iou']))
+        for anchor in suggestion['anchors']:
+            lines.append('  width {width:.3f} height {height:.3f} aspect {aspect_ratio:.2f} '
+                         'scale {scale:.3f}'.format(**anchor))
+        lines.extend(['ssd_anchor_generator {',
+                      '  num_layers: {}'.format(num_layers),
+                      '  min_scale: {:.2f}'.format(suggestion['min_scale']),
+                      '  max_scale: {:.2f}'.format(suggestion['max_scale'])])
+        lines.extend('  aspect_ratios: {:g}'.format(ratio) for ratio in suggestion['aspect_ratios'])
+        lines.append('}')
+        return '\n'.join(lines)
+
+    def to_dict(self):
+        return {
+            'version': STATS_VERSION,
+            'aspect_counts': dict((name, counts.tolist()) for name, counts in self.aspect_counts.items()),
+            'scale_counts': dict((name, counts.tolist()) for name, counts in self.scale_counts.items()),
+            'image_boxes': self.image_boxes,
+            'shape_grid': self.shape_grid.tolist(),
+            'skipped': self.skipped,
+        }
+
+    @classmethod
+    def from_dict(cls, state):
+        stats = cls()
+        if state.get('version') != STATS_VERSION:
+            return stats
+        for counts, saved in ((stats.aspect_counts, state['aspect_counts']),
+                              (stats.scale_counts, state['scale_counts'])):
+            for name in sorted(saved):
+                counts[name] = np.asarray(saved[name], dtype=np.int64)
+        stats.image_boxes = state['image_boxes']
+        stats.shape_grid = np.asarray(state['shape_grid'], dtype=np.int64)
+        stats.skipped = state['skipped']
+        return stats
+
+    def save(self, path):
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w') as fid:
+            json.dump(self.to_dict(), fid)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        """Return the state saved at `path`, or an empty one if there is none."""
+        if not os.path.exists(path):
+            return cls()
+        with open(path) as fid:
+            return cls.from_dict(json.load(fid))
+
+
+def update_stats_file(df, path):
+    """Add the images of `df` not yet counted to the state at `path`; returns the updated stats."""
+    stats = AnnotationStats.load(path)
+    stats.update(df)
+    stats.save(path)
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Print box statistics and anchor suggestions of a label table.')
+    parser.add_argument('--csv_input', required=True, help='Label csv or label store')
+    parser.add_argument('--state_path', default='',
+                        help='Json state to update with the images it does not count yet')
+    parser.add_argument('--num_anchors', type=int, default=DEFAULT_NUM_ANCHORS, help='Number of k-means anchors')
+    parser.add_argument('--num_layers', type=int, default=6, help='num_layers of the suggested anchor generator')
+    parser.add_argument('--seed', type=int, default=0, help='Seed of the k-means initialization')
+    parser.add_argument('--output_path', default='', help='Also write the statistics to this json file')
+    args = parser.parse_args(argv)
+
+    if is_label_store(args.csv_input):
+        labels = LabelStore(args.csv_input).to_dataframe()
+    else:
+        labels = pd.read_csv(args.csv_input)
+    if args.state_path:
+        stats = update_stats_file(labels, args.state_path)
+    else:
+        stats = AnnotationStats()
+        stats.update(labels)
+    print(stats.report(args.num_anchors, args.num_layers, args.seed))
+    if args.output_path:
+        with open(args.output_path, 'w') as fid:
+            json.dump(stats.summary(args.num_anchors, args.seed), fid, indent=2)
+
+
+if __name__ == '__main__':
+    main()
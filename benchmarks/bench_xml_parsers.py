@@ -0,0 +1,72 @@
+"""
+Usage:
+  # Time every xml_to_csv parser backend against the original positional parser
+  # on 5000 synthetic annotation files:
+  python benchmarks/bench_xml_parsers.py --num_files=5000
+"""
+from __future__ import division
+from __future__ import print_function
+
+import os
+import sys
+import glob
+import time
+import argparse
+import tempfile
+import xml.etree.ElementTree as ET
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import xml_to_csv  # noqa: E402
+from synthetic import write_voc_annotations  # noqa: E402
+
+
+def parse_xml_positional(xml_file):
+    """The original xml_to_csv parser, which reads fields by child position."""
+    rows = []
+    root = ET.parse(xml_file).getroot()
+    for member in root.findall('object'):
+        rows.append((root.find('filename').text,
+                     int(root.find('size')[0].text),
+                     int(root.find('size')[1].text),
+                     member[0].text,
+                     int(member[4][0].text),
+                     int(member[4][1].text),
+                     int(member[4][2].text),
+                     int(member[4][3].text)))
+    return rows
+
+
+def time_parser(parse, xml_files, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.time()
+        for xml_file in xml_files:
+            parse(xml_file)
+        elapsed = time.time() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare the xml_to_csv parser backends.')
+    parser.add_argument('--num_files', type=int, default=2000)
+    parser.add_argument('--max_boxes', type=int, default=4)
+    parser.add_argument('--repeat', type=int, default=3, help='Report the best of this many runs')
+    args = parser.parse_args()
+
+    parsers = [('positional', parse_xml_positional)]
+    parsers += [(name, xml_to_csv.PARSERS[name]) for name in sorted(xml_to_csv.PARSERS)
+                if name != 'lxml' or xml_to_csv.lxml_etree is not None]
+    with tempfile.TemporaryDirectory() as tmpdirname:
+        write_voc_annotations(tmpdirname, args.num_files, max_boxes=args.max_boxes)
+        xml_files = sorted(glob.glob(os.path.join(tmpdirname, '*.xml')))
+        baseline = time_parser(parse_xml_positional, xml_files, args.repeat)
+        for name, parse in parsers:
+            elapsed = baseline if name == 'positional' else time_parser(parse, xml_files, args.repeat)
+            print('{:<10} {:8.3f}s {:10.0f} files/s {:6.2f}x'.format(
+                name, elapsed, len(xml_files) / elapsed, baseline / elapsed))
+
+
+if __name__ == '__main__':
+    main()
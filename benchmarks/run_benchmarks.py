@@ -0,0 +1,165 @@
+"""
+Usage:
+  # Time the annotation -> csv -> TFRecord toolchain on 2000 synthetic images
+  # and append the results to a json file:
+  python benchmarks/run_benchmarks.py --num_files=2000 --output_path=bench_results.json
+
+Examples are serialized and written without TensorFlow, so every stage but
+`create_tf_example` runs without it; that one is skipped with a note when
+TensorFlow or the object_detection API cannot be imported.
+
+Peak memory is reported as `ru_maxrss`, which only grows: `peak_rss_mb` is
+the peak of this process and `children_peak_rss_mb` that of the largest
+finished worker process, both since the start of the run, not per stage.
+"""
+from __future__ import division
+from __future__ import print_function
+
+import os
+import sys
+import glob
+import json
+import time
+import platform
+import argparse
+import resource
+import tempfile
+import subprocess
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import xml_to_csv  # noqa: E402
+from synthetic import write_images, write_voc_annotations  # noqa: E402
+
+
+def peak_rss_mb(who=resource.RUSAGE_SELF):
+    peak = resource.getrusage(who).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS.
+    return peak / (1024.0 * 1024.0) if sys.platform == 'darwin' else peak / 1024.0
+
+
+def dir_size(path, pattern='*'):
+    return sum(os.path.getsize(name) for name in glob.glob(os.path.join(path, pattern)))
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'],
+                                       cwd=os.path.dirname(os.path.abspath(__file__))).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def measure(name, func, items, num_bytes=None, unit='files'):
+    """Run `func` once and return its timing record."""
+    start = time.time()
+    result = func()
+    elapsed = time.time() - start
+    record = {
+        'name': name,
+        'seconds': elapsed,
+        unit + '_per_sec': items / elapsed if elapsed > 0 else None,
+        'peak_rss_mb': peak_rss_mb(),
+        'children_peak_rss_mb': peak_rss_mb(resource.RUSAGE_CHILDREN),
+    }
+    if num_bytes is not None:
+        record['mb_per_sec'] = num_bytes / 1e6 / elapsed if elapsed > 0 else None
+    print('{:<24} {:8.3f}s  {}'.format(name, elapsed, ', '.join(
+        '{}={:.1f}'.format(key, value) for key, value in sorted(record.items())
+        if key not in ('name', 'seconds') and value is not None)))
+    return record, result
+
+
+def run_tfrecord_benchmarks(labels, image_dir, output_dir, args):
+    import generate_tfrecord
+
+    records = []
+    num_images = labels['filename'].nunique()
+    image_bytes = dir_size(image_dir)
+    record, grouped = measure('split', lambda: generate_tfrecord.split(labels, 'filename'),
+                              num_images, unit='examples')
+    records.append(record)
+    record, grouped = measure('split_columns', lambda: generate_tfrecord.split_columns(labels, 'filename'),
+                              num_images, unit='examples')
+    records.append(record)
+
+    def build_all():
+        for group in grouped:
+            generate_tfrecord.serialize_example(group, image_dir)
+    record, _ = measure('serialize_example', build_all, num_images, image_bytes, unit='examples')
+    records.append(record)
+    try:
+        import tensorflow  # noqa: F401
+        from object_detection.utils import dataset_util  # noqa: F401
+    except ImportError as error:
+        print('{:<24} skipped: {}'.format('create_tf_example', error))
+        records.append({'name': 'create_tf_example', 'skipped': str(error)})
+    else:
+        def create_all():
+            for group in grouped:
+                generate_tfrecord.create_tf_example(group, image_dir).SerializeToString()
+        record, _ = measure('create_tf_example', create_all, num_images, image_bytes, unit='examples')
+        records.append(record)
+    record, _ = measure('serialize_batch', lambda: generate_tfrecord.serialize_batch(grouped, image_dir),
+                        num_images, image_bytes, unit='examples')
+    records.append(record)
+
+    output_path = os.path.join(output_dir, 'bench.record')
+    record, output_paths = measure(
+        'write_records', lambda: generate_tfrecord.write_records(
+            grouped, image_dir, output_path, num_shards=args.num_shards, num_workers=args.num_workers),
+        num_images, image_bytes, unit='examples')
+    record['output_mb'] = sum(os.path.getsize(path) for path in output_paths) / 1e6
+    records.append(record)
+    return records
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the annotation to TFRecord toolchain.')
+    parser.add_argument('--num_files', type=int, default=1000, help='Number of synthetic images')
+    parser.add_argument('--max_boxes', type=int, default=4, help='Maximum boxes per image')
+    parser.add_argument('--image_size', type=int, default=256, help='Width and height of the images')
+    parser.add_argument('--num_workers', type=int, default=1, help='Processes for the parallel stages')
+    parser.add_argument('--num_shards', type=int, default=1, help='Shards written by write_records')
+    parser.add_argument('--output_path', default='', help='Append the results to this json file')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmpdirname:
+        annotation_dir = os.path.join(tmpdirname, 'annotations')
+        image_dir = os.path.join(tmpdirname, 'images')
+        filenames = write_voc_annotations(annotation_dir, args.num_files, max_boxes=args.max_boxes,
+                                          width=args.image_size, height=args.image_size)
+        annotation_bytes = dir_size(annotation_dir, '*.xml')
+
+        results = []
+        record, labels = measure('xml_to_csv', lambda: xml_to_csv.xml_to_csv(
+            annotation_dir, num_workers=args.num_workers), args.num_files, annotation_bytes)
+        record['boxes'] = len(labels)
+        results.append(record)
+
+        write_images(image_dir, filenames, width=args.image_size, height=args.image_size)
+        results.extend(run_tfrecord_benchmarks(labels, image_dir, tmpdirname, args))
+
+    run = {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'git_revision': git_revision(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'config': vars(args),
+        'results': results,
+    }
+    if args.output_path:
+        runs = []
+        if os.path.exists(args.output_path):
+            with open(args.output_path) as fid:
+                runs = json.load(fid)
+        runs.append(run)
+        with open(args.output_path, 'w') as fid:
+            json.dump(runs, fid, indent=2)
+        print('Appended results to {}'.format(args.output_path))
+    else:
+        print(json.dumps(run, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+"""
+Synthetic PASCAL VOC datasets for the benchmarks, shaped like the files in
+annotations/ and images/.
+"""
+import os
+import random
+
+VOC_TEMPLATE = """<annotation verified="yes">
+    <folder>images</folder>
+    <filename>{filename}</filename>
+    <path>{filename}</path>
+    <source>
+        <database>Unknown</database>
+    </source>
+    <size>
+        <width>{width}</width>
+        <height>{height}</height>
+        <depth>3</depth>
+    </size>
+    <segmented>0</segmented>
+{objects}</annotation>
+"""
+
+OBJECT_TEMPLATE = """    <object>
+        <name>{name}</name>
+        <pose>Unspecified</pose>
+        <truncated>0</truncated>
+        <difficult>0</difficult>
+        <bndbox>
+            <xmin>{xmin}</xmin>
+            <ymin>{ymin}</ymin>
+            <xmax>{xmax}</xmax>
+            <ymax>{ymax}</ymax>
+        </bndbox>
+    </object>
+"""
+
+
+def random_boxes(rng, width, height, num_boxes):
+    boxes = []
+    for _ in range(num_boxes):
+        xmin = rng.randint(0, width - 2)
+        ymin = rng.randint(0, height - 2)
+        boxes.append((xmin, ymin, rng.randint(xmin + 1, width), rng.randint(ymin + 1, height)))
+    return boxes
+
+
+def write_voc_annotations(annotation_dir, num_files, max_boxes=4, width=256, height=256,
+                          classes=('Airplane',), seed=0):
+    """Write `num_files` VOC xml files with 1 to `max_boxes` random boxes each.
+
+    Returns the image file names referenced by the annotations.
+    """
+    rng = random.Random(seed)
+    if not os.path.isdir(annotation_dir):
+        os.makedirs(annotation_dir)
+    filenames = []
+    for index in range(num_files):
+        filename = 'synthetic{:07d}.jpg'.format(index)
+        objects = ''.join(
+            OBJECT_TEMPLATE.format(name=rng.choice(classes), xmin=xmin, ymin=ymin, xmax=xmax, ymax=ymax)
+            for xmin, ymin, xmax, ymax in random_boxes(rng, width, height, rng.randint(1, max_boxes)))
+        with open(os.path.join(annotation_dir, 'synthetic{:07d}.xml'.format(index)), 'w') as fid:
+            fid.write(VOC_TEMPLATE.format(filename=filename, width=width, height=height, objects=objects))
+        filenames.append(filename)
+    return filenames
+
+
+def write_images(image_dir, filenames, width=256, height=256, seed=0):
+    """Write a random-noise JPEG for every file name, the worst case for JPEG size."""
+    import numpy as np
+    from PIL import Image
+
+    if not os.path.isdir(image_dir):
+        os.makedirs(image_dir)
+    rng = np.random.RandomState(seed)
+    # A few distinct images are enough to defeat caching; reuse them to keep setup fast.
+    images = [Image.fromarray(rng.randint(0, 256, (height, width, 3)).astype('uint8'), 'RGB') for _ in range(8)]
+    for index, filename in enumerate(filenames):
+        images[index % len(images)].save(os.path.join(image_dir, filename), format='JPEG', quality=90)
@@ -0,0 +1,49 @@
+"""
+Checkpoint of the completed shards of a record write, so an interrupted run
+can resume at the first unfinished shard.
+
+Each completed shard is stored with a key hashing the annotations and
+options of its examples; a shard is only skipped if its key is unchanged and
+its file exists. Images are assumed not to change between the runs.
+"""
+import os
+import json
+
+CHECKPOINT_VERSION = 1
+
+
+class ShardCheckpoint(object):
+    def __init__(self, path, output_path, num_shards):
+        self.path = path
+        self.output_path = output_path
+        self.num_shards = num_shards
+        self.completed = self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return {}
+        with open(self.path) as fid:
+            state = json.load(fid)
+        if (state.get('version') != CHECKPOINT_VERSION or state.get('output_path') != self.output_path or
+                state.get('num_shards') != self.num_shards):
+            return {}
+        return state['shards']
+
+    def _save(self):
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w') as fid:
+            json.dump({'version': CHECKPOINT_VERSION, 'output_path': self.output_path,
+                       'num_shards': self.num_shards, 'shards': self.completed}, fid)
+        os.replace(tmp_path, self.path)
+
+    def is_complete(self, shard, key, shard_output):
+        return self.completed.get(str(shard)) == key and os.path.isfile(shard_output)
+
+    def mark_complete(self, shard, key):
+        self.completed[str(shard)] = key
+        self._save()
+
+    def remove(self):
+        """Delete the checkpoint once the whole write has finished."""
+        if os.path.exists(self.path):
+            os.remove(self.path)
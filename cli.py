@@ -0,0 +1,47 @@
+"""
+Usage:
+  # One entry point for all the dataset scripts; `python cli.py <command> --help` shows a command's options:
+  python cli.py xml_to_csv --annotation_dir=annotations --output_path=data/airplane_labels.csv
+  python cli.py generate_tfrecord --csv_input=data/train_labels.csv --output_path=train.record --image_dir=images
+
+A command's module is only imported when it runs, so `python cli.py --help`
+and the commands that do not write records start without TensorFlow.
+"""
+from __future__ import print_function
+
+import sys
+import importlib
+from collections import OrderedDict
+
+COMMANDS = OrderedDict([
+    ('xml_to_csv', 'Convert VOC xml, COCO json or YOLO txt annotations into one csv or label store'),
+    ('validate_labels', 'Check the boxes of a label csv'),
+    ('split_labels', 'Split labels into stratified train and test sets'),
+    ('annotation_stats', 'Print box statistics and suggest SSD anchors'),
+    ('dedup_images', 'Find duplicate and near-duplicate images'),
+    ('generate_tfrecord', 'Convert a label csv and its images into TFRecords'),
+    ('xml_to_tfrecord', 'Stream xml files and their images into TFRecords'),
+    ('inspect_records', 'Print statistics of TFRecords and check them against a csv'),
+])
+
+
+def usage():
+    lines = ['usage: cli.py <command> [options]', '', 'commands:']
+    lines.extend('  {:<20} {}'.format(name, description) for name, description in COMMANDS.items())
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv or argv[0] in ('-h', '--help'):
+        print(usage())
+        return 0 if argv else 2
+    command = argv[0]
+    if command not in COMMANDS:
+        print('Unknown command {}\n\n{}'.format(command, usage()), file=sys.stderr)
+        return 2
+    return importlib.import_module(command).main(argv[1:])
+
+
+if __name__ == '__main__':
+    sys.exit(main())
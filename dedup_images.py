@@ -0,0 +1,152 @@
+"""
+Usage:
+  # Find duplicate and near-duplicate images and write their groups to a csv:
+  python dedup_images.py --image_dir=images --output_path=data/image_groups.csv --num_workers=8
+
+  # Also count the duplicate groups that leak between the train and test labels:
+  python dedup_images.py --image_dir=images --output_path=data/image_groups.csv \
+    --train_csv=data/train_labels.csv --test_csv=data/test_labels.csv
+
+Images get a 64 bit difference hash (dHash); images whose hashes differ in at
+most --max_distance bits are near-duplicates. Candidate pairs come from a
+multi-index hash table: the hash is cut into max_distance + 1 blocks, and two
+hashes within the distance must agree exactly on at least one block, so only
+images sharing a block are ever compared.
+"""
+from __future__ import division
+from __future__ import print_function
+
+import os
+import glob
+import argparse
+import multiprocessing
+from collections import defaultdict
+
+import pandas as pd
+from PIL import Image
+
+IMAGE_PATTERNS = ('*.jpg', '*.jpeg', '*.png')
+
+
+def dhash(image_path, hash_size=8):
+    """Return the difference hash of an image as an int of hash_size * hash_size bits."""
+    image = Image.open(image_path)
+    # Decoding at reduced size is much faster for JPEGs and is all a 9x8 thumbnail needs.
+    image.draft('L', (hash_size * 4, hash_size * 4))
+    pixels = bytearray(image.convert('L').resize((hash_size + 1, hash_size), Image.BILINEAR).tobytes())
+    value = 0
+    for row in range(hash_size):
+        offset = row * (hash_size + 1)
+        for column in range(hash_size):
+            value = (value << 1) | (pixels[offset + column] > pixels[offset + column + 1])
+    return value
+
+
+def hash_images(image_paths, num_workers=1, chunk_size=64):
+    """Return the dHash of every image, computed on `num_workers` processes."""
+    if num_workers > 1:
+        pool = multiprocessing.Pool(num_workers)
+        try:
+            return pool.map(dhash, image_paths, chunk_size)
+        finally:
+            pool.close()
+            pool.join()
+    return [dhash(image_path) for image_path in image_paths]
+
+
+def hamming(a, b):
+    return bin(a ^ b).count('1')
+
+
+def _blocks(value, num_blocks, num_bits):
+    """Cut a hash into `num_blocks` contiguous bit blocks."""
+    bounds = [num_bits * block // num_blocks for block in range(num_blocks + 1)]
+    return [(value >> start) & ((1 << (end - start)) - 1) for start, end in zip(bounds[:-1], bounds[1:])]
+
+
+def near_duplicate_pairs(hashes, max_distance=4, num_bits=64):
+    """Yield the (i, j) index pairs, i < j, of hashes at most `max_distance` bits apart.
+
+    Uses multi-index hashing, so the cost grows with the number of candidates
+    sharing a block rather than with the square of the number of hashes.
+    """
+    num_blocks = max_distance + 1
+    tables = [defaultdict(list) for _ in range(num_blocks)]
+    for index, value in enumerate(hashes):
+        seen = set()
+        for table, block in zip(tables, _blocks(value, num_blocks, num_bits)):
+            for other in table[block]:
+                if other not in seen:
+                    seen.add(other)
+                    if hamming(value, hashes[other]) <= max_distance:
+                        yield other, index
+            table[block].append(index)
+
+
+def group_duplicates(num_items, pairs):
+    """Return a group id per item, so that items connected by `pairs` share one."""
+    parent = list(range(num_items))
+
+    def find(item):
+        while parent[item] != item:
+            parent[item] = parent[parent[item]]
+            item = parent[item]
+        return item
+
+    for a, b in pairs:
+        root_a, root_b = find(a), find(b)
+        if root_a != root_b:
+            parent[max(root_a, root_b)] = min(root_a, root_b)
+    return [find(item) for item in range(num_items)]
+
+
+def find_duplicates(image_dir, max_distance=4, num_workers=1):
+    """Return a DataFrame of filename, hash and duplicate group for every image in `image_dir`.
+
+    The group of an image is the file name of the first image of its group.
+    """
+    image_paths = sorted(path for pattern in IMAGE_PATTERNS for path in glob.glob(os.path.join(image_dir, pattern)))
+    filenames = [os.path.basename(path) for path in image_paths]
+    hashes = hash_images(image_paths, num_workers)
+    groups = group_duplicates(len(hashes), near_duplicate_pairs(hashes, max_distance))
+    return pd.DataFrame({
+        'filename': filenames,
+        'hash': ['{:016x}'.format(value) for value in hashes],
+        'group': [filenames[group] for group in groups],
+    }, columns=['filename', 'hash', 'group'])
+
+
+def leaking_groups(groups_df, train_df, test_df):
+    """Return the duplicate groups that have images in both the train and the test labels."""
+    group_of = groups_df.set_index('filename')['group']
+    train_groups = set(group_of.reindex(train_df['filename'].unique()).dropna())
+    test_groups = set(group_of.reindex(test_df['filename'].unique()).dropna())
+    return sorted(train_groups & test_groups)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Find duplicate and near-duplicate images.')
+    parser.add_argument('--image_dir', default='images', help='Directory containing the images')
+    parser.add_argument('--output_path', default='image_groups.csv',
+                        help='Csv of filename, hash and duplicate group')
+    parser.add_argument('--max_distance', type=int, default=4,
+                        help='Maximum number of differing hash bits for near-duplicates')
+    parser.add_argument('--num_workers', type=int, default=1, help='Number of hashing processes')
+    parser.add_argument('--train_csv', default='', help='Train labels to check for leakage')
+    parser.add_argument('--test_csv', default='', help='Test labels to check for leakage')
+    args = parser.parse_args(argv)
+
+    groups_df = find_duplicates(args.image_dir, max_distance=args.max_distance, num_workers=args.num_workers)
+    groups_df.to_csv(args.output_path, index=None)
+    group_sizes = groups_df['group'].value_counts()
+    duplicated = group_sizes[group_sizes > 1]
+    print('Found {} duplicate groups covering {} of {} images.'.format(
+        len(duplicated), int(duplicated.sum()), len(groups_df)))
+    if args.train_csv and args.test_csv:
+        leaks = leaking_groups(groups_df, pd.read_csv(args.train_csv), pd.read_csv(args.test_csv))
+        print('{} duplicate groups leak between {} and {}: {}'.format(
+            len(leaks), args.train_csv, args.test_csv, ', '.join(leaks)))
+
+
+if __name__ == '__main__':
+    main()
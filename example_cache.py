@@ -0,0 +1,115 @@
+"""
+On-disk cache of serialized examples, keyed by the content hash of the image
+and a hash of its annotations, with least-recently-used eviction by size.
+
+Entries are plain files, written atomically, so several writer processes
+can share one cache directory.
+"""
+import os
+import hashlib
+
+DEFAULT_MAX_BYTES = 10 * 1024 ** 3
+
+
+class ExampleCache(object):
+    def __init__(self, cache_dir, max_bytes=DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+
+    def _entry_path(self, kind, key):
+        return os.path.join(self.cache_dir, kind, key[:2], key)
+
+    def _read(self, kind, key):
+        entry_path = self._entry_path(kind, key)
+        try:
+            with open(entry_path, 'rb') as fid:
+                data = fid.read()
+        except (IOError, OSError):
+            return None
+        try:
+            # Bump the mtime so eviction drops the least recently used entries first.
+            os.utime(entry_path, None)
+        except OSError:
+            pass
+        return data
+
+    def _write(self, kind, key, data):
+        entry_path = self._entry_path(kind, key)
+        entry_dir = os.path.dirname(entry_path)
+        if not os.path.isdir(entry_dir):
+            try:
+                os.makedirs(entry_dir)
+            except OSError:
+                if not os.path.isdir(entry_dir):
+                    raise
+        tmp_path = '{}.{}.tmp'.format(entry_path, os.getpid())
+        with open(tmp_path, 'wb') as fid:
+            fid.write(data)
+        os.replace(tmp_path, entry_path)
+
+    def image_hash(self, image_path):
+        """Return (content hash, image bytes or None) of the image at `image_path`.
+
+        The hash of an image whose path, mtime and size were seen before is
+        looked up without reading the image, and the bytes are then None.
+        """
+        stat = os.stat(image_path)
+        stat_key = hashlib.sha1('{}\0{}\0{}'.format(
+            os.path.abspath(image_path), stat.st_mtime_ns, stat.st_size).encode('utf8')).hexdigest()
+        content_hash = self._read('stat', stat_key)
+        if content_hash is not None:
+            return content_hash.decode('ascii'), None
+        with open(image_path, 'rb') as fid:
+            data = fid.read()
+        content_hash = hashlib.sha1(data).hexdigest()
+        self._write('stat', stat_key, content_hash.encode('ascii'))
+        return content_hash, data
+
+    @staticmethod
+    def example_key(image_hash, annotation_hash):
+        return hashlib.sha1('{}\0{}'.format(image_hash, annotation_hash).encode('ascii')).hexdigest()
+
+    def get(self, example_key):
+        data = self._read('example', example_key)
+        if data is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return data
+
+    def put(self, example_key, serialized):
+        self._write('example', example_key, serialized)
+
+    def evict(self):
+        """Delete the least recently used examples until the cache fits in `max_bytes`.
+
+        Returns the number of bytes freed.
+        """
+        entries = []
+        total = 0
+        for root, _, names in os.walk(self.cache_dir):
+            for name in names:
+                entry_path = os.path.join(root, name)
+                try:
+                    stat = os.stat(entry_path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry_path))
+                total += stat.st_size
+        freed = 0
+        for _, size, entry_path in sorted(entries):
+            if total - freed <= self.max_bytes:
+                break
+            try:
+                os.remove(entry_path)
+            except OSError:
+                continue
+            freed += size
+        return freed
+
+    def report(self):
+        lookups = self.hits + self.misses
+        return 'Example cache: {} hits, {} misses ({:.0f}% hit rate)'.format(
+            self.hits, self.misses, 100.0 * self.hits / lookups if lookups else 0.0)
@@ -0,0 +1,131 @@
+"""
+Minimal tf.train.Example encoder, without TensorFlow or protobuf.
+
+Features are (kind, values) pairs built with the same helpers as
+object_detection.utils.dataset_util. `encode_example` writes the protobuf
+wire format directly, with the feature map sorted by name. As long as no
+feature name is a prefix of another, as with the create_tf_example features,
+the bytes equal `tf.train.Example.SerializeToString(deterministic=True)`.
+"""
+import numpy as np
+
+BYTES = 'bytes_list'
+FLOAT = 'float_list'
+INT64 = 'int64_list'
+
+# Field number of each list in the Feature oneof, as a length-delimited tag.
+_FEATURE_TAGS = {BYTES: b'\x0a', FLOAT: b'\x12', INT64: b'\x1a'}
+_VALUE_TAG = b'\x0a'
+_KEY_TAG = b'\x0a'
+_ENTRY_VALUE_TAG = b'\x12'
+_FEATURES_TAG = b'\x0a'
+_FEATURE_ENTRY_TAG = b'\x0a'
+
+
+def int64_feature(value):
+    return INT64, [value]
+
+
+def int64_list_feature(values):
+    return INT64, values
+
+
+def bytes_feature(value):
+    return BYTES, [value]
+
+
+def bytes_list_feature(values):
+    return BYTES, values
+
+
+def float_list_feature(values):
+    return FLOAT, values
+
+
+def _varint(value):
+    if value < 0:
+        # Negative int64 values are sent as their 64 bit two's complement.
+        value += 1 << 64
+    out = bytearray()
+    while value > 0x7f:
+        out.append((value & 0x7f) | 0x80)
+        value >>= 7
+    out.append(value)
+    return bytes(out)
+
+
+def _delimited(tag, payload):
+    return tag + _varint(len(payload)) + payload
+
+
+def _encode_list(kind, values):
+    if kind == BYTES:
+        return b''.join(_delimited(_VALUE_TAG, value) for value in values)
+    if not len(values):
+        return b''
+    # Repeated numbers are packed into a single field.
+    if kind == FLOAT:
+        packed = np.asarray(values, dtype='<f4').tobytes()
+    elif kind == INT64:
+        packed = b''.join(_varint(int(value)) for value in values)
+    else:
+        raise ValueError('Unknown feature kind {}'.format(kind))
+    return _delimited(_VALUE_TAG, packed)
+
+
+def list_payload(kind, values):
+    """Return the serialized list message of a feature, for `ExampleTemplate.encode`."""
+    return _encode_list(kind, values)
+
+
+def packed_float_payload(packed):
+    """Return the FloatList payload of little-endian float32 bytes."""
+    return _delimited(_VALUE_TAG, packed) if packed else b''
+
+
+def encode_feature(kind, values):
+    """Return the serialized tf.train.Feature holding `values`."""
+    return _delimited(_FEATURE_TAGS[kind], _encode_list(kind, values))
+
+
+def _entry(key, feature):
+    return _delimited(_FEATURE_ENTRY_TAG, key + _delimited(_ENTRY_VALUE_TAG, feature))
+
+
+def _encoded_key(name):
+    return _delimited(_KEY_TAG, name.encode('utf8') if not isinstance(name, bytes) else name)
+
+
+def encode_example(features):
+    """Return the serialized tf.train.Example of a {name: (kind, values)} dict."""
+    entries = [_entry(_encoded_key(name), encode_feature(*features[name])) for name in sorted(features)]
+    return _delimited(_FEATURES_TAG, b''.join(entries))
+
+
+class ExampleTemplate(object):
+    """Encodes examples that share one set of feature names and kinds.
+
+    The map entry keys are encoded once, and so are the features whose values
+    are given in `constants`. `encode` takes the list payloads (see
+    `list_payload`) of the other features and returns the same bytes as
+    `encode_example`.
+    """
+
+    def __init__(self, kinds, constants=None):
+        constants = constants or {}
+        self._parts = []
+        for name in sorted(kinds):
+            key = _encoded_key(name)
+            if name in constants:
+                self._parts.append((None, _entry(key, encode_feature(kinds[name], constants[name])), None))
+            else:
+                self._parts.append((name, key, _FEATURE_TAGS[kinds[name]]))
+
+    def encode(self, payloads):
+        entries = []
+        for name, key, tag in self._parts:
+            if name is None:
+                entries.append(key)
+            else:
+                entries.append(_entry(key, _delimited(tag, payloads[name])))
+        return _delimited(_FEATURES_TAG, b''.join(entries))
@@ -6,6 +6,10 @@ Usage:
 
   # Create test data:
   python generate_tfrecord.py --csv_input=data/test_labels.csv  --output_path=test.record
+
+  # Create train data in 10 shards written by 4 processes:
+  python generate_tfrecord.py --csv_input=data/train_labels.csv  --output_path=train.record \
+    --num_shards=10 --num_workers=4
 """
 from __future__ import division
 from __future__ import print_function
@@ -13,88 +17,708 @@ from __future__ import absolute_import
 
 import os
 import io
+import time
+import logging
+import argparse
+import cProfile
+import hashlib
+import functools
+import multiprocessing
+import numpy as np
 import pandas as pd
-import tensorflow as tf
 
 from PIL import Image
-from object_detection.utils import dataset_util
-from collections import namedtuple, OrderedDict
+from image_size import get_image_size, UnknownImageFormat
+from image_resize import reencode_image
+from label_map import LabelMap, UnknownClassError
+from prefetch import ReadStats, prefetch
+from example_cache import ExampleCache, DEFAULT_MAX_BYTES
+from instrumentation import Instrumentation, Progress, timed
+from checkpoint import ShardCheckpoint
+from label_store import LabelStore, is_label_store
+from validate_labels import POLICIES, DEFAULT_POLICY, has_invalid_boxes, store_box_frame, summarize_issues, \
+    validate_boxes
+from example_proto import BYTES, FLOAT, INT64, ExampleTemplate, bytes_feature, bytes_list_feature, encode_example, \
+    float_list_feature, int64_feature, int64_list_feature, list_payload, packed_float_payload
+from tfrecord_io import open_writer
+from collections import namedtuple, Counter, OrderedDict, deque
 
-flags = tf.app.flags
-flags.DEFINE_string('csv_input', '', 'Path to the CSV input')
-flags.DEFINE_string('output_path', '', 'Path to output TFRecord')
-flags.DEFINE_string('image_dir', '', 'Path to images')
-FLAGS = flags.FLAGS
+DEFAULT_LABEL_MAP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                      'training', 'object-detection.pbtxt')
 
 
-# TO-DO replace this with label map
-def class_text_to_int(row_label):
-    if row_label == 'Airplane':
-        return 1
-    else:
-        None
+# create_tf_example options that change the example, besides the label map.
+EXAMPLE_OPTION_DEFAULTS = {
+    'verify_dimensions': False,
+    'skip_unknown_classes': False,
+    'max_image_side': None,
+    'jpeg_quality': None,
+}
+
+# Number of examples `serialize_examples` builds together with `serialize_batch`.
+DEFAULT_BATCH_SIZE = 64
+
+# The features of every example; `image/format` is always jpg.
+EXAMPLE_KINDS = {
+    'image/height': INT64,
+    'image/width': INT64,
+    'image/filename': BYTES,
+    'image/source_id': BYTES,
+    'image/encoded': BYTES,
+    'image/format': BYTES,
+    'image/object/bbox/xmin': FLOAT,
+    'image/object/bbox/xmax': FLOAT,
+    'image/object/bbox/ymin': FLOAT,
+    'image/object/bbox/ymax': FLOAT,
+    'image/object/class/text': BYTES,
+    'image/object/class/label': INT64,
+}
+_EXAMPLE_TEMPLATE = ExampleTemplate(EXAMPLE_KINDS, constants={'image/format': [b'jpg']})
+
+# Module level so groups can be pickled to worker processes.
+GroupData = namedtuple('GroupData', ['filename', 'object'])
+
+
+_default_label_map = None
+
+
+def default_label_map():
+    global _default_label_map
+    if _default_label_map is None:
+        _default_label_map = LabelMap.from_file(DEFAULT_LABEL_MAP_PATH)
+    return _default_label_map
+
+
+def class_text_to_int(row_label, label_map=None):
+    return (label_map or default_label_map())[row_label]
+
+
+def classes_to_ids(classes, label_map=None, skip_unknown=False):
+    """Map a column of class names to label ids in one lookup.
+
+    Unknown names raise `UnknownClassError`, or with `skip_unknown` are returned
+    as -1 for the caller to drop.
+    """
+    label_map = label_map or default_label_map()
+    ids = label_map.lookup(classes)
+    if not skip_unknown and (ids < 0).any():
+        unknown = sorted(label_map.unknown_classes(classes))
+        raise UnknownClassError('Classes not in the label map: {}'.format(', '.join(map(str, unknown))))
+    return ids
+
+
+def _group_offsets(df, group):
+    """Sort `df` by `group` once and return it with the start/end row of every group."""
+    df = df[df[group].notnull()].sort_values(group, kind='mergesort')
+    keys = np.asarray(df[group].values)
+    boundaries = np.flatnonzero(keys[1:] != keys[:-1]) + 1
+    starts = np.concatenate([[0], boundaries]) if len(keys) else boundaries
+    ends = np.concatenate([boundaries, [len(keys)]]) if len(keys) else boundaries
+    return df, keys, starts, ends
 
 
 def split(df, group):
-    data = namedtuple('data', ['filename', 'object'])
-    gb = df.groupby(group)
-    return [data(filename, gb.get_group(x)) for filename, x in zip(gb.groups.keys(), gb.groups)]
-
-
-def create_tf_example(group, path):
-    with tf.gfile.GFile(os.path.join(path, '{}'.format(group.filename)), 'rb') as fid:
-        encoded_jpg = fid.read()
-    encoded_jpg_io = io.BytesIO(encoded_jpg)
-    image = Image.open(encoded_jpg_io)
-    width, height = image.size
-
-    filename = group.filename.encode('utf8')
-    image_format = b'jpg'
-    xmins = []
-    xmaxs = []
-    ymins = []
-    ymaxs = []
-    classes_text = []
-    classes = []
-
-    for index, row in group.object.iterrows():
-        xmins.append(row['xmin'] / width)
-        xmaxs.append(row['xmax'] / width)
-        ymins.append(row['ymin'] / height)
-        ymaxs.append(row['ymax'] / height)
-        classes_text.append(row['class'].encode('utf8'))
-        classes.append(class_text_to_int(row['class']))
-
-    tf_example = tf.train.Example(features=tf.train.Features(feature={
-        'image/height': dataset_util.int64_feature(height),
-        'image/width': dataset_util.int64_feature(width),
-        'image/filename': dataset_util.bytes_feature(filename),
-        'image/source_id': dataset_util.bytes_feature(filename),
-        'image/encoded': dataset_util.bytes_feature(encoded_jpg),
-        'image/format': dataset_util.bytes_feature(image_format),
-        'image/object/bbox/xmin': dataset_util.float_list_feature(xmins),
-        'image/object/bbox/xmax': dataset_util.float_list_feature(xmaxs),
-        'image/object/bbox/ymin': dataset_util.float_list_feature(ymins),
-        'image/object/bbox/ymax': dataset_util.float_list_feature(ymaxs),
-        'image/object/class/text': dataset_util.bytes_list_feature(classes_text),
-        'image/object/class/label': dataset_util.int64_list_feature(classes),
-    }))
-    return tf_example
-
-
-def main(_):
-    writer = tf.python_io.TFRecordWriter(FLAGS.output_path)
-    path = os.path.join(FLAGS.image_dir)
-    examples = pd.read_csv(FLAGS.csv_input)
-    grouped = split(examples, 'filename')
-    for group in grouped:
-        tf_example = create_tf_example(group, path)
-        writer.write(tf_example.SerializeToString())
+    df, keys, starts, ends = _group_offsets(df, group)
+    return [GroupData(keys[start], df.iloc[start:end]) for start, end in zip(starts, ends)]
+
+
+def split_columns(df, group):
+    """Like `split`, but each group's `object` maps column names to NumPy slices.
+
+    The table is converted to arrays once, so no per-image DataFrame is built.
+    """
+    df, keys, starts, ends = _group_offsets(df, group)
+    columns = dict((name, np.asarray(df[name].values)) for name in df.columns)
+    return [GroupData(keys[start], dict((name, values[start:end]) for name, values in columns.items()))
+            for start, end in zip(starts, ends)]
+
+
+def split_store(store):
+    """Return the groups of a `LabelStore`, as `split_columns` does for a DataFrame."""
+    return [GroupData(*store.image_boxes(index)) for index in range(len(store))]
+
+
+def _csv_dimensions(group):
+    """Return the (width, height) stated in the group's csv columns, or None if unusable."""
+    if 'width' not in group.object or 'height' not in group.object:
+        return None
+    widths = pd.unique(group.object['width'])
+    heights = pd.unique(group.object['height'])
+    if len(widths) != 1 or len(heights) != 1 or pd.isnull(widths[0]) or pd.isnull(heights[0]):
+        return None
+    width, height = int(widths[0]), int(heights[0])
+    if width <= 0 or height <= 0:
+        return None
+    return width, height
+
+
+def _image_dimensions(encoded_jpg):
+    try:
+        return get_image_size(encoded_jpg)
+    except UnknownImageFormat:
+        return Image.open(io.BytesIO(encoded_jpg)).size
+
+
+def resolve_dimensions(group, encoded_jpg, verify=False):
+    """Return the image (width, height) of a group.
+
+    The csv `width`/`height` columns are used when every box of the image agrees
+    on one positive size; otherwise the size is read from the JPEG/PNG header.
+    With `verify`, the header is always read and a stated size that does not
+    match it is logged and replaced by the real one.
+    """
+    stated = _csv_dimensions(group)
+    if stated is not None and not verify:
+        return stated
+    actual = _image_dimensions(encoded_jpg)
+    if stated is not None and stated != actual:
+        logging.warning('%s: csv says %dx%d but the image is %dx%d',
+                        group.filename, stated[0], stated[1], actual[0], actual[1])
+    return actual
+
+
+def read_image(path, filename):
+    image_path = os.path.join(path, '{}'.format(filename))
+    if '://' in image_path:
+        # Remote file systems (gs://, hdfs://) go through TensorFlow.
+        import tensorflow as tf
+        with tf.gfile.GFile(image_path, 'rb') as fid:
+            return fid.read()
+    with open(image_path, 'rb') as fid:
+        return fid.read()
+
+
+def example_features(group, path, verify_dimensions=False, label_map=None, skip_unknown_classes=False,
+                     encoded_jpg=None, max_image_side=None, jpeg_quality=None, instruments=None):
+    """Return the features of the example of `group`, as `example_proto` (kind, values) pairs."""
+    if encoded_jpg is None:
+        with timed(instruments, 'read'):
+            encoded_jpg = read_image(path, group.filename)
+    with timed(instruments, 'dimensions'):
+        width, height = resolve_dimensions(group, encoded_jpg, verify=verify_dimensions)
+    image_width, image_height = width, height
+    if max_image_side or jpeg_quality:
+        # Box coordinates are normalized, so they stay valid for the resized image.
+        with timed(instruments, 'resize'):
+            encoded_jpg, image_width, image_height = reencode_image(encoded_jpg, max_image_side, jpeg_quality)
+
+    with timed(instruments, 'build'):
+        filename = group.filename.encode('utf8')
+        image_format = b'jpg'
+        class_names = np.asarray(group.object['class'], dtype=object)
+        class_ids = classes_to_ids(class_names, label_map, skip_unknown=skip_unknown_classes)
+        known = class_ids >= 0
+        xmins = (np.asarray(group.object['xmin'])[known] / width).tolist()
+        xmaxs = (np.asarray(group.object['xmax'])[known] / width).tolist()
+        ymins = (np.asarray(group.object['ymin'])[known] / height).tolist()
+        ymaxs = (np.asarray(group.object['ymax'])[known] / height).tolist()
+        classes_text = [text.encode('utf8') for text in class_names[known]]
+        classes = class_ids[known].tolist()
+
+        features = {
+            'image/height': int64_feature(image_height),
+            'image/width': int64_feature(image_width),
+            'image/filename': bytes_feature(filename),
+            'image/source_id': bytes_feature(filename),
+            'image/encoded': bytes_feature(encoded_jpg),
+            'image/format': bytes_feature(image_format),
+            'image/object/bbox/xmin': float_list_feature(xmins),
+            'image/object/bbox/xmax': float_list_feature(xmaxs),
+            'image/object/bbox/ymin': float_list_feature(ymins),
+            'image/object/bbox/ymax': float_list_feature(ymaxs),
+            'image/object/class/text': bytes_list_feature(classes_text),
+            'image/object/class/label': int64_list_feature(classes),
+        }
+    return features
+
+
+def serialize_example(group, path, instruments=None, **example_options):
+    """Return the serialized example of `group`, built without TensorFlow."""
+    features = example_features(group, path, instruments=instruments, **example_options)
+    with timed(instruments, 'serialize'):
+        return encode_example(features)
+
+
+def _concat_column(groups, name, dtype=None):
+    columns = [np.asarray(group.object[name], dtype=dtype) for group in groups]
+    return np.concatenate(columns) if columns else np.asarray([], dtype=dtype)
+
+
+def serialize_batch(groups, path, encoded_images=None, verify_dimensions=False, label_map=None,
+                    skip_unknown_classes=False, max_image_side=None, jpeg_quality=None, instruments=None):
+    """Return the serialized examples of `groups`, the same bytes `serialize_example` gives for each.
+
+    Images are read, sized and resized one at a time, but the class lookup,
+    box normalization and float32 packing run once over the boxes of the
+    whole batch, and the examples are encoded from a template in which the
+    feature keys and `image/format` are already serialized. `encoded_images`
+    holds the image bytes of the groups, or None for the ones to read.
+    """
+    num_groups = len(groups)
+    images = list(encoded_images) if encoded_images is not None else [None] * num_groups
+    widths = np.empty(num_groups, dtype=np.int64)
+    heights = np.empty(num_groups, dtype=np.int64)
+    image_sizes = []
+    for index, group in enumerate(groups):
+        if images[index] is None:
+            with timed(instruments, 'read'):
+                images[index] = read_image(path, group.filename)
+        with timed(instruments, 'dimensions'):
+            widths[index], heights[index] = resolve_dimensions(group, images[index], verify=verify_dimensions)
+        image_size = (widths[index], heights[index])
+        if max_image_side or jpeg_quality:
+            with timed(instruments, 'resize'):
+                images[index], image_width, image_height = reencode_image(images[index], max_image_side,
+                                                                          jpeg_quality)
+            image_size = (image_width, image_height)
+        image_sizes.append(image_size)
+
+    with timed(instruments, 'build'):
+        counts = np.asarray([len(group.object['class']) for group in groups], dtype=np.int64)
+        class_names = _concat_column(groups, 'class', dtype=object)
+        class_ids = classes_to_ids(class_names, label_map, skip_unknown=skip_unknown_classes)
+        known = class_ids >= 0
+        box_image = np.repeat(np.arange(num_groups), counts)[known]
+        box_widths, box_heights = widths[box_image], heights[box_image]
+        packed = [(_concat_column(groups, name)[known] / scale).astype('<f4').tobytes()
+                  for name, scale in (('xmin', box_widths), ('xmax', box_widths),
+                                      ('ymin', box_heights), ('ymax', box_heights))]
+        classes_text = [text.encode('utf8') for text in class_names[known]]
+        classes = class_ids[known].tolist()
+        ends = np.cumsum(np.bincount(box_image, minlength=num_groups)).tolist()
+
+    with timed(instruments, 'serialize'):
+        serialized = []
+        start = 0
+        for group, encoded_jpg, (image_width, image_height), end in zip(groups, images, image_sizes, ends):
+            filename = list_payload(BYTES, [group.filename.encode('utf8')])
+            xmin, xmax, ymin, ymax = (packed_float_payload(column[4 * start:4 * end]) for column in packed)
+            serialized.append(_EXAMPLE_TEMPLATE.encode({
+                'image/height': list_payload(INT64, [image_height]),
+                'image/width': list_payload(INT64, [image_width]),
+                'image/filename': filename,
+                'image/source_id': filename,
+                'image/encoded': list_payload(BYTES, [encoded_jpg]),
+                'image/object/bbox/xmin': xmin,
+                'image/object/bbox/xmax': xmax,
+                'image/object/bbox/ymin': ymin,
+                'image/object/bbox/ymax': ymax,
+                'image/object/class/text': list_payload(BYTES, classes_text[start:end]),
+                'image/object/class/label': list_payload(INT64, classes[start:end]),
+            }))
+            start = end
+    return serialized
+
+
+def create_tf_example(group, path, **example_options):
+    """Return the example of `group` as a tf.train.Example; takes the `example_features` options."""
+    import tensorflow as tf
+    from object_detection.utils import dataset_util
+
+    list_features = {'bytes_list': dataset_util.bytes_list_feature,
+                     'float_list': dataset_util.float_list_feature,
+                     'int64_list': dataset_util.int64_list_feature}
+    features = example_features(group, path, **example_options)
+    return tf.train.Example(features=tf.train.Features(feature=dict(
+        (name, list_features[kind](values)) for name, (kind, values) in features.items())))
+
+
+def shard_path(output_path, shard, num_shards):
+    return '{}-{:05d}-of-{:05d}'.format(output_path, shard, num_shards)
+
 
+def assign_shards(grouped, num_shards):
+    """Deterministically assign the i-th group to shard i % num_shards."""
+    shards = [[] for _ in range(num_shards)]
+    for index, group in enumerate(grouped):
+        shards[index % num_shards].append(group)
+    return shards
+
+
+def annotation_hash(group, example_options):
+    """Hash everything besides the image bytes that goes into the example of `group`."""
+    digest = hashlib.sha1(group.filename.encode('utf8'))
+    for name in sorted(group.object.keys()):
+        digest.update(repr((name, np.asarray(group.object[name]).tolist())).encode('utf8'))
+    label_map = example_options.get('label_map') or default_label_map()
+    options = [(name, example_options.get(name) or default)
+               for name, default in sorted(EXAMPLE_OPTION_DEFAULTS.items())]
+    digest.update(repr((sorted(label_map.name_to_id.items()), label_map.case_sensitive, options)).encode('utf8'))
+    return digest.hexdigest()
+
+
+class _Fetched(object):
+    """The bytes fetched for one group: its cached serialized example, or else its image."""
+    __slots__ = ('data', 'is_example', 'example_key')
+
+    def __init__(self, data, is_example=False, example_key=None):
+        self.data = data
+        self.is_example = is_example
+        self.example_key = example_key
+
+    def __len__(self):
+        return len(self.data)
+
+
+def _fetch(group, path, example_options, cache):
+    if cache is None:
+        return _Fetched(read_image(path, group.filename))
+    image_hash, encoded_jpg = cache.image_hash(os.path.join(path, group.filename))
+    example_key = cache.example_key(image_hash, annotation_hash(group, example_options))
+    serialized = cache.get(example_key)
+    if serialized is not None:
+        return _Fetched(serialized, True, example_key)
+    if encoded_jpg is None:
+        encoded_jpg = read_image(path, group.filename)
+    return _Fetched(encoded_jpg, False, example_key)
+
+
+def _timed_fetches(fetched, instruments):
+    """Yield (group, fetched, seconds spent waiting for it)."""
+    fetched = iter(fetched)
+    while True:
+        start = time.time()
+        try:
+            group, item = next(fetched)
+        except StopIteration:
+            return
+        seconds = time.time() - start
+        if instruments is not None:
+            instruments.add_stage('read', seconds)
+        yield group, item, seconds
+
+
+def _batches(items, batch_size):
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def bounded_imap(pool, func, iterable, max_in_flight):
+    """Ordered `pool.imap` that never has more than `max_in_flight` tasks queued."""
+    pending = deque()
+    for item in iterable:
+        pending.append(pool.apply_async(func, (item,)))
+        if len(pending) >= max_in_flight:
+            yield pending.popleft().get()
+    while pending:
+        yield pending.popleft().get()
+
+
+def serialize_examples(groups, path, example_options, num_prefetch=0, read_stats=None, cache=None,
+                       instruments=None, batch_size=DEFAULT_BATCH_SIZE):
+    """Yield the serialized example of every group in order.
+
+    With `num_prefetch > 0` the images are read on a thread pool, up to
+    `num_prefetch` ahead of the example being built. Examples are built
+    `batch_size` at a time by `serialize_batch`. With an `ExampleCache`,
+    examples whose image and annotations are unchanged are read back from the
+    cache instead of being rebuilt, and new ones are added to it. Stage
+    timings and per-example totals are added to `instruments`; `read` is the
+    time spent waiting for image (or cached example) bytes, and every example
+    of a batch is charged an equal share of its build time.
+    """
+    fetch = functools.partial(_fetch, path=path, example_options=example_options, cache=cache)
+    if num_prefetch > 0:
+        fetched = prefetch(groups, fetch, num_prefetch, read_stats)
+    else:
+        fetched = ((group, fetch(group)) for group in groups)
+    for batch in _batches(_timed_fetches(fetched, instruments), batch_size):
+        misses = [index for index, (_, item, _) in enumerate(batch) if not item.is_example]
+        built = {}
+        build_seconds = 0
+        if misses:
+            start = time.time()
+            serialized = serialize_batch([batch[index][0] for index in misses], path,
+                                         encoded_images=[batch[index][1].data for index in misses],
+                                         instruments=instruments, **example_options)
+            build_seconds = (time.time() - start) / len(misses)
+            built = dict(zip(misses, serialized))
+        for index, (group, item, seconds) in enumerate(batch):
+            if index in built:
+                serialized = built[index]
+                seconds += build_seconds
+                if cache is not None:
+                    cache.put(item.example_key, serialized)
+            else:
+                serialized = item.data
+            if instruments is not None:
+                instruments.add_example(group.filename, len(serialized), seconds)
+            yield serialized
+
+
+def _serialize_groups(args):
+    groups, path, example_options, num_prefetch, cache, instruments = args
+    read_stats = ReadStats()
+    serialized = list(serialize_examples(groups, path, example_options, num_prefetch, read_stats, cache,
+                                         instruments, batch_size=len(groups)))
+    return serialized, read_stats, cache, instruments
+
+
+def _write_shard(args, progress=None):
+    shard, groups, path, output_path, example_options, num_prefetch, cache, instruments = args
+    read_stats = ReadStats()
+    tmp_path = temporary_path(output_path)
+    writer = open_writer(tmp_path)
+    for serialized in serialize_examples(groups, path, example_options, num_prefetch, read_stats, cache, instruments):
+        with timed(instruments, 'write'):
+            writer.write(serialized)
+        if progress is not None:
+            progress.update(1, len(serialized))
     writer.close()
-    output_path = os.path.join(os.getcwd(), FLAGS.output_path)
+    publish(tmp_path, output_path)
+    return shard, read_stats, cache, instruments
+
+
+def temporary_path(output_path):
+    # Remote file systems cannot rename atomically, so their files are written in place.
+    return output_path if '://' in output_path else output_path + '.tmp'
+
+
+def publish(tmp_path, output_path):
+    """Move a finished file into place, so a file at `output_path` is always complete."""
+    if tmp_path != output_path:
+        os.replace(tmp_path, output_path)
+
+
+def shard_key(groups, example_options):
+    """Hash the annotations and options of the examples of a shard, for a `ShardCheckpoint`."""
+    digest = hashlib.sha1()
+    for group in groups:
+        digest.update(annotation_hash(group, example_options).encode('ascii'))
+    return digest.hexdigest()
+
+
+def _merge_worker_results(cache, instruments, worker_cache, worker_instruments):
+    if cache is not None:
+        cache.hits += worker_cache.hits
+        cache.misses += worker_cache.misses
+    if instruments is not None:
+        instruments.merge(worker_instruments)
+
+
+def write_records(grouped, path, output_path, num_shards=1, num_workers=1, example_options=None,
+                  num_prefetch=0, read_stats=None, cache=None, instruments=None, progress=None, checkpoint=None):
+    """Write one example per group to `output_path`, or to `num_shards` shard files.
+
+    With `num_shards > 1` every shard is built and written by its own task on a
+    pool of `num_workers` processes. With a single output file the workers
+    build and serialize the examples while the parent writes them in order.
+    `example_options` are passed on to `create_tf_example`. `num_prefetch`
+    image reads are kept in flight by every loop reading images: each shard
+    writer, or with a single output file and workers, each worker's batch of
+    examples. Their throughput is added to `read_stats`. An `ExampleCache` skips rebuilding unchanged
+    examples. Stage timings go to `instruments`, and `progress` is updated as
+    examples (or, with a pool of shard writers, whole shards) complete.
+
+    Files are written under a temporary name and renamed once complete. With
+    a `ShardCheckpoint`, every completed shard is recorded and shards
+    completed by an earlier, interrupted run are skipped; the output is the
+    same as an uninterrupted run's. Returns the list of files written.
+    """
+    example_options = example_options or {}
+    # Workers fill their own Instrumentation, which is merged back here.
+    worker_instruments = Instrumentation(instruments.num_slowest) if instruments is not None else None
+    if num_shards > 1:
+        output_paths = [shard_path(output_path, shard, num_shards) for shard in range(num_shards)]
+        shards = assign_shards(grouped, num_shards)
+    else:
+        output_paths = [output_path]
+        shards = [grouped]
+    keys = [shard_key(groups, example_options) for groups in shards] if checkpoint is not None else None
+    pending = []
+    for shard, (groups, shard_output) in enumerate(zip(shards, output_paths)):
+        if checkpoint is not None and checkpoint.is_complete(shard, keys[shard], shard_output):
+            if progress is not None:
+                progress.update(len(groups), os.path.getsize(shard_output))
+        else:
+            pending.append(shard)
+
+    def shard_done(shard, stats):
+        if read_stats is not None:
+            read_stats.merge(stats)
+        if checkpoint is not None:
+            checkpoint.mark_complete(shard, keys[shard])
+
+    if num_shards > 1:
+        if num_workers > 1:
+            tasks = [(shard, shards[shard], path, output_paths[shard], example_options, num_prefetch, cache,
+                      worker_instruments) for shard in pending]
+            pool = multiprocessing.Pool(num_workers)
+            try:
+                for shard, stats, worker_cache, shard_instruments in pool.imap_unordered(_write_shard, tasks, 1):
+                    _merge_worker_results(cache, instruments, worker_cache, shard_instruments)
+                    if progress is not None and shard_instruments is not None:
+                        progress.update(shard_instruments.examples, shard_instruments.bytes)
+                    shard_done(shard, stats)
+            finally:
+                pool.close()
+                pool.join()
+        else:
+            for shard in pending:
+                _, stats, _, _ = _write_shard((shard, shards[shard], path, output_paths[shard], example_options,
+                                               num_prefetch, cache, instruments), progress)
+                shard_done(shard, stats)
+        return output_paths
+
+    if not pending:
+        return output_paths
+    tmp_path = temporary_path(output_path)
+    writer = open_writer(tmp_path)
+    if num_workers > 1:
+        pool = multiprocessing.Pool(num_workers)
+        try:
+            tasks = ((groups, path, example_options, num_prefetch, cache, worker_instruments)
+                     for groups in _batches(grouped, DEFAULT_BATCH_SIZE))
+            # Built batches wait for the writer, so only a few per worker are kept in flight.
+            for batch, stats, worker_cache, batch_instruments in bounded_imap(pool, _serialize_groups, tasks,
+                                                                              4 * num_workers):
+                for serialized in batch:
+                    with timed(instruments, 'write'):
+                        writer.write(serialized)
+                    if progress is not None:
+                        progress.update(1, len(serialized))
+                _merge_worker_results(cache, instruments, worker_cache, batch_instruments)
+                if read_stats is not None:
+                    read_stats.merge(stats)
+        finally:
+            pool.close()
+            pool.join()
+    else:
+        for serialized in serialize_examples(grouped, path, example_options, num_prefetch, read_stats, cache,
+                                             instruments):
+            with timed(instruments, 'write'):
+                writer.write(serialized)
+            if progress is not None:
+                progress.update(1, len(serialized))
+    writer.close()
+    publish(tmp_path, output_path)
+    if checkpoint is not None:
+        checkpoint.mark_complete(0, keys[0])
+    return output_paths
+
+
+def add_example_arguments(parser):
+    """Add the arguments shared by the scripts writing records to an argparse `parser`."""
+    parser.add_argument('--output_path', default='', help='Path to output TFRecord')
+    parser.add_argument('--image_dir', default='', help='Path to images')
+    parser.add_argument('--num_shards', type=int, default=1,
+                        help='Number of output files, named <output_path>-00000-of-0000N')
+    parser.add_argument('--num_workers', type=int, default=1, help='Number of processes building examples')
+    parser.add_argument('--verify_dimensions', action='store_true',
+                        help='Check the csv width/height against the image header and warn on mismatches')
+    parser.add_argument('--max_image_side', type=int, default=0,
+                        help='Downscale images whose longer side exceeds this many pixels (0 keeps them)')
+    parser.add_argument('--jpeg_quality', type=int, default=0,
+                        help='Re-encode every image as JPEG at this quality (0 keeps the source encoding)')
+    parser.add_argument('--prefetch', type=int, default=0,
+                        help='Number of image reads kept in flight ahead of example building (0 disables)')
+    parser.add_argument('--label_map_path', default=DEFAULT_LABEL_MAP_PATH, help='Path to the label map pbtxt')
+    parser.add_argument('--case_sensitive_labels', action='store_true',
+                        help='Match class names to the label map case-sensitively')
+    parser.add_argument('--skip_unknown_classes', action='store_true',
+                        help='Drop boxes whose class is not in the label map instead of failing')
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Convert a label csv and its images into TFRecords.')
+    parser.add_argument('--csv_input', default='', help='Path to the CSV input, or to a label store directory')
+    add_example_arguments(parser)
+    parser.add_argument('--cache_dir', default='',
+                        help='Reuse serialized examples of unchanged images and annotations from here')
+    parser.add_argument('--cache_max_bytes', type=int, default=DEFAULT_MAX_BYTES,
+                        help='Evict least recently used cache entries beyond this size')
+    parser.add_argument('--checkpoint_path', default='',
+                        help='Record completed shards here and skip them when an interrupted run is restarted '
+                             '(needs --num_shards > 1)')
+    parser.add_argument('--box_policy', default=DEFAULT_POLICY, choices=POLICIES,
+                        help='Clip boxes sticking out of the image and drop other invalid boxes, drop all, or fail')
+    parser.add_argument('--validation_report', default='',
+                        help='Write the invalid boxes and what was done with them to this csv')
+    parser.add_argument('--progress_every', type=float, default=10,
+                        help='Print progress and an ETA every this many seconds (0 disables)')
+    parser.add_argument('--stats_output', default='',
+                        help='Write per-stage timings, totals and the slowest images as json here')
+    parser.add_argument('--profile_output', default='', help='Profile the run with cProfile and dump the stats here')
+    args = parser.parse_args(argv)
+    if args.checkpoint_path and args.num_shards <= 1:
+        # A single file is only complete at the end, so it could not be resumed.
+        parser.error('--checkpoint_path needs --num_shards > 1')
+    return args
+
+
+def example_options_from_args(args, label_map):
+    """Return the create_tf_example options selected on the command line."""
+    return {'verify_dimensions': args.verify_dimensions,
+            'label_map': label_map,
+            'skip_unknown_classes': args.skip_unknown_classes,
+            'max_image_side': args.max_image_side or None,
+            'jpeg_quality': args.jpeg_quality or None}
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    path = os.path.join(args.image_dir)
+    label_map = LabelMap.from_file(args.label_map_path, case_sensitive=args.case_sensitive_labels)
+    store = LabelStore(args.csv_input) if is_label_store(args.csv_input) else None
+    if store is not None and not has_invalid_boxes(store_box_frame(store)):
+        # A valid store is read straight from its memory-mapped arrays.
+        class_counts = store.class_counts()
+        names = list(class_counts)
+        unknown = Counter(dict((name, class_counts[name])
+                               for name, class_id in zip(names, label_map.lookup(names)) if class_id < 0))
+        grouped = split_store(store)
+    else:
+        examples = store.to_dataframe() if store is not None else pd.read_csv(args.csv_input)
+        examples, issues = validate_boxes(examples, args.box_policy)
+        if len(issues):
+            print(summarize_issues(issues))
+            if args.validation_report:
+                issues.to_csv(args.validation_report, index=None)
+        unknown = label_map.unknown_classes(examples['class'])
+        grouped = split_columns(examples, 'filename')
+    if unknown:
+        report = ', '.join('{} ({} boxes)'.format(name, count) for name, count in unknown.most_common())
+        if not args.skip_unknown_classes:
+            raise UnknownClassError('Classes not in {}: {}'.format(args.label_map_path, report))
+        print('Skipping boxes of classes not in the label map: {}'.format(report))
+    example_options = example_options_from_args(args, label_map)
+    read_stats = ReadStats()
+    cache = ExampleCache(args.cache_dir, args.cache_max_bytes) if args.cache_dir else None
+    instruments = Instrumentation()
+    progress = Progress(len(grouped), interval=args.progress_every)
+    profiler = cProfile.Profile() if args.profile_output else None
+    if profiler is not None:
+        profiler.enable()
+    checkpoint = ShardCheckpoint(args.checkpoint_path, args.output_path, args.num_shards) \
+        if args.checkpoint_path else None
+    write_records(grouped, path, args.output_path, num_shards=args.num_shards, num_workers=args.num_workers,
+                  example_options=example_options, num_prefetch=args.prefetch, read_stats=read_stats, cache=cache,
+                  instruments=instruments, progress=progress, checkpoint=checkpoint)
+    if checkpoint is not None:
+        checkpoint.remove()
+    if profiler is not None:
+        profiler.disable()
+        # Only the parent process is profiled; with --num_workers the stage timings cover the workers.
+        profiler.dump_stats(args.profile_output)
+    if args.progress_every:
+        print(progress.line())
+        print(instruments.report())
+    if args.stats_output:
+        instruments.write_summary(args.stats_output, wall_seconds=progress.elapsed())
+    if args.prefetch > 0 and read_stats.images:
+        print(read_stats.report())
+    if cache is not None:
+        cache.evict()
+        print(cache.report())
+    output_path = os.path.join(os.getcwd(), args.output_path)
     print('Successfully created the TFRecords: {}'.format(output_path))
 
 
 if __name__ == '__main__':
-    tf.app.run()
+    main()
@@ -0,0 +1,38 @@
+"""
+Shrink and re-encode images before they are stored in the TFRecords.
+"""
+import io
+
+from PIL import Image
+
+
+def scaled_size(width, height, max_side):
+    """Return (width, height) scaled down so that the longer side is at most `max_side`."""
+    if not max_side or max(width, height) <= max_side:
+        return width, height
+    scale = max_side / float(max(width, height))
+    return max(1, int(round(width * scale))), max(1, int(round(height * scale)))
+
+
+def reencode_image(encoded, max_side=None, quality=None):
+    """Return (jpeg bytes, width, height) of `encoded` resized to at most `max_side` pixels per side.
+
+    The image is re-encoded as JPEG at `quality` (default 95). A JPEG that needs
+    no resizing and no explicit quality is returned unchanged.
+    """
+    image = Image.open(io.BytesIO(encoded))
+    width, height = image.size
+    target_width, target_height = scaled_size(width, height, max_side)
+    if (target_width, target_height) == (width, height) and quality is None and image.format == 'JPEG':
+        return encoded, width, height
+
+    if image.format == 'JPEG' and (target_width, target_height) != (width, height):
+        # Let the decoder downscale by a power of two first, which is much cheaper than a full decode.
+        image.draft('RGB', (target_width, target_height))
+    if image.mode not in ('RGB', 'L'):
+        image = image.convert('RGB')
+    if image.size != (target_width, target_height):
+        image = image.resize((target_width, target_height), Image.BILINEAR)
+    output = io.BytesIO()
+    image.save(output, format='JPEG', quality=quality or 95)
+    return output.getvalue(), target_width, target_height
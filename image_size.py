@@ -0,0 +1,71 @@
+"""
+Read the width and height of a JPEG or PNG image from its header only,
+without decoding the image.
+"""
+import io
+import struct
+
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+# Start-of-frame markers carrying the image size (C4, C8 and CC are DHT, JPG and DAC).
+JPEG_SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+
+class UnknownImageFormat(ValueError):
+    pass
+
+
+def _read_exactly(fid, size):
+    data = fid.read(size)
+    if len(data) != size:
+        raise UnknownImageFormat('Truncated image header')
+    return data
+
+
+def _jpeg_size(fid):
+    while True:
+        byte = _read_exactly(fid, 1)
+        # Markers may be preceded by any number of 0xFF fill bytes.
+        while byte != b'\xff':
+            byte = _read_exactly(fid, 1)
+        while byte == b'\xff':
+            byte = _read_exactly(fid, 1)
+        marker = ord(byte)
+        if marker == 0xD8 or marker == 0x01 or 0xD0 <= marker <= 0xD7:
+            continue
+        if marker == 0xD9 or marker == 0xDA:
+            raise UnknownImageFormat('No SOF marker before image data')
+        length, = struct.unpack('>H', _read_exactly(fid, 2))
+        if marker in JPEG_SOF_MARKERS:
+            _, height, width = struct.unpack('>BHH', _read_exactly(fid, 5))
+            return width, height
+        fid.seek(length - 2, io.SEEK_CUR)
+
+
+def _png_size(fid):
+    chunk_length, chunk_type = struct.unpack('>I4s', _read_exactly(fid, 8))
+    if chunk_type != b'IHDR':
+        raise UnknownImageFormat('PNG does not start with an IHDR chunk')
+    width, height = struct.unpack('>II', _read_exactly(fid, 8))
+    return width, height
+
+
+def read_image_size(fid):
+    """Return (width, height) of the JPEG or PNG image in the seekable file object `fid`."""
+    signature = fid.read(2)
+    if signature == b'\xff\xd8':
+        return _jpeg_size(fid)
+    signature += fid.read(len(PNG_SIGNATURE) - 2)
+    if signature == PNG_SIGNATURE:
+        return _png_size(fid)
+    raise UnknownImageFormat('Not a JPEG or PNG image')
+
+
+def get_image_size(encoded):
+    """Return (width, height) of the JPEG or PNG image in the bytes `encoded`."""
+    return read_image_size(io.BytesIO(encoded))
+
+
+def get_image_size_from_file(path):
+    """Return (width, height) of the JPEG or PNG image at `path`, reading only its header."""
+    with open(path, 'rb') as fid:
+        return read_image_size(fid)
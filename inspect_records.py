@@ -0,0 +1,237 @@
+"""
+Usage:
+  # Print statistics of a record file, or of all its shards:
+  python inspect_records.py --record_path=train.record
+
+  # Also check every example against the label csv it was written from:
+  python inspect_records.py --record_path=train.record --csv_input=data/train_labels.csv
+
+The csv boxes are validated with --box_policy and, with --skip_unknown_classes,
+boxes of classes missing from --label_map_path are left out, as when the
+records were written.
+
+Records are streamed and parsed in batches of --batch_size, so memory stays
+flat however large the record files are.
+"""
+from __future__ import division
+from __future__ import print_function
+
+import argparse
+from collections import Counter, OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from generate_tfrecord import DEFAULT_LABEL_MAP_PATH
+from label_map import LabelMap
+from tfrecord_io import iter_batches, record_paths
+from validate_labels import POLICIES, DEFAULT_POLICY, validate_boxes
+
+BOX_KEYS = ['image/object/bbox/xmin', 'image/object/bbox/ymin', 'image/object/bbox/xmax', 'image/object/bbox/ymax']
+
+
+def parse_batch(serialized_batch):
+    """Parse a batch of serialized examples written by `create_tf_example` into columns.
+
+    Per-image columns have one entry per example; `class_text` and `boxes`
+    (xmin, ymin, xmax, ymax, normalized) are concatenated over all examples,
+    `num_boxes` of them per example.
+    """
+    import tensorflow as tf
+
+    filenames, widths, heights, num_boxes, image_bytes = [], [], [], [], []
+    class_text, boxes = [], []
+    for serialized in serialized_batch:
+        feature = tf.train.Example.FromString(serialized).features.feature
+        filenames.append(feature['image/filename'].bytes_list.value[0].decode('utf8'))
+        widths.append(feature['image/width'].int64_list.value[0])
+        heights.append(feature['image/height'].int64_list.value[0])
+        image_bytes.append(len(feature['image/encoded'].bytes_list.value[0]))
+        texts = feature['image/object/class/text'].bytes_list.value
+        num_boxes.append(len(texts))
+        class_text.extend(text.decode('utf8') for text in texts)
+        boxes.append(np.array([feature[key].float_list.value for key in BOX_KEYS], dtype=np.float32).reshape(4, -1).T)
+    return {
+        'filename': filenames,
+        'width': np.array(widths, dtype=np.int64),
+        'height': np.array(heights, dtype=np.int64),
+        'num_boxes': np.array(num_boxes, dtype=np.int64),
+        'record_bytes': np.array([len(serialized) for serialized in serialized_batch], dtype=np.int64),
+        'image_bytes': np.array(image_bytes, dtype=np.int64),
+        'class_text': class_text,
+        'boxes': np.concatenate(boxes) if boxes else np.zeros((0, 4), dtype=np.float32),
+    }
+
+
+class RecordStats(object):
+    """Image count, boxes per image, class histogram and byte sizes of parsed batches."""
+
+    def __init__(self):
+        self.images = 0
+        self.record_bytes = 0
+        self.image_bytes = 0
+        self.max_record_bytes = 0
+        self.boxes_per_image = Counter()
+        self.class_counts = Counter()
+
+    def add_batch(self, parsed):
+        self.images += len(parsed['filename'])
+        self.record_bytes += int(parsed['record_bytes'].sum())
+        self.image_bytes += int(parsed['image_bytes'].sum())
+        self.max_record_bytes = max([self.max_record_bytes] + parsed['record_bytes'].tolist())
+        self.boxes_per_image.update(parsed['num_boxes'].tolist())
+        self.class_counts.update(parsed['class_text'])
+
+    @property
+    def boxes(self):
+        return sum(self.class_counts.values())
+
+    def summary(self):
+        return OrderedDict([
+            ('images', self.images),
+            ('boxes', self.boxes),
+            ('record_bytes', self.record_bytes),
+            ('image_bytes', self.image_bytes),
+            ('max_record_bytes', self.max_record_bytes),
+            ('boxes_per_image', OrderedDict((str(count), images)
+                                            for count, images in sorted(self.boxes_per_image.items()))),
+            ('class_counts', OrderedDict(self.class_counts.most_common())),
+        ])
+
+    def report(self):
+        lines = ['{} images, {} boxes ({:.2f} per image)'.format(
+                     self.images, self.boxes, self.boxes / self.images if self.images else 0.0),
+                 '{:.1f} MB of records, {:.1f} MB of images, {:.1f} KB per record on average, {:.1f} KB at most'.format(
+                     self.record_bytes / 1e6, self.image_bytes / 1e6,
+                     self.record_bytes / self.images / 1e3 if self.images else 0.0, self.max_record_bytes / 1e3),
+                 'Boxes per image: {}'.format(', '.join(
+                     '{}: {}'.format(count, images) for count, images in sorted(self.boxes_per_image.items()))),
+                 'Classes: {}'.format(', '.join(
+                     '{} ({})'.format(name, count) for name, count in self.class_counts.most_common()))]
+        return '\n'.join(lines)
+
+
+class RecordVerifier(object):
+    """Checks parsed batches against the label table they were written from.
+
+    Every image of the table must be in the records exactly once, with the
+    same classes and the same boxes, normalized by the table's width and
+    height, in table order. With a `label_map`, boxes of classes missing from
+    it are expected to have been skipped, as `--skip_unknown_classes` does.
+    """
+
+    def __init__(self, labels, tolerance=1e-4, max_examples=20, label_map=None):
+        labels = labels.sort_values('filename', kind='mergesort')
+        filenames = np.asarray(labels['filename'].values, dtype=object)
+        boundaries = np.flatnonzero(filenames[1:] != filenames[:-1]) + 1
+        starts = np.concatenate([[0], boundaries]) if len(filenames) else boundaries
+        ends = np.concatenate([boundaries, [len(filenames)]]) if len(filenames) else boundaries
+        self.filenames = filenames[starts]
+        self.index = dict((filename, image) for image, filename in enumerate(self.filenames))
+        known = np.ones(len(labels), dtype=bool) if label_map is None else label_map.lookup(labels['class']) >= 0
+        # Images keep their place even when all of their boxes were skipped.
+        known_offsets = np.concatenate([[0], np.cumsum(known)])
+        self.starts = known_offsets[starts]
+        self.ends = known_offsets[ends]
+        labels = labels[known]
+        self.classes = np.asarray(labels['class'].values, dtype=object)
+        width = np.asarray(labels['width'].values, dtype=np.float64)
+        height = np.asarray(labels['height'].values, dtype=np.float64)
+        self.boxes = np.stack([np.asarray(labels['xmin'].values) / width, np.asarray(labels['ymin'].values) / height,
+                               np.asarray(labels['xmax'].values) / width, np.asarray(labels['ymax'].values) / height],
+                              axis=1)
+        self.seen = np.zeros(len(self.starts), dtype=bool)
+        self.tolerance = tolerance
+        self.max_examples = max_examples
+        self.mismatches = Counter()
+        self.examples = []
+
+    def _mismatch(self, filename, kind):
+        self.mismatches[kind] += 1
+        if len(self.examples) < self.max_examples:
+            self.examples.append((filename, kind))
+
+    def add_batch(self, parsed):
+        box_ends = np.cumsum(parsed['num_boxes'])
+        for filename, box_end, num_boxes in zip(parsed['filename'], box_ends, parsed['num_boxes']):
+            image = self.index.get(filename)
+            if image is None:
+                self._mismatch(filename, 'not_in_csv')
+                continue
+            if self.seen[image]:
+                self._mismatch(filename, 'duplicate')
+                continue
+            self.seen[image] = True
+            start, end = self.starts[image], self.ends[image]
+            if num_boxes != end - start:
+                self._mismatch(filename, 'box_count')
+                continue
+            box_start = box_end - num_boxes
+            if parsed['class_text'][box_start:box_end] != self.classes[start:end].tolist():
+                self._mismatch(filename, 'classes')
+            elif not np.allclose(parsed['boxes'][box_start:box_end], self.boxes[start:end], atol=self.tolerance):
+                self._mismatch(filename, 'boxes')
+
+    def finish(self):
+        """Count the images of the table that never showed up in the records."""
+        for image in np.flatnonzero(~self.seen):
+            self._mismatch(self.filenames[image], 'missing_from_records')
+        self.seen[:] = True
+
+    def report(self):
+        if not self.mismatches:
+            return 'All records match the csv.'
+        lines = ['Mismatches: {}'.format(', '.join(
+            '{} ({})'.format(kind, count) for kind, count in self.mismatches.most_common()))]
+        lines.extend('  {}: {}'.format(filename, kind) for filename, kind in self.examples)
+        return '\n'.join(lines)
+
+
+def inspect_records(record_path, batch_size=256, labels=None, label_map=None):
+    """Stream the records at `record_path` (a file, or sharded files) and return (stats, verifier).
+
+    The verifier is None unless a label table is given in `labels`; see
+    `RecordVerifier` for `label_map`.
+    """
+    stats = RecordStats()
+    verifier = RecordVerifier(labels, label_map=label_map) if labels is not None else None
+    for batch in iter_batches(record_paths(record_path), batch_size):
+        parsed = parse_batch(batch)
+        stats.add_batch(parsed)
+        if verifier is not None:
+            verifier.add_batch(parsed)
+    if verifier is not None:
+        verifier.finish()
+    return stats, verifier
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Print statistics of TFRecords and check them against a csv.')
+    parser.add_argument('--record_path', required=True, help='Record file, sharded record base path or glob')
+    parser.add_argument('--csv_input', default='', help='Label csv the records were written from')
+    parser.add_argument('--batch_size', type=int, default=256, help='Number of records parsed at a time')
+    parser.add_argument('--box_policy', default=DEFAULT_POLICY, choices=POLICIES,
+                        help='Box policy the records were written with')
+    parser.add_argument('--label_map_path', default=DEFAULT_LABEL_MAP_PATH, help='Path to the label map pbtxt')
+    parser.add_argument('--case_sensitive_labels', action='store_true',
+                        help='Match class names to the label map case-sensitively')
+    parser.add_argument('--skip_unknown_classes', action='store_true',
+                        help='The records were written without the boxes of classes missing from the label map')
+    args = parser.parse_args(argv)
+
+    labels = None
+    if args.csv_input:
+        labels, _ = validate_boxes(pd.read_csv(args.csv_input), args.box_policy)
+    label_map = LabelMap.from_file(args.label_map_path, case_sensitive=args.case_sensitive_labels) \
+        if args.skip_unknown_classes else None
+    stats, verifier = inspect_records(args.record_path, batch_size=args.batch_size, labels=labels,
+                                      label_map=label_map)
+    print(stats.report())
+    if verifier is not None:
+        print(verifier.report())
+        if verifier.mismatches:
+            raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,128 @@
+"""
+Per-stage timing, progress reporting and run statistics for record writing.
+"""
+from __future__ import division
+from __future__ import print_function
+
+import sys
+import json
+import time
+import heapq
+from collections import OrderedDict
+from contextlib import contextmanager
+
+STAGES = ('read', 'dimensions', 'build', 'resize', 'serialize', 'write')
+
+
+class Instrumentation(object):
+    """Seconds spent per stage, examples and bytes written, and the slowest examples."""
+
+    def __init__(self, num_slowest=10):
+        self.stage_seconds = OrderedDict((stage, 0.0) for stage in STAGES)
+        self.examples = 0
+        self.bytes = 0
+        self.num_slowest = num_slowest
+        self._slowest = []
+
+    def add_stage(self, stage, seconds):
+        self.stage_seconds[stage] = self.stage_seconds.get(stage, 0.0) + seconds
+
+    def add_example(self, filename, num_bytes, seconds):
+        self.examples += 1
+        self.bytes += num_bytes
+        entry = (seconds, filename)
+        if len(self._slowest) < self.num_slowest:
+            heapq.heappush(self._slowest, entry)
+        elif entry > self._slowest[0]:
+            heapq.heapreplace(self._slowest, entry)
+
+    def merge(self, other):
+        for stage, seconds in other.stage_seconds.items():
+            self.add_stage(stage, seconds)
+        self.examples += other.examples
+        self.bytes += other.bytes
+        for entry in other._slowest:
+            if len(self._slowest) < self.num_slowest:
+                heapq.heappush(self._slowest, entry)
+            elif entry > self._slowest[0]:
+                heapq.heapreplace(self._slowest, entry)
+
+    def slowest(self):
+        """Return [(seconds, filename)] of the slowest examples, slowest first."""
+        return sorted(self._slowest, reverse=True)
+
+    def summary(self, wall_seconds=None):
+        summary = OrderedDict([
+            ('examples', self.examples),
+            ('bytes', self.bytes),
+            ('stage_seconds', self.stage_seconds),
+            ('slowest_examples', [OrderedDict([('filename', filename), ('seconds', seconds)])
+                                  for seconds, filename in self.slowest()]),
+        ])
+        if wall_seconds is not None:
+            summary['wall_seconds'] = wall_seconds
+            summary['examples_per_sec'] = self.examples / wall_seconds if wall_seconds > 0 else None
+            summary['bytes_per_sec'] = self.bytes / wall_seconds if wall_seconds > 0 else None
+        return summary
+
+    def write_summary(self, path, wall_seconds=None):
+        with open(path, 'w') as fid:
+            json.dump(self.summary(wall_seconds), fid, indent=2)
+
+    def report(self):
+        """Return a table of the time spent per stage."""
+        total = sum(self.stage_seconds.values())
+        lines = ['{:<12} {:>10} {:>7}'.format('stage', 'seconds', 'share')]
+        for stage, seconds in self.stage_seconds.items():
+            lines.append('{:<12} {:>10.3f} {:>6.1f}%'.format(stage, seconds, 100.0 * seconds / total if total else 0.0))
+        return '\n'.join(lines)
+
+
+@contextmanager
+def timed(instruments, stage):
+    """Add the time spent in the block to `stage` of `instruments`, if there are any."""
+    if instruments is None:
+        yield
+        return
+    start = time.time()
+    try:
+        yield
+    finally:
+        instruments.add_stage(stage, time.time() - start)
+
+
+def _format_seconds(seconds):
+    seconds = int(seconds)
+    return '{}:{:02d}:{:02d}'.format(seconds // 3600, seconds // 60 % 60, seconds % 60)
+
+
+class Progress(object):
+    """Prints examples/s, MB/s and an ETA at most every `interval` seconds."""
+
+    def __init__(self, total, interval=10.0, stream=None):
+        self.total = total
+        self.interval = interval
+        self.stream = stream or sys.stdout
+        self.examples = 0
+        self.bytes = 0
+        self.start = time.time()
+        self._last_report = self.start
+
+    def update(self, examples=1, num_bytes=0):
+        self.examples += examples
+        self.bytes += num_bytes
+        now = time.time()
+        if self.interval and now - self._last_report >= self.interval:
+            self._last_report = now
+            print(self.line(now), file=self.stream)
+
+    def line(self, now=None):
+        elapsed = (now or time.time()) - self.start
+        rate = self.examples / elapsed if elapsed > 0 else 0.0
+        eta = (self.total - self.examples) / rate if rate > 0 else float('nan')
+        return '{}/{} examples, {:.1f} examples/s, {:.1f} MB/s, elapsed {}, ETA {}'.format(
+            self.examples, self.total, rate, self.bytes / 1e6 / elapsed if elapsed > 0 else 0.0,
+            _format_seconds(elapsed), _format_seconds(eta) if eta == eta else '?')
+
+    def elapsed(self):
+        return time.time() - self.start
@@ -0,0 +1,73 @@
+"""
+Load an object detection label map (.pbtxt) into a lookup table that maps
+whole class columns to ids at once.
+"""
+import re
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+
+ITEM_PATTERN = re.compile(r'item\s*\{(.*?)\}', re.DOTALL)
+ID_PATTERN = re.compile(r'\bid\s*:\s*(\d+)')
+NAME_PATTERN = re.compile(r'\bname\s*:\s*([\'"])(.*?)\1')
+
+
+class UnknownClassError(ValueError):
+    pass
+
+
+def parse_label_map(text):
+    """Return the {name: id} mapping of the items in a label map pbtxt string."""
+    name_to_id = {}
+    for item in ITEM_PATTERN.findall(text):
+        id_match = ID_PATTERN.search(item)
+        name_match = NAME_PATTERN.search(item)
+        if id_match is None or name_match is None:
+            raise ValueError('Label map item without id or name: {}'.format(item.strip()))
+        name_to_id[name_match.group(2)] = int(id_match.group(1))
+    return name_to_id
+
+
+class LabelMap(object):
+    """Class name to id table, optionally matching names case-insensitively."""
+
+    def __init__(self, name_to_id, case_sensitive=False):
+        self.case_sensitive = case_sensitive
+        self.name_to_id = {}
+        for name, class_id in name_to_id.items():
+            key = self._key(name)
+            if key in self.name_to_id and self.name_to_id[key] != class_id:
+                raise ValueError('Class {} has several ids once case is ignored'.format(name))
+            self.name_to_id[key] = class_id
+
+    @classmethod
+    def from_file(cls, path, case_sensitive=False):
+        with open(path) as fid:
+            return cls(parse_label_map(fid.read()), case_sensitive=case_sensitive)
+
+    def _key(self, name):
+        return name if self.case_sensitive else name.lower()
+
+    def __getitem__(self, name):
+        try:
+            return self.name_to_id[self._key(name)]
+        except KeyError:
+            raise UnknownClassError('Class {} is not in the label map'.format(name))
+
+    def lookup(self, names):
+        """Return the ids of a column of class names, -1 where a name is unknown.
+
+        Each distinct name is looked up once and the ids are scattered back
+        over the column.
+        """
+        codes, uniques = pd.factorize(np.asarray(names, dtype=object))
+        table = np.array([self.name_to_id.get(self._key(name), -1) for name in uniques] + [-1],
+                         dtype=np.int64)
+        # factorize marks missing values with -1, which picks the trailing -1 entry.
+        return table[codes]
+
+    def unknown_classes(self, names):
+        """Return a Counter of the names in a class column that are not in the label map."""
+        names = np.asarray(names, dtype=object)
+        return Counter(names[self.lookup(names) < 0].tolist())
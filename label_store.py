@@ -0,0 +1,129 @@
+"""
+Compact binary alternative to the label csv files.
+
+A label store is a directory of NumPy arrays that are opened memory-mapped:
+
+  boxes.npy          int32 (num_boxes, 4) xmin, ymin, xmax, ymax
+  box_class.npy      int32 (num_boxes,) index into the class vocabulary
+  image_size.npy     int32 (num_images, 2) width, height
+  image_offsets.npy  int64 (num_images + 1,) first box of every image
+  vocab.json         file names (one per image, sorted) and class names
+
+Boxes are stored grouped by image, so the boxes of one image are a slice.
+"""
+import os
+import json
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+
+from validate_labels import column_name
+
+STORE_VERSION = 1
+VOCAB_FILE = 'vocab.json'
+BOX_COLUMNS = ['xmin', 'ymin', 'xmax', 'ymax']
+
+
+def is_label_store(path):
+    return os.path.isfile(os.path.join(path, VOCAB_FILE))
+
+
+def _int32_column(df, name):
+    values = np.asarray(df[name].values)
+    if not np.issubdtype(values.dtype, np.integer):
+        raise ValueError('Column {} must hold integers to go into a label store'.format(name))
+    return values.astype(np.int32)
+
+
+def write_label_store(df, path):
+    """Write the label table `df` (the xml_to_csv columns) as a label store in directory `path`.
+
+    The width and height of an image are taken from its first box.
+    """
+    df = df.sort_values('filename', kind='mergesort')
+    filenames, image_index = np.unique(np.asarray(df['filename'].values, dtype=object), return_inverse=True)
+    classes, box_class = np.unique(np.asarray(df['class'].values, dtype=object), return_inverse=True)
+    offsets = np.concatenate([[0], np.cumsum(np.bincount(image_index, minlength=len(filenames)))])
+    first_rows = offsets[:-1]
+    image_size = np.stack([_int32_column(df, 'width')[first_rows],
+                           _int32_column(df, 'height')[first_rows]], axis=1)
+    boxes = np.stack([_int32_column(df, name) for name in BOX_COLUMNS], axis=1)
+
+    if not os.path.isdir(path):
+        os.makedirs(path)
+    np.save(os.path.join(path, 'boxes.npy'), boxes)
+    np.save(os.path.join(path, 'box_class.npy'), box_class.astype(np.int32))
+    np.save(os.path.join(path, 'image_size.npy'), image_size.reshape(-1, 2).astype(np.int32))
+    np.save(os.path.join(path, 'image_offsets.npy'), offsets.astype(np.int64))
+    # The vocabulary goes last: its presence marks a complete store.
+    with open(os.path.join(path, VOCAB_FILE), 'w') as fid:
+        json.dump({'version': STORE_VERSION, 'filenames': filenames.tolist(), 'classes': classes.tolist()}, fid)
+
+
+class LabelStore(object):
+    """Memory-mapped, read-only view of a label store."""
+
+    def __init__(self, path):
+        with open(os.path.join(path, VOCAB_FILE)) as fid:
+            vocab = json.load(fid)
+        if vocab.get('version') != STORE_VERSION:
+            raise ValueError('Unsupported label store version {}'.format(vocab.get('version')))
+        self.path = path
+        self.filenames = vocab['filenames']
+        self.classes = np.asarray(vocab['classes'], dtype=object)
+        self.boxes = np.load(os.path.join(path, 'boxes.npy'), mmap_mode='r')
+        self.box_class = np.load(os.path.join(path, 'box_class.npy'), mmap_mode='r')
+        self.image_size = np.load(os.path.join(path, 'image_size.npy'), mmap_mode='r')
+        self.image_offsets = np.load(os.path.join(path, 'image_offsets.npy'), mmap_mode='r')
+        self._index = None
+
+    def __len__(self):
+        return len(self.filenames)
+
+    @property
+    def num_boxes(self):
+        return len(self.boxes)
+
+    def index_of(self, filename):
+        if self._index is None:
+            self._index = dict((name, index) for index, name in enumerate(self.filenames))
+        return self._index[filename]
+
+    def image_boxes(self, index):
+        """Return (filename, {column: array}) for the `index`-th image, without copying its boxes."""
+        start, end = self.image_offsets[index], self.image_offsets[index + 1]
+        boxes = self.boxes[start:end]
+        num_boxes = end - start
+        width, height = self.image_size[index]
+        columns = {
+            'filename': np.full(num_boxes, self.filenames[index], dtype=object),
+            'width': np.full(num_boxes, width, dtype=np.int32),
+            'height': np.full(num_boxes, height, dtype=np.int32),
+            'class': self.classes[self.box_class[start:end]],
+        }
+        for column, name in enumerate(BOX_COLUMNS):
+            columns[name] = boxes[:, column]
+        return self.filenames[index], columns
+
+    def boxes_for(self, filename):
+        """Return the {column: array} boxes of the image `filename`."""
+        return self.image_boxes(self.index_of(filename))[1]
+
+    def class_counts(self):
+        """Return a Counter of boxes per class name."""
+        counts = np.bincount(self.box_class, minlength=len(self.classes))
+        return Counter(dict(zip(self.classes.tolist(), counts.tolist())))
+
+    def to_dataframe(self):
+        """Return the store as a label table with the xml_to_csv columns."""
+        boxes_per_image = np.diff(self.image_offsets)
+        data = {
+            'filename': np.repeat(np.asarray(self.filenames, dtype=object), boxes_per_image),
+            'width': np.repeat(self.image_size[:, 0], boxes_per_image).astype(np.int64),
+            'height': np.repeat(self.image_size[:, 1], boxes_per_image).astype(np.int64),
+            'class': self.classes[self.box_class],
+        }
+        for column, name in enumerate(BOX_COLUMNS):
+            data[name] = np.asarray(self.boxes[:, column]).astype(np.int64)
+        return pd.DataFrame(data, columns=column_name)
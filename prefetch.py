@@ -0,0 +1,126 @@
+"""
+Read image bytes ahead of the consumer on a thread pool, so slow or remote
+storage overlaps with example building instead of stalling it.
+"""
+from __future__ import division
+
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+
+class ReadStats(object):
+    """Counts the images and bytes read and the time spent reading them.
+
+    `read_seconds` sums the duration of every read, `busy_seconds` is the
+    time at least one read was in flight, and `wall_seconds` runs from the
+    first read until the consumer took the last image, so it also covers the
+    time spent building and writing examples.
+
+    Stats of several reading loops (shards or worker batches) are combined
+    with `merge`. Their reads may overlap in time, so merged stats measure
+    the throughput over `wall_seconds` instead of `busy_seconds`.
+    """
+
+    def __init__(self):
+        self.images = 0
+        self.bytes = 0
+        self.read_seconds = 0.0
+        self.busy_seconds = 0.0
+        self.loops = 0
+        self.started = None
+        self.finished = None
+        self._busy_until = None
+
+    @property
+    def wall_seconds(self):
+        return self.finished - self.started if self.started is not None else 0.0
+
+    def start(self):
+        """Start timing one reading loop."""
+        self.loops = 1
+        self.started = time.time()
+        self.finished = self.started
+
+    def add(self, num_bytes, start, end):
+        self.images += 1
+        self.bytes += num_bytes
+        self.read_seconds += end - start
+        # Reads finish roughly in the order they started, so the union of
+        # their intervals only has to be extended at its end.
+        if self._busy_until is None or start >= self._busy_until:
+            self.busy_seconds += end - start
+            self._busy_until = end
+        elif end > self._busy_until:
+            self.busy_seconds += end - self._busy_until
+            self._busy_until = end
+        self.finished = time.time()
+
+    def merge(self, other):
+        if other.started is None:
+            return
+        self.images += other.images
+        self.bytes += other.bytes
+        self.read_seconds += other.read_seconds
+        self.busy_seconds += other.busy_seconds
+        self.loops += other.loops
+        self.started = other.started if self.started is None else min(self.started, other.started)
+        self.finished = other.finished if self.finished is None else max(self.finished, other.finished)
+
+    def _seconds(self):
+        return self.busy_seconds if self.loops <= 1 else self.wall_seconds
+
+    def throughput(self):
+        """Return the read throughput in bytes per second.
+
+        For one loop it is measured while reads were in flight, for merged
+        loops over their wall time.
+        """
+        seconds = self._seconds()
+        return self.bytes / seconds if seconds > 0 else 0.0
+
+    def report(self):
+        seconds = self._seconds()
+        images_per_second = self.images / seconds if seconds > 0 else 0.0
+        if self.loops <= 1:
+            return ('Read {} images ({:.1f} MB) at {:.1f} MB/s, {:.1f} images/s: reads were in flight for '
+                    '{:.2f}s of {:.2f}s and took {:.2f}s in total').format(
+                self.images, self.bytes / 1e6, self.throughput() / 1e6, images_per_second,
+                self.busy_seconds, self.wall_seconds, self.read_seconds)
+        return ('Read {} images ({:.1f} MB) in {} reading loops at {:.1f} MB/s, {:.1f} images/s over {:.2f}s; '
+                'reads took {:.2f}s in total').format(
+            self.images, self.bytes / 1e6, self.loops, self.throughput() / 1e6, images_per_second,
+            self.wall_seconds, self.read_seconds)
+
+
+def _timed_read(read_fn, item):
+    start = time.time()
+    data = read_fn(item)
+    return data, start, time.time()
+
+
+def prefetch(items, read_fn, max_in_flight=8, stats=None):
+    """Yield (item, read_fn(item)) in order, with up to `max_in_flight` reads running ahead.
+
+    Reads run on a pool of `max_in_flight` threads; `read_fn` should release
+    the GIL while waiting on I/O, as file reads do. If `stats` is given it is
+    updated with every read.
+    """
+    if stats is not None:
+        stats.start()
+    pending = deque()
+    with ThreadPoolExecutor(max_workers=max_in_flight) as executor:
+        for item in items:
+            pending.append((item, executor.submit(_timed_read, read_fn, item)))
+            if len(pending) >= max_in_flight:
+                yield _finish(pending.popleft(), stats)
+        while pending:
+            yield _finish(pending.popleft(), stats)
+
+
+def _finish(entry, stats):
+    item, future = entry
+    data, read_start, read_end = future.result()
+    if stats is not None:
+        stats.add(len(data), read_start, read_end)
+    return item, data
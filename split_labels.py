@@ -0,0 +1,128 @@
+"""
+Usage:
+  # Split the full labels 80/20 into train and test labels, stratified by class and box count:
+  python split_labels.py --csv_input=data/airplane_labels.csv --train_output=data/train_labels.csv \
+    --test_output=data/test_labels.csv --test_fraction=0.2 --seed=1
+
+  # Keep near-duplicate images (from dedup_images.py) on the same side and write sharded records too:
+  python split_labels.py --csv_input=data/airplane_labels.csv --train_output=data/train_labels.csv \
+    --test_output=data/test_labels.csv --groups_csv=data/image_groups.csv \
+    --image_dir=images --train_record=data/train.record --test_record=data/test.record --num_shards=10
+
+All boxes of an image (or of a duplicate group) always end up on the same side.
+"""
+from __future__ import division
+from __future__ import print_function
+
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from validate_labels import POLICIES, DEFAULT_POLICY
+
+
+def box_count_bucket(counts):
+    """Bucket box counts as 1, 2-3, 4-7, 8-15, ... (floor of log2)."""
+    return np.floor(np.log2(np.maximum(counts, 1))).astype(np.int64)
+
+
+def split_groups(df, test_fraction=0.2, seed=0, groups=None):
+    """Return a boolean test mask over the rows of `df`.
+
+    Rows are split by unit: the image, or the duplicate group given by the
+    `groups` Series mapping file name to group. Units are stratified by their
+    most frequent class and their box count bucket. Within a stratum, units
+    are shuffled with `seed` and every 1 / test_fraction-th one goes to test,
+    starting at a random offset. This way each stratum gets test_fraction of
+    its units on average, even when strata are tiny.
+    """
+    filenames = df['filename']
+    if groups is not None:
+        # Images missing from the groups table form a group of their own.
+        units = filenames.map(groups).fillna(filenames)
+    else:
+        units = filenames
+    unit_codes, unit_names = pd.factorize(units)
+    num_units = len(unit_names)
+
+    box_counts = np.bincount(unit_codes, minlength=num_units)
+    class_codes, _ = pd.factorize(df['class'])
+    num_classes = class_codes.max() + 1 if len(class_codes) else 1
+    # Most frequent class per unit, ties going to the class seen first.
+    class_counts = np.bincount(unit_codes * num_classes + class_codes,
+                               minlength=num_units * num_classes).reshape(num_units, num_classes)
+    dominant_class = class_counts.argmax(axis=1)
+    strata, _ = pd.factorize(pd.Series(dominant_class * 64 + box_count_bucket(box_counts)))
+
+    rng = np.random.RandomState(seed)
+    order = np.lexsort((rng.random_sample(num_units), strata))
+    sorted_strata = strata[order]
+    stratum_start = np.searchsorted(sorted_strata, sorted_strata, side='left')
+    rank = np.arange(num_units) - stratum_start
+    offset = rng.random_sample(strata.max() + 1 if num_units else 0)[sorted_strata]
+    is_test_sorted = (np.floor((rank + 1) * test_fraction + offset) - np.floor(rank * test_fraction + offset)) > 0
+    unit_is_test = np.empty(num_units, dtype=bool)
+    unit_is_test[order] = is_test_sorted
+    return unit_is_test[unit_codes]
+
+
+def record_args(args, csv_path, record_path):
+    """Return the `generate_tfrecord` arguments writing the split at `csv_path` to `record_path`."""
+    argv = ['--csv_input={}'.format(csv_path), '--output_path={}'.format(record_path),
+            '--image_dir={}'.format(args.image_dir), '--num_shards={}'.format(args.num_shards),
+            '--num_workers={}'.format(args.num_workers), '--box_policy={}'.format(args.box_policy)]
+    if args.label_map_path:
+        argv.append('--label_map_path={}'.format(args.label_map_path))
+    if args.case_sensitive_labels:
+        argv.append('--case_sensitive_labels')
+    if args.skip_unknown_classes:
+        argv.append('--skip_unknown_classes')
+    return argv
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Split labels into stratified train and test sets.')
+    parser.add_argument('--csv_input', required=True, help='Full label csv')
+    parser.add_argument('--train_output', default='train_labels.csv', help='Path to the train label csv')
+    parser.add_argument('--test_output', default='test_labels.csv', help='Path to the test label csv')
+    parser.add_argument('--test_fraction', type=float, default=0.2, help='Fraction of images going to test')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed; the same seed gives the same split')
+    parser.add_argument('--groups_csv', default='', help='dedup_images.py output keeping duplicates together')
+    parser.add_argument('--image_dir', default='images', help='Path to images, to write records')
+    parser.add_argument('--train_record', default='', help='Also write the train split as TFRecords here')
+    parser.add_argument('--test_record', default='', help='Also write the test split as TFRecords here')
+    parser.add_argument('--num_shards', type=int, default=1, help='Number of shards per record')
+    parser.add_argument('--num_workers', type=int, default=1, help='Number of processes writing records')
+    parser.add_argument('--label_map_path', default='',
+                        help='Label map pbtxt of the records (default: generate_tfrecord\'s)')
+    parser.add_argument('--case_sensitive_labels', action='store_true',
+                        help='Match class names to the label map case-sensitively')
+    parser.add_argument('--skip_unknown_classes', action='store_true',
+                        help='Drop boxes whose class is not in the label map instead of failing')
+    parser.add_argument('--box_policy', default=DEFAULT_POLICY, choices=POLICIES,
+                        help='What generate_tfrecord does with invalid boxes')
+    args = parser.parse_args(argv)
+
+    labels = pd.read_csv(args.csv_input)
+    groups = None
+    if args.groups_csv:
+        groups = pd.read_csv(args.groups_csv).set_index('filename')['group']
+    is_test = split_groups(labels, test_fraction=args.test_fraction, seed=args.seed, groups=groups)
+    train_df, test_df = labels[~is_test], labels[is_test]
+    train_df.to_csv(args.train_output, index=None)
+    test_df.to_csv(args.test_output, index=None)
+    print('Split {} images into {} train and {} test images.'.format(
+        labels['filename'].nunique(), train_df['filename'].nunique(), test_df['filename'].nunique()))
+
+    if args.train_record or args.test_record:
+        # Only imported when writing records. The splits go through the same
+        # validation and label checks as a generate_tfrecord run on their csv.
+        import generate_tfrecord
+        for csv_path, record_path in ((args.train_output, args.train_record), (args.test_output, args.test_record)):
+            if record_path:
+                generate_tfrecord.main(record_args(args, csv_path, record_path))
+
+
+if __name__ == '__main__':
+    main()
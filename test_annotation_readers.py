@@ -0,0 +1,67 @@
+import io
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from PIL import Image
+
+import annotation_readers
+
+COCO = {
+    'info': {'year': 2017, 'version': '1.0'},
+    'images': [{'id': 7, 'file_name': 'airplane1.jpg', 'width': 640, 'height': 480},
+               {'id': 9, 'file_name': 'airplane2.jpg', 'width': 320, 'height': 240}],
+    'annotations': [{'id': 1, 'image_id': 9, 'category_id': 2, 'bbox': [10.0, 20.0, 30.4, 40.6], 'iscrowd': 0},
+                    {'id': 2, 'image_id': 7, 'category_id': 1, 'bbox': [0, 0, 64, 48], 'iscrowd': 0}],
+    'categories': [{'id': 1, 'name': 'airplane'}, {'id': 2, 'name': 'helicopter'}],
+}
+
+
+class AnnotationReadersTest(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_iter_json_members_across_reads(self):
+        text = json.dumps(dict(COCO, count=12345, empty=[]), indent=2)
+        for read_size in (1, 5, 1 << 20):
+            members = list(annotation_readers.iter_json_members(io.StringIO(text), read_size))
+            self.assertEqual([value for key, value in members if key == 'annotations'], COCO['annotations'])
+            self.assertIn(('count', 12345), members)
+            self.assertIn(('info', COCO['info']), members)
+            self.assertNotIn('empty', [key for key, _ in members])
+
+    def test_read_coco(self):
+        json_file = os.path.join(self.temp_dir, 'instances.json')
+        with open(json_file, 'w') as fid:
+            json.dump(COCO, fid)
+        labels = annotation_readers.read_annotations(json_file, 'coco')
+        self.assertEqual(labels.columns.values.tolist(),
+                         ['filename', 'width', 'height', 'class', 'xmin', 'ymin', 'xmax', 'ymax'])
+        self.assertEqual(labels.values.tolist(), [['airplane2.jpg', 320, 240, 'helicopter', 10, 20, 40, 61],
+                                                  ['airplane1.jpg', 640, 480, 'airplane', 0, 0, 64, 48]])
+
+    def test_read_coco_unknown_image(self):
+        json_file = os.path.join(self.temp_dir, 'instances.json')
+        with open(json_file, 'w') as fid:
+            json.dump(dict(COCO, images=COCO['images'][:1]), fid)
+        with self.assertRaises(ValueError):
+            annotation_readers.read_coco(json_file)
+
+    def test_read_yolo_in_parallel(self):
+        with open(os.path.join(self.temp_dir, 'classes.txt'), 'w') as fid:
+            fid.write('airplane\nhelicopter\n')
+        for index in range(4):
+            Image.new('RGB', (200, 100)).save(os.path.join(self.temp_dir, 'airplane{}.jpg'.format(index)))
+            with open(os.path.join(self.temp_dir, 'airplane{}.txt'.format(index)), 'w') as fid:
+                fid.write('1 0.5 0.5 0.2 0.4\n0 0.25 0.75 0.1 0.1\n' if index != 2 else '')
+        labels = annotation_readers.read_annotations(self.temp_dir, 'yolo')
+        self.assertEqual(len(labels), 6)
+        self.assertEqual(labels.values.tolist()[:2], [['airplane0.jpg', 200, 100, 'helicopter', 80, 30, 120, 70],
+                                                      ['airplane0.jpg', 200, 100, 'airplane', 40, 70, 60, 80]])
+        parallel = annotation_readers.read_annotations(self.temp_dir, 'yolo', num_workers=2, chunk_size=1)
+        self.assertEqual(parallel.values.tolist(), labels.values.tolist())
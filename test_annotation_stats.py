@@ -0,0 +1,66 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+
+import annotation_stats
+
+COLUMNS = ['filename', 'width', 'height', 'class', 'xmin', 'ymin', 'xmax', 'ymax']
+
+
+class AnnotationStatsTest(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.labels = pd.DataFrame([('a.jpg', 100, 100, 'airplane', 0, 0, 20, 10),
+                                    ('a.jpg', 100, 100, 'bird', 10, 10, 20, 20),
+                                    ('b.jpg', 200, 100, 'airplane', 0, 0, 80, 20),
+                                    ('c.jpg', 100, 100, 'airplane', 5, 5, 5, 9)], columns=COLUMNS)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_update_counts_new_images_once(self):
+        stats = annotation_stats.AnnotationStats()
+        self.assertEqual(stats.update(self.labels), 3)
+        self.assertEqual(stats.num_boxes, 3)
+        self.assertEqual(stats.skipped, 1)
+        self.assertEqual(stats.boxes_per_image().tolist(), [0, 2, 1])
+        self.assertEqual(int(stats.aspect_counts['airplane'].sum()), 2)
+        # Both airplanes have a normalized aspect ratio of 2, i.e. log2 ratio 1.
+        bin_of_two = annotation_stats._bin_index(np.array([1.0]), annotation_stats.ASPECT_EDGES)[0]
+        self.assertEqual(stats.aspect_counts['airplane'][bin_of_two], 2)
+        self.assertEqual(stats.update(self.labels), 0)
+        self.assertEqual(stats.num_boxes, 3)
+
+    def test_incremental_update_and_merge_match_one_pass(self):
+        full = annotation_stats.AnnotationStats()
+        full.update(self.labels)
+        path = os.path.join(self.tmpdir, 'stats.json')
+        annotation_stats.update_stats_file(self.labels[self.labels['filename'] == 'a.jpg'], path)
+        incremental = annotation_stats.update_stats_file(self.labels, path)
+        merged = annotation_stats.AnnotationStats()
+        merged.update(self.labels[self.labels['filename'] != 'b.jpg'])
+        other = annotation_stats.AnnotationStats()
+        other.update(self.labels[self.labels['filename'] == 'b.jpg'])
+        merged.merge(other)
+        for stats in (incremental, annotation_stats.AnnotationStats.load(path), merged):
+            self.assertEqual(stats.to_dict(), full.to_dict())
+        self.assertRaises(ValueError, merged.merge, other)
+
+    def test_kmeans_finds_separate_shapes(self):
+        shapes = [(0.1, 0.05), (0.11, 0.05), (0.4, 0.8), (0.42, 0.8)]
+        anchors, mean_iou = annotation_stats.kmeans_anchors(shapes, [10, 10, 1, 1], 2)
+        np.testing.assert_allclose(anchors, [(0.105, 0.05), (0.41, 0.8)])
+        self.assertGreater(mean_iou, 0.95)
+
+    def test_report_suggests_anchor_generator(self):
+        stats = annotation_stats.AnnotationStats()
+        stats.update(self.labels)
+        suggestion = stats.anchor_suggestion(num_anchors=3)
+        self.assertEqual(len(suggestion['anchors']), 3)
+        self.assertEqual(suggestion['aspect_ratios'], [1.0, 2.0])
+        self.assertIn('ssd_anchor_generator {', stats.report(num_anchors=2))
+        self.assertNotIn('ssd_anchor_generator', annotation_stats.AnnotationStats().report())
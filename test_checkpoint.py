@@ -0,0 +1,81 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+from PIL import Image
+
+import checkpoint
+import generate_tfrecord
+
+column_names = ['filename', 'width', 'height', 'class', 'xmin', 'ymin', 'xmax', 'ymax']
+
+
+class CheckpointTest(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.image_dir = os.path.join(self.temp_dir, 'images')
+        os.makedirs(self.image_dir)
+        for index in range(6):
+            image = Image.fromarray((np.random.rand(32, 32, 3) * 255).astype(np.uint8), 'RGB')
+            image.save(os.path.join(self.image_dir, 'airplane{}.jpg'.format(index)))
+        self.labels = pd.DataFrame([('airplane{}.jpg'.format(index), 32, 32, 'airplane', 4, 4, 20 + index, 20)
+                                    for index in range(6)], columns=column_names)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def _write(self, name, checkpoint_state=None, labels=None):
+        output_path = os.path.join(self.temp_dir, name)
+        grouped = generate_tfrecord.split_columns(self.labels if labels is None else labels, 'filename')
+        instruments = generate_tfrecord.Instrumentation()
+        output_paths = generate_tfrecord.write_records(grouped, self.image_dir, output_path, num_shards=3,
+                                                       instruments=instruments, checkpoint=checkpoint_state)
+        return output_paths, instruments
+
+    def _read(self, paths):
+        contents = []
+        for path in paths:
+            with open(path, 'rb') as fid:
+                contents.append(fid.read())
+        return contents
+
+    def test_resume_is_byte_identical(self):
+        expected_paths, _ = self._write('expected.record')
+        output_path = os.path.join(self.temp_dir, 'resumed.record')
+        checkpoint_path = os.path.join(self.temp_dir, 'resumed.checkpoint.json')
+
+        # airplane2.jpg goes to the last shard, so the run fails after completing the first two.
+        missing_image = os.path.join(self.image_dir, 'airplane2.jpg')
+        os.rename(missing_image, missing_image + '.moved')
+        with self.assertRaises(IOError):
+            self._write('resumed.record', checkpoint.ShardCheckpoint(checkpoint_path, output_path, 3))
+        self.assertFalse(os.path.exists(generate_tfrecord.shard_path(output_path, 2, 3)))
+        os.rename(missing_image + '.moved', missing_image)
+
+        state = checkpoint.ShardCheckpoint(checkpoint_path, output_path, 3)
+        self.assertEqual(sorted(state.completed), ['0', '1'])
+        output_paths, instruments = self._write('resumed.record', state)
+        self.assertEqual(instruments.examples, 2)
+        self.assertEqual(self._read(output_paths), self._read(expected_paths))
+
+    def test_changed_shard_is_rewritten(self):
+        output_path = os.path.join(self.temp_dir, 'train.record')
+        checkpoint_path = os.path.join(self.temp_dir, 'train.checkpoint.json')
+        self._write('train.record', checkpoint.ShardCheckpoint(checkpoint_path, output_path, 3))
+
+        labels = self.labels.copy()
+        labels.loc[4, 'xmax'] = 30
+        _, instruments = self._write('train.record', checkpoint.ShardCheckpoint(checkpoint_path, output_path, 3),
+                                     labels)
+        self.assertEqual(instruments.examples, 2)
+        # A checkpoint of another output or shard count is ignored.
+        self.assertEqual(checkpoint.ShardCheckpoint(checkpoint_path, output_path, 4).completed, {})
+
+    def test_checkpoint_needs_shards(self):
+        with self.assertRaises(SystemExit):
+            generate_tfrecord.parse_args(['--csv_input=labels.csv', '--checkpoint_path=train.checkpoint.json'])
+        args = generate_tfrecord.parse_args(['--checkpoint_path=train.checkpoint.json', '--num_shards=2'])
+        self.assertEqual(args.checkpoint_path, 'train.checkpoint.json')
@@ -0,0 +1,25 @@
+import os
+import subprocess
+import sys
+import unittest
+
+import cli
+
+PACKAGE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+class CLITest(unittest.TestCase):
+    def test_usage_and_unknown_command(self):
+        self.assertEqual(cli.main(['--help']), 0)
+        self.assertEqual(cli.main([]), 2)
+        self.assertEqual(cli.main(['no_such_command']), 2)
+
+    def test_modules_import_without_tensorflow(self):
+        code = ('import sys, cli, generate_tfrecord, xml_to_tfrecord, inspect_records; '
+                'sys.exit("tensorflow" in sys.modules)')
+        self.assertEqual(subprocess.call([sys.executable, '-c', code], cwd=PACKAGE_DIR), 0)
+
+    def test_dispatches_to_command(self):
+        output = subprocess.check_output([sys.executable, 'cli.py', 'validate_labels',
+                                          '--csv_input=data/train_labels.csv'], cwd=PACKAGE_DIR)
+        self.assertIn(b'All boxes are valid.', output)
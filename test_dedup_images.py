@@ -0,0 +1,43 @@
+import os
+import random
+import tempfile
+import unittest
+import numpy as np
+import pandas as pd
+from PIL import Image
+
+import dedup_images
+
+
+class DedupImagesTest(unittest.TestCase):
+    def test_near_duplicate_pairs_matches_brute_force(self):
+        rng = random.Random(0)
+        hashes = [rng.getrandbits(64) for _ in range(200)]
+        # Plant near-duplicates by flipping a few bits of existing hashes.
+        for index in range(20):
+            value = hashes[index]
+            for bit in rng.sample(range(64), index % 6):
+                value ^= 1 << bit
+            hashes.append(value)
+        expected = set((i, j) for j in range(len(hashes)) for i in range(j)
+                       if dedup_images.hamming(hashes[i], hashes[j]) <= 4)
+        found = set(dedup_images.near_duplicate_pairs(hashes, max_distance=4))
+        self.assertEqual(found, expected)
+        self.assertGreater(len(found), 0)
+
+    def test_group_duplicates(self):
+        self.assertEqual(dedup_images.group_duplicates(5, [(3, 4), (1, 3)]), [0, 1, 2, 1, 1])
+
+    def test_find_duplicates_and_leakage(self):
+        rng = np.random.RandomState(0)
+        base = rng.randint(0, 256, (64, 64, 3)).astype('uint8')
+        with tempfile.TemporaryDirectory() as tmpdirname:
+            Image.fromarray(base, 'RGB').save(os.path.join(tmpdirname, 'airplane1.jpg'), quality=95)
+            Image.fromarray(base, 'RGB').save(os.path.join(tmpdirname, 'airplane2.jpg'), quality=60)
+            Image.fromarray(255 - base, 'RGB').save(os.path.join(tmpdirname, 'airplane3.jpg'))
+            groups_df = dedup_images.find_duplicates(tmpdirname, num_workers=2)
+
+        self.assertEqual(groups_df['group'].tolist(), ['airplane1.jpg', 'airplane1.jpg', 'airplane3.jpg'])
+        train_df = pd.DataFrame({'filename': ['airplane1.jpg', 'airplane3.jpg']})
+        test_df = pd.DataFrame({'filename': ['airplane2.jpg']})
+        self.assertEqual(dedup_images.leaking_groups(groups_df, train_df, test_df), ['airplane1.jpg'])
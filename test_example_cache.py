@@ -0,0 +1,53 @@
+import os
+import time
+import tempfile
+import unittest
+
+import example_cache
+
+
+class ExampleCacheTest(unittest.TestCase):
+    def test_image_hash_is_memoized_by_stat(self):
+        with tempfile.TemporaryDirectory() as tmpdirname:
+            image_path = os.path.join(tmpdirname, 'airplane.jpg')
+            with open(image_path, 'wb') as fid:
+                fid.write(b'jpeg bytes')
+            cache = example_cache.ExampleCache(os.path.join(tmpdirname, 'cache'))
+
+            content_hash, data = cache.image_hash(image_path)
+            self.assertEqual(data, b'jpeg bytes')
+            memo_hash, data = cache.image_hash(image_path)
+            self.assertEqual(memo_hash, content_hash)
+            self.assertIsNone(data)
+
+            with open(image_path, 'wb') as fid:
+                fid.write(b'other jpeg bytes')
+            new_hash, data = cache.image_hash(image_path)
+            self.assertNotEqual(new_hash, content_hash)
+            self.assertEqual(data, b'other jpeg bytes')
+
+    def test_get_put(self):
+        with tempfile.TemporaryDirectory() as tmpdirname:
+            cache = example_cache.ExampleCache(tmpdirname)
+            key = cache.example_key('image', 'annotation')
+            self.assertNotEqual(key, cache.example_key('image', 'other annotation'))
+            self.assertIsNone(cache.get(key))
+            cache.put(key, b'serialized example')
+            self.assertEqual(cache.get(key), b'serialized example')
+            self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+    def test_evict_least_recently_used(self):
+        with tempfile.TemporaryDirectory() as tmpdirname:
+            cache = example_cache.ExampleCache(tmpdirname, max_bytes=250)
+            keys = [cache.example_key('image{}'.format(index), 'annotation') for index in range(3)]
+            for index, key in enumerate(keys):
+                cache.put(key, b'x' * 100)
+                entry_path = cache._entry_path('example', key)
+                os.utime(entry_path, (time.time() - 100 + index, time.time() - 100 + index))
+            # Reading the oldest entry makes it the most recently used one.
+            cache.get(keys[0])
+
+            self.assertEqual(cache.evict(), 100)
+            self.assertIsNotNone(cache.get(keys[0]))
+            self.assertIsNone(cache.get(keys[1]))
+            self.assertIsNotNone(cache.get(keys[2]))
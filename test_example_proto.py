@@ -0,0 +1,40 @@
+import unittest
+
+import example_proto
+
+
+class ExampleProtoTest(unittest.TestCase):
+    def test_varint(self):
+        self.assertEqual(example_proto._varint(1), b'\x01')
+        self.assertEqual(example_proto._varint(300), b'\xac\x02')
+        self.assertEqual(example_proto._varint(-1), b'\xff' * 9 + b'\x01')
+
+    def test_encode_feature(self):
+        self.assertEqual(example_proto.encode_feature(*example_proto.int64_feature(300)),
+                         b'\x1a\x04\x0a\x02\xac\x02')
+        self.assertEqual(example_proto.encode_feature(*example_proto.bytes_list_feature([b'ab', b''])),
+                         b'\x0a\x06\x0a\x02ab\x0a\x00')
+        self.assertEqual(example_proto.encode_feature(*example_proto.float_list_feature([0.5])),
+                         b'\x12\x06\x0a\x04\x00\x00\x00\x3f')
+        self.assertEqual(example_proto.encode_feature(*example_proto.float_list_feature([])), b'\x12\x00')
+
+    def test_encode_example_sorts_features(self):
+        features = {'b': example_proto.int64_feature(1), 'a': example_proto.bytes_feature(b'x')}
+        entry_a = b'\x0a\x01a' + b'\x12\x05' + b'\x0a\x03\x0a\x01x'
+        entry_b = b'\x0a\x01b' + b'\x12\x05' + b'\x1a\x03\x0a\x01\x01'
+        self.assertEqual(example_proto.encode_example(features),
+                         b'\x0a\x18' + b'\x0a\x0a' + entry_a + b'\x0a\x0a' + entry_b)
+        self.assertEqual(example_proto.encode_example({}), b'\x0a\x00')
+
+    def test_template_matches_encode_example(self):
+        kinds = {'image/format': example_proto.BYTES, 'label': example_proto.INT64,
+                 'box': example_proto.FLOAT}
+        template = example_proto.ExampleTemplate(kinds, constants={'image/format': [b'jpg']})
+        for labels, boxes in (([1, 300], [0.25, 0.5]), ([], [])):
+            features = {'image/format': example_proto.bytes_feature(b'jpg'),
+                        'label': example_proto.int64_list_feature(labels),
+                        'box': example_proto.float_list_feature(boxes)}
+            packed = example_proto.np.asarray(boxes, dtype='<f4').tobytes()
+            payloads = {'label': example_proto.list_payload(example_proto.INT64, labels),
+                        'box': example_proto.packed_float_payload(packed)}
+            self.assertEqual(template.encode(payloads), example_proto.encode_example(features))
@@ -1,4 +1,6 @@
+import io
 import os
+import multiprocessing
 import PIL
 import generate_tfrecord
 import numpy as np
@@ -270,3 +272,238 @@ class CSVToTFExampleTest(tf.test.TestCase):
                 self._assertProtoEqual(
                     example.features.feature['image/object/class/label'].int64_list.value,
                     [1])
+
+    def test_write_records_sharded(self):
+        """Write one example per file round-robin into shard files."""
+        image_data = np.random.rand(256, 256, 3)
+        image = PIL.Image.fromarray(image_data, 'RGB')
+        column_names = ['filename', 'width', 'height', 'class', 'xmin', 'ymin', 'xmax', 'ymax']
+        airplane_data = []
+        for index in range(5):
+            image_file_name = 'tmp_airplane_image_{}.jpg'.format(index)
+            image.save(os.path.join(self.get_temp_dir(), image_file_name))
+            airplane_data.append((image_file_name, 256, 256, 'Airplane', 64, 64, 192, 192))
+        airplane_df = pd.DataFrame(airplane_data, columns=column_names)
+
+        grouped = generate_tfrecord.split(airplane_df, 'filename')
+        output_path = os.path.join(self.get_temp_dir(), 'airplane.record')
+        output_paths = generate_tfrecord.write_records(
+            grouped, self.get_temp_dir(), output_path, num_shards=2, num_workers=2)
+        self.assertListEqual(output_paths, [output_path + '-00000-of-00002', output_path + '-00001-of-00002'])
+
+        filenames = []
+        for shard_output in output_paths:
+            shard_filenames = []
+            for record in tf.python_io.tf_record_iterator(shard_output):
+                example = tf.train.Example.FromString(record)
+                shard_filenames.append(example.features.feature['image/filename'].bytes_list.value[0])
+            filenames.append(shard_filenames)
+        self.assertListEqual(filenames, [
+            [b'tmp_airplane_image_0.jpg', b'tmp_airplane_image_2.jpg', b'tmp_airplane_image_4.jpg'],
+            [b'tmp_airplane_image_1.jpg', b'tmp_airplane_image_3.jpg']])
+
+    def test_bounded_imap_keeps_order(self):
+        pool = multiprocessing.Pool(2)
+        try:
+            self.assertListEqual(list(generate_tfrecord.bounded_imap(pool, abs, range(-20, 0), 3)),
+                                 list(range(20, 0, -1)))
+        finally:
+            pool.close()
+            pool.join()
+
+    def test_write_records_prefetches_in_workers(self):
+        """Prefetch images in the workers building a single output file."""
+        image = PIL.Image.fromarray(np.random.rand(64, 64, 3), 'RGB')
+        column_names = ['filename', 'width', 'height', 'class', 'xmin', 'ymin', 'xmax', 'ymax']
+        airplane_data = []
+        for index in range(5):
+            image_file_name = 'tmp_airplane_image_{}.jpg'.format(index)
+            image.save(os.path.join(self.get_temp_dir(), image_file_name))
+            airplane_data.append((image_file_name, 64, 64, 'Airplane', 16, 16, 48, 48))
+        grouped = generate_tfrecord.split(pd.DataFrame(airplane_data, columns=column_names), 'filename')
+
+        output_path = os.path.join(self.get_temp_dir(), 'airplane.record')
+        read_stats = generate_tfrecord.ReadStats()
+        generate_tfrecord.write_records(grouped, self.get_temp_dir(), output_path, num_workers=2, num_prefetch=4,
+                                        read_stats=read_stats)
+        self.assertEqual(read_stats.images, 5)
+        self.assertEqual(len(list(tf.python_io.tf_record_iterator(output_path))), 5)
+
+    def test_verify_dimensions_uses_image_header(self):
+        """Replace a wrong csv width/height by the size in the image header."""
+        image_file_name = 'tmp_airplane_image.jpg'
+        image_data = np.random.rand(128, 256, 3)
+        image = PIL.Image.fromarray(image_data, 'RGB')
+        image.save(os.path.join(self.get_temp_dir(), image_file_name))
+
+        column_names = ['filename', 'width', 'height', 'class', 'xmin', 'ymin', 'xmax', 'ymax']
+        airplane_data = [('tmp_airplane_image.jpg', 256, 256, 'Airplane', 64, 64, 192, 96)]
+        airplane_df = pd.DataFrame(airplane_data, columns=column_names)
+
+        group = generate_tfrecord.split(airplane_df, 'filename')[0]
+        example = generate_tfrecord.create_tf_example(group, self.get_temp_dir(), verify_dimensions=True)
+        self._assertProtoEqual(
+            example.features.feature['image/height'].int64_list.value, [128])
+        self._assertProtoEqual(
+            example.features.feature['image/width'].int64_list.value, [256])
+        self._assertProtoEqual(
+            example.features.feature['image/object/bbox/ymax'].float_list.value, [0.75])
+
+    def test_split_columns_matches_split(self):
+        """Build the same examples from column slices as from per-image DataFrames."""
+        image_data = np.random.rand(256, 256, 3)
+        image = PIL.Image.fromarray(image_data, 'RGB')
+        image.save(os.path.join(self.get_temp_dir(), 'tmp_airplane_image_1.jpg'))
+        image.save(os.path.join(self.get_temp_dir(), 'tmp_airplane_image_2.jpg'))
+
+        column_names = ['filename', 'width', 'height', 'class', 'xmin', 'ymin', 'xmax', 'ymax']
+        airplane_data = [('tmp_airplane_image_2.jpg', 256, 256, 'Airplane', 96, 96, 128, 128),
+                         ('tmp_airplane_image_1.jpg', 256, 256, 'Airplane', 64, 64, 192, 192),
+                         ('tmp_airplane_image_2.jpg', 256, 256, 'Airplane', 32, 32, 96, 96)]
+        airplane_df = pd.DataFrame(airplane_data, columns=column_names)
+
+        grouped = generate_tfrecord.split(airplane_df, 'filename')
+        column_grouped = generate_tfrecord.split_columns(airplane_df, 'filename')
+        self.assertListEqual([group.filename for group in grouped],
+                             ['tmp_airplane_image_1.jpg', 'tmp_airplane_image_2.jpg'])
+        self.assertListEqual([group.filename for group in column_grouped],
+                             ['tmp_airplane_image_1.jpg', 'tmp_airplane_image_2.jpg'])
+        for group, column_group in zip(grouped, column_grouped):
+            example = generate_tfrecord.create_tf_example(group, self.get_temp_dir())
+            column_example = generate_tfrecord.create_tf_example(column_group, self.get_temp_dir())
+            self.assertEqual(example, column_example)
+
+    def test_unknown_class_raises_or_is_skipped(self):
+        """Fail on classes missing from the label map unless asked to skip them."""
+        image_file_name = 'tmp_airplane_image.jpg'
+        image_data = np.random.rand(256, 256, 3)
+        image = PIL.Image.fromarray(image_data, 'RGB')
+        image.save(os.path.join(self.get_temp_dir(), image_file_name))
+
+        column_names = ['filename', 'width', 'height', 'class', 'xmin', 'ymin', 'xmax', 'ymax']
+        airplane_data = [('tmp_airplane_image.jpg', 256, 256, 'Airplane', 64, 64, 192, 192),
+                         ('tmp_airplane_image.jpg', 256, 256, 'glider', 96, 96, 128, 128)]
+        airplane_df = pd.DataFrame(airplane_data, columns=column_names)
+
+        group = generate_tfrecord.split(airplane_df, 'filename')[0]
+        with self.assertRaises(generate_tfrecord.UnknownClassError):
+            generate_tfrecord.create_tf_example(group, self.get_temp_dir())
+        example = generate_tfrecord.create_tf_example(group, self.get_temp_dir(), skip_unknown_classes=True)
+        self._assertProtoEqual(
+            example.features.feature['image/object/class/text'].bytes_list.value, [b'Airplane'])
+        self._assertProtoEqual(
+            example.features.feature['image/object/class/label'].int64_list.value, [1])
+        self._assertProtoEqual(
+            example.features.feature['image/object/bbox/xmin'].float_list.value, [0.25])
+
+    def test_example_cache_reuses_unchanged_examples(self):
+        """Rebuild only the examples whose annotations changed."""
+        image = PIL.Image.fromarray(np.random.rand(256, 256, 3), 'RGB')
+        image.save(os.path.join(self.get_temp_dir(), 'tmp_airplane_image_1.jpg'))
+        image.save(os.path.join(self.get_temp_dir(), 'tmp_airplane_image_2.jpg'))
+
+        column_names = ['filename', 'width', 'height', 'class', 'xmin', 'ymin', 'xmax', 'ymax']
+        airplane_data = [('tmp_airplane_image_1.jpg', 256, 256, 'airplane', 64, 64, 192, 192),
+                         ('tmp_airplane_image_2.jpg', 256, 256, 'airplane', 96, 96, 128, 128)]
+        airplane_df = pd.DataFrame(airplane_data, columns=column_names)
+        cache = generate_tfrecord.ExampleCache(os.path.join(self.get_temp_dir(), 'cache'))
+
+        grouped = generate_tfrecord.split_columns(airplane_df, 'filename')
+        uncached = list(generate_tfrecord.serialize_examples(grouped, self.get_temp_dir(), {}))
+        first = list(generate_tfrecord.serialize_examples(grouped, self.get_temp_dir(), {}, cache=cache))
+        self.assertListEqual(first, uncached)
+        self.assertEqual((cache.hits, cache.misses), (0, 2))
+
+        airplane_df.loc[1, 'xmax'] = 160
+        grouped = generate_tfrecord.split_columns(airplane_df, 'filename')
+        second = list(generate_tfrecord.serialize_examples(grouped, self.get_temp_dir(), {}, cache=cache))
+        self.assertEqual(second[0], first[0])
+        self.assertNotEqual(second[1], first[1])
+        self.assertEqual((cache.hits, cache.misses), (1, 3))
+
+    def test_downscaled_example_keeps_normalized_boxes(self):
+        """Store a resized JPEG with its new size and unchanged normalized boxes."""
+        image_file_name = 'tmp_airplane_image.jpg'
+        image = PIL.Image.fromarray(np.random.rand(512, 1024, 3), 'RGB')
+        image.save(os.path.join(self.get_temp_dir(), image_file_name))
+
+        column_names = ['filename', 'width', 'height', 'class', 'xmin', 'ymin', 'xmax', 'ymax']
+        airplane_data = [('tmp_airplane_image.jpg', 1024, 512, 'airplane', 256, 128, 768, 384)]
+        airplane_df = pd.DataFrame(airplane_data, columns=column_names)
+
+        group = generate_tfrecord.split(airplane_df, 'filename')[0]
+        example = generate_tfrecord.create_tf_example(group, self.get_temp_dir(), max_image_side=300, jpeg_quality=80)
+        self._assertProtoEqual(
+            example.features.feature['image/width'].int64_list.value, [300])
+        self._assertProtoEqual(
+            example.features.feature['image/height'].int64_list.value, [150])
+        self._assertProtoEqual(
+            example.features.feature['image/object/bbox/xmin'].float_list.value, [0.25])
+        self._assertProtoEqual(
+            example.features.feature['image/object/bbox/ymax'].float_list.value, [0.75])
+        encoded = example.features.feature['image/encoded'].bytes_list.value[0]
+        self.assertEqual(PIL.Image.open(io.BytesIO(encoded)).size, (300, 150))
+
+    def test_write_records_fills_instrumentation(self):
+        """Time every stage and count the examples and bytes written."""
+        image = PIL.Image.fromarray(np.random.rand(64, 64, 3), 'RGB')
+        image.save(os.path.join(self.get_temp_dir(), 'tmp_airplane_image_1.jpg'))
+        image.save(os.path.join(self.get_temp_dir(), 'tmp_airplane_image_2.jpg'))
+
+        column_names = ['filename', 'width', 'height', 'class', 'xmin', 'ymin', 'xmax', 'ymax']
+        airplane_data = [('tmp_airplane_image_1.jpg', 64, 64, 'airplane', 16, 16, 48, 48),
+                         ('tmp_airplane_image_2.jpg', 64, 64, 'airplane', 8, 8, 32, 32)]
+        airplane_df = pd.DataFrame(airplane_data, columns=column_names)
+        grouped = generate_tfrecord.split_columns(airplane_df, 'filename')
+        instruments = generate_tfrecord.Instrumentation()
+        progress = generate_tfrecord.Progress(len(grouped), interval=0)
+        output_path = os.path.join(self.get_temp_dir(), 'instrumented.record')
+
+        generate_tfrecord.write_records(grouped, self.get_temp_dir(), output_path, num_shards=2,
+                                        instruments=instruments, progress=progress)
+        self.assertEqual(instruments.examples, 2)
+        self.assertEqual(progress.examples, 2)
+        self.assertEqual(progress.bytes, instruments.bytes)
+        self.assertEqual(len(instruments.slowest()), 2)
+        for stage in ('read', 'build', 'serialize', 'write'):
+            self.assertGreater(instruments.stage_seconds[stage], 0)
+
+    def test_serialize_batch_matches_create_tf_example(self):
+        """Build a batch of examples with the same bytes as building them one by one."""
+        for name, size in (('tmp_small.jpg', 32), ('tmp_large.jpg', 80)):
+            image = PIL.Image.fromarray(np.random.rand(size, size, 3), 'RGB')
+            image.save(os.path.join(self.get_temp_dir(), name))
+
+        column_names = ['filename', 'width', 'height', 'class', 'xmin', 'ymin', 'xmax', 'ymax']
+        airplane_data = [('tmp_small.jpg', 32, 32, 'airplane', 1, 2, 30, 31),
+                         ('tmp_large.jpg', 80, 80, 'airplane', 16, 16, 48, 48),
+                         ('tmp_large.jpg', 80, 80, 'bird', 3, 5, 7, 11),
+                         ('tmp_large.jpg', 80, 80, 'airplane', 0, 0, 80, 80)]
+        airplane_df = pd.DataFrame(airplane_data, columns=column_names)
+        label_map = generate_tfrecord.LabelMap({'airplane': 1})
+        groups = generate_tfrecord.split_columns(airplane_df, 'filename')
+
+        batch = generate_tfrecord.serialize_batch(groups, self.get_temp_dir(), label_map=label_map,
+                                                  skip_unknown_classes=True)
+        for group, serialized in zip(groups, batch):
+            example = generate_tfrecord.create_tf_example(group, self.get_temp_dir(), label_map=label_map,
+                                                          skip_unknown_classes=True)
+            self.assertEqual(serialized, example.SerializeToString(deterministic=True))
+            self.assertEqual(serialized, generate_tfrecord.serialize_example(
+                group, self.get_temp_dir(), label_map=label_map, skip_unknown_classes=True))
+        self.assertEqual(generate_tfrecord.serialize_batch([], self.get_temp_dir()), [])
+
+    def test_serialize_example_matches_create_tf_example(self):
+        """Encode the same bytes without TensorFlow as the deterministic tf.train.Example serialization."""
+        image = PIL.Image.fromarray(np.random.rand(64, 64, 3), 'RGB')
+        image.save(os.path.join(self.get_temp_dir(), 'tmp_airplane_image.jpg'))
+
+        column_names = ['filename', 'width', 'height', 'class', 'xmin', 'ymin', 'xmax', 'ymax']
+        airplane_data = [('tmp_airplane_image.jpg', 64, 64, 'airplane', 16, 16, 48, 48),
+                         ('tmp_airplane_image.jpg', 64, 64, 'airplane', 3, 5, 7, 11)]
+        airplane_df = pd.DataFrame(airplane_data, columns=column_names)
+
+        group = generate_tfrecord.split_columns(airplane_df, 'filename')[0]
+        example = generate_tfrecord.create_tf_example(group, self.get_temp_dir())
+        self.assertEqual(generate_tfrecord.serialize_example(group, self.get_temp_dir()),
+                         example.SerializeToString(deterministic=True))
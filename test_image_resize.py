@@ -0,0 +1,34 @@
+import io
+import unittest
+import numpy as np
+from PIL import Image
+
+import image_resize
+
+
+class ImageResizeTest(unittest.TestCase):
+    def _encode(self, width, height, image_format='JPEG'):
+        image = Image.fromarray(np.random.randint(0, 256, (height, width, 3)).astype('uint8'), 'RGB')
+        output = io.BytesIO()
+        image.save(output, format=image_format)
+        return output.getvalue()
+
+    def test_scaled_size(self):
+        self.assertEqual(image_resize.scaled_size(1200, 600, 300), (300, 150))
+        self.assertEqual(image_resize.scaled_size(200, 100, 300), (200, 100))
+        self.assertEqual(image_resize.scaled_size(200, 100, None), (200, 100))
+
+    def test_downscale(self):
+        encoded, width, height = image_resize.reencode_image(self._encode(1024, 512), max_side=300, quality=80)
+        self.assertEqual((width, height), (300, 150))
+        image = Image.open(io.BytesIO(encoded))
+        self.assertEqual((image.format, image.size), ('JPEG', (300, 150)))
+
+    def test_small_jpeg_is_kept(self):
+        source = self._encode(64, 32)
+        self.assertEqual(image_resize.reencode_image(source, max_side=300), (source, 64, 32))
+
+    def test_png_is_reencoded_as_jpeg(self):
+        encoded, width, height = image_resize.reencode_image(self._encode(64, 32, 'PNG'), max_side=300)
+        self.assertEqual((width, height), (64, 32))
+        self.assertEqual(Image.open(io.BytesIO(encoded)).format, 'JPEG')
@@ -0,0 +1,40 @@
+import io
+import os
+import tempfile
+import unittest
+import numpy as np
+from PIL import Image
+
+import image_size
+
+
+class ImageSizeTest(unittest.TestCase):
+    def _encode(self, width, height, **save_kwargs):
+        image = Image.fromarray(np.zeros((height, width, 3), dtype=np.uint8), 'RGB')
+        buffer = io.BytesIO()
+        image.save(buffer, **save_kwargs)
+        return buffer.getvalue()
+
+    def test_jpeg_size(self):
+        encoded = self._encode(320, 200, format='JPEG')
+        self.assertEqual(image_size.get_image_size(encoded), (320, 200))
+
+    def test_progressive_jpeg_with_exif_size(self):
+        exif = Image.Exif()
+        exif[0x010e] = 'x' * 4096
+        encoded = self._encode(64, 480, format='JPEG', progressive=True, exif=exif.tobytes())
+        self.assertEqual(image_size.get_image_size(encoded), (64, 480))
+
+    def test_png_size_from_file(self):
+        encoded = self._encode(17, 33, format='PNG')
+        with tempfile.TemporaryDirectory() as tmpdirname:
+            path = os.path.join(tmpdirname, 'airplane.png')
+            with open(path, 'wb') as fid:
+                fid.write(encoded)
+            self.assertEqual(image_size.get_image_size_from_file(path), (17, 33))
+
+    def test_unknown_format(self):
+        with self.assertRaises(image_size.UnknownImageFormat):
+            image_size.get_image_size(self._encode(8, 8, format='BMP'))
+        with self.assertRaises(image_size.UnknownImageFormat):
+            image_size.get_image_size(b'\xff\xd8\xff')
@@ -0,0 +1,74 @@
+import os
+
+import numpy as np
+import pandas as pd
+import PIL
+import tensorflow as tf
+
+import generate_tfrecord
+import inspect_records
+
+
+class InspectRecordsTest(tf.test.TestCase):
+    def _write_records(self, airplane_df, num_shards):
+        image = PIL.Image.fromarray(np.random.rand(64, 64, 3), 'RGB')
+        for filename in airplane_df['filename'].unique():
+            image.save(os.path.join(self.get_temp_dir(), filename))
+        output_path = os.path.join(self.get_temp_dir(), 'inspected.record')
+        grouped = generate_tfrecord.split_columns(airplane_df, 'filename')
+        generate_tfrecord.write_records(grouped, self.get_temp_dir(), output_path, num_shards=num_shards)
+        return output_path
+
+    def test_stats_and_verification_of_sharded_records(self):
+        column_names = ['filename', 'width', 'height', 'class', 'xmin', 'ymin', 'xmax', 'ymax']
+        airplane_data = [('tmp_airplane_image_1.jpg', 64, 64, 'airplane', 16, 16, 48, 48),
+                         ('tmp_airplane_image_1.jpg', 64, 64, 'airplane', 0, 0, 8, 8),
+                         ('tmp_airplane_image_2.jpg', 64, 64, 'airplane', 8, 8, 32, 32),
+                         ('tmp_airplane_image_3.jpg', 64, 64, 'airplane', 8, 8, 32, 32)]
+        airplane_df = pd.DataFrame(airplane_data, columns=column_names)
+        output_path = self._write_records(airplane_df, num_shards=2)
+
+        stats, verifier = inspect_records.inspect_records(output_path, batch_size=2, labels=airplane_df)
+        self.assertEqual(stats.images, 3)
+        self.assertEqual(stats.boxes, 4)
+        self.assertEqual(dict(stats.boxes_per_image), {1: 2, 2: 1})
+        self.assertEqual(dict(stats.class_counts), {'airplane': 4})
+        self.assertGreater(stats.image_bytes, 0)
+        self.assertGreater(stats.record_bytes, stats.image_bytes)
+        self.assertFalse(verifier.mismatches)
+
+        changed_df = airplane_df.copy()
+        changed_df.loc[2, 'xmax'] = 40
+        changed_df.loc[3, 'filename'] = 'tmp_airplane_image_4.jpg'
+        _, verifier = inspect_records.inspect_records(output_path, labels=changed_df)
+        self.assertEqual(dict(verifier.mismatches), {'boxes': 1, 'not_in_csv': 1, 'missing_from_records': 1})
+        self.assertIn('tmp_airplane_image_4.jpg: missing_from_records', verifier.report())
+
+    def test_verification_follows_the_writer_options(self):
+        """Validate and skip unknown classes in the csv as the writer did before comparing."""
+        column_names = ['filename', 'width', 'height', 'class', 'xmin', 'ymin', 'xmax', 'ymax']
+        airplane_data = [('tmp_airplane_image_1.jpg', 64, 64, 'airplane', 16, 16, 80, 48),
+                         ('tmp_airplane_image_1.jpg', 64, 64, 'bird', 0, 0, 8, 8),
+                         ('tmp_airplane_image_2.jpg', 64, 64, 'bird', 8, 8, 32, 32)]
+        airplane_df = pd.DataFrame(airplane_data, columns=column_names)
+        csv_path = os.path.join(self.get_temp_dir(), 'invalid_labels.csv')
+        airplane_df.to_csv(csv_path, index=None)
+        label_map_path = os.path.join(self.get_temp_dir(), 'airplane.pbtxt')
+        with open(label_map_path, 'w') as fid:
+            fid.write("item {\n  id: 1\n  name: 'airplane'\n}\n")
+        image = PIL.Image.fromarray(np.random.rand(64, 64, 3), 'RGB')
+        for filename in airplane_df['filename'].unique():
+            image.save(os.path.join(self.get_temp_dir(), filename))
+        output_path = os.path.join(self.get_temp_dir(), 'validated.record')
+        generate_tfrecord.main(['--csv_input={}'.format(csv_path), '--output_path={}'.format(output_path),
+                                '--image_dir={}'.format(self.get_temp_dir()),
+                                '--label_map_path={}'.format(label_map_path), '--skip_unknown_classes'])
+
+        inspect_records.main(['--record_path={}'.format(output_path), '--csv_input={}'.format(csv_path),
+                              '--label_map_path={}'.format(label_map_path), '--skip_unknown_classes'])
+        with self.assertRaises(SystemExit):
+            inspect_records.main(['--record_path={}'.format(output_path), '--csv_input={}'.format(csv_path),
+                                  '--box_policy=drop', '--label_map_path={}'.format(label_map_path),
+                                  '--skip_unknown_classes'])
+        with self.assertRaises(SystemExit):
+            inspect_records.main(['--record_path={}'.format(output_path), '--csv_input={}'.format(csv_path)])
@@ -0,0 +1,59 @@
+import io
+import json
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+import instrumentation
+
+
+class InstrumentationTest(unittest.TestCase):
+    def test_timed_adds_to_stage(self):
+        instruments = instrumentation.Instrumentation()
+        with instrumentation.timed(instruments, 'read'):
+            time.sleep(0.01)
+        with instrumentation.timed(None, 'read'):
+            pass
+        self.assertGreater(instruments.stage_seconds['read'], 0)
+        self.assertEqual(instruments.stage_seconds['write'], 0)
+        self.assertEqual(list(instruments.stage_seconds), list(instrumentation.STAGES))
+
+    def test_keeps_slowest_examples_across_merges(self):
+        first = instrumentation.Instrumentation(num_slowest=2)
+        second = instrumentation.Instrumentation(num_slowest=2)
+        for index, seconds in enumerate([0.3, 0.1, 0.5]):
+            first.add_example('a{}.jpg'.format(index), 10, seconds)
+        second.add_example('b.jpg', 5, 0.4)
+        second.add_stage('build', 1.5)
+        first.merge(second)
+        self.assertEqual(first.slowest(), [(0.5, 'a2.jpg'), (0.4, 'b.jpg')])
+        self.assertEqual((first.examples, first.bytes), (4, 35))
+        self.assertEqual(first.stage_seconds['build'], 1.5)
+        self.assertIn('build', first.report())
+
+    def test_write_summary(self):
+        instruments = instrumentation.Instrumentation()
+        instruments.add_example('a.jpg', 100, 0.2)
+        temp_dir = tempfile.mkdtemp()
+        try:
+            path = os.path.join(temp_dir, 'stats.json')
+            instruments.write_summary(path, wall_seconds=2.0)
+            with open(path) as fid:
+                summary = json.load(fid)
+        finally:
+            shutil.rmtree(temp_dir)
+        self.assertEqual(summary['examples'], 1)
+        self.assertEqual(summary['bytes_per_sec'], 50)
+        self.assertEqual(summary['slowest_examples'], [{'filename': 'a.jpg', 'seconds': 0.2}])
+
+    def test_progress_reports_eta(self):
+        stream = io.StringIO()
+        progress = instrumentation.Progress(4, interval=1e-9, stream=stream)
+        time.sleep(0.01)
+        progress.update(2, 2000000)
+        line = stream.getvalue()
+        self.assertIn('2/4 examples', line)
+        self.assertIn('ETA 0:00:00', line)
+        self.assertNotIn('?', progress.line())
@@ -0,0 +1,45 @@
+import os
+import tempfile
+import unittest
+
+import label_map
+
+
+class LabelMapTest(unittest.TestCase):
+    label_map_text = """
+    item {
+      id: 1
+      name: 'airplane'
+    }
+    item {
+      name: "helicopter"
+      id: 2
+    }
+    """
+
+    def test_parse_label_map(self):
+        self.assertEqual(label_map.parse_label_map(self.label_map_text), {'airplane': 1, 'helicopter': 2})
+
+    def test_lookup_is_case_insensitive_by_default(self):
+        labels = label_map.LabelMap(label_map.parse_label_map(self.label_map_text))
+        self.assertEqual(labels.lookup(['Airplane', 'helicopter', 'airplane', 'glider']).tolist(), [1, 2, 1, -1])
+        self.assertEqual(labels['AIRPLANE'], 1)
+
+    def test_case_sensitive_lookup(self):
+        labels = label_map.LabelMap(label_map.parse_label_map(self.label_map_text), case_sensitive=True)
+        self.assertEqual(labels.lookup(['Airplane', 'airplane']).tolist(), [-1, 1])
+        with self.assertRaises(label_map.UnknownClassError):
+            labels['Airplane']
+
+    def test_unknown_classes_report(self):
+        labels = label_map.LabelMap(label_map.parse_label_map(self.label_map_text))
+        unknown = labels.unknown_classes(['glider', 'airplane', 'glider', 'blimp'])
+        self.assertEqual(unknown, {'glider': 2, 'blimp': 1})
+
+    def test_from_file(self):
+        with tempfile.TemporaryDirectory() as tmpdirname:
+            path = os.path.join(tmpdirname, 'label_map.pbtxt')
+            with open(path, 'w') as fid:
+                fid.write(self.label_map_text)
+            labels = label_map.LabelMap.from_file(path)
+        self.assertEqual(labels['Helicopter'], 2)
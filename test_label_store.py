@@ -0,0 +1,49 @@
+import os
+import tempfile
+import unittest
+import pandas as pd
+
+import label_store
+
+
+class LabelStoreTest(unittest.TestCase):
+    column_names = ['filename', 'width', 'height', 'class', 'xmin', 'ymin', 'xmax', 'ymax']
+    airplane_data = [('airplane2.jpg', 320, 200, 'Airplane', 96, 96, 128, 128),
+                     ('airplane1.jpg', 256, 256, 'Airplane', 64, 64, 192, 192),
+                     ('airplane2.jpg', 320, 200, 'Helicopter', 10, 20, 30, 40),
+                     ('airplane3.jpg', 256, 128, 'Airplane', 1, 2, 3, 4)]
+
+    def test_round_trip(self):
+        airplane_df = pd.DataFrame(self.airplane_data, columns=self.column_names)
+        with tempfile.TemporaryDirectory() as tmpdirname:
+            path = os.path.join(tmpdirname, 'labels.store')
+            label_store.write_label_store(airplane_df, path)
+            self.assertTrue(label_store.is_label_store(path))
+            store = label_store.LabelStore(path)
+            self.assertEqual(len(store), 3)
+            self.assertEqual(store.num_boxes, 4)
+            expected = airplane_df.sort_values('filename', kind='mergesort').reset_index(drop=True)
+            self.assertEqual(store.to_dataframe().values.tolist(), expected.values.tolist())
+            self.assertEqual(store.class_counts(), {'Airplane': 3, 'Helicopter': 1})
+
+    def test_boxes_for_one_image(self):
+        airplane_df = pd.DataFrame(self.airplane_data, columns=self.column_names)
+        with tempfile.TemporaryDirectory() as tmpdirname:
+            label_store.write_label_store(airplane_df, tmpdirname)
+            store = label_store.LabelStore(tmpdirname)
+            boxes = store.boxes_for('airplane2.jpg')
+            self.assertEqual(boxes['class'].tolist(), ['Airplane', 'Helicopter'])
+            self.assertEqual(boxes['xmin'].tolist(), [96, 10])
+            self.assertEqual(boxes['ymax'].tolist(), [128, 40])
+            self.assertEqual(boxes['width'].tolist(), [320, 320])
+            self.assertEqual(boxes['height'].tolist(), [200, 200])
+            filename, boxes = store.image_boxes(0)
+            self.assertEqual(filename, 'airplane1.jpg')
+            self.assertEqual(boxes['xmax'].tolist(), [192])
+
+    def test_rejects_non_integer_boxes(self):
+        airplane_df = pd.DataFrame([('airplane1.jpg', 256, 256, 'Airplane', 6.5, 6, 19, 19)],
+                                   columns=self.column_names)
+        with tempfile.TemporaryDirectory() as tmpdirname:
+            with self.assertRaises(ValueError):
+                label_store.write_label_store(airplane_df, tmpdirname)
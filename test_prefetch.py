@@ -0,0 +1,82 @@
+import threading
+import time
+import unittest
+
+import prefetch
+
+
+class PrefetchTest(unittest.TestCase):
+    def test_yields_in_order_with_stats(self):
+        def read(item):
+            time.sleep(0.01 * (item % 3))
+            return b'x' * item
+
+        stats = prefetch.ReadStats()
+        results = list(prefetch.prefetch(range(10), read, max_in_flight=4, stats=stats))
+        self.assertEqual([item for item, _ in results], list(range(10)))
+        self.assertEqual([len(data) for _, data in results], list(range(10)))
+        self.assertEqual(stats.images, 10)
+        self.assertEqual(stats.bytes, 45)
+        self.assertGreater(stats.wall_seconds, 0)
+        self.assertIn('Read 10 images', stats.report())
+
+    def test_throughput_excludes_consumer_time(self):
+        def read(item):
+            time.sleep(0.005)
+            return b'x' * 1000
+
+        stats = prefetch.ReadStats()
+        for _ in prefetch.prefetch(range(6), read, max_in_flight=2, stats=stats):
+            time.sleep(0.05)
+        self.assertGreater(stats.wall_seconds, 0.25)
+        self.assertLess(stats.busy_seconds, 0.15)
+        self.assertLessEqual(stats.busy_seconds, stats.read_seconds + 1e-6)
+        self.assertAlmostEqual(stats.throughput(), stats.bytes / stats.busy_seconds)
+
+    def test_merged_overlapping_loops_use_wall_time(self):
+        def read(item):
+            time.sleep(0.02)
+            return b'x' * 1000
+
+        workers = [prefetch.ReadStats(), prefetch.ReadStats()]
+        threads = [threading.Thread(target=lambda stats=stats: list(prefetch.prefetch(range(5), read, 1, stats)))
+                   for stats in workers]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        merged = prefetch.ReadStats()
+        merged.merge(prefetch.ReadStats())
+        for stats in workers:
+            merged.merge(stats)
+        self.assertEqual((merged.images, merged.bytes, merged.loops), (10, 10000, 2))
+        # Both loops ran at the same time, so the merged span is about one loop's.
+        self.assertLess(merged.wall_seconds, 0.8 * (workers[0].wall_seconds + workers[1].wall_seconds))
+        self.assertAlmostEqual(merged.throughput(), merged.bytes / merged.wall_seconds)
+        self.assertGreater(merged.throughput(), 1.5 * min(stats.bytes / stats.wall_seconds for stats in workers))
+        self.assertIn('in 2 reading loops', merged.report())
+
+    def test_reads_overlap(self):
+        lock = threading.Lock()
+        active = [0, 0]
+
+        def read(item):
+            with lock:
+                active[0] += 1
+                active[1] = max(active[1], active[0])
+            time.sleep(0.02)
+            with lock:
+                active[0] -= 1
+            return b''
+
+        list(prefetch.prefetch(range(8), read, max_in_flight=4))
+        self.assertGreater(active[1], 1)
+        self.assertLessEqual(active[1], 4)
+
+    def test_read_errors_propagate(self):
+        def read(item):
+            raise IOError('missing {}'.format(item))
+
+        with self.assertRaises(IOError):
+            list(prefetch.prefetch(range(3), read))
@@ -0,0 +1,53 @@
+import argparse
+import unittest
+import numpy as np
+import pandas as pd
+
+import split_labels
+
+
+class SplitLabelsTest(unittest.TestCase):
+    def _labels(self, num_images=500, seed=0):
+        rng = np.random.RandomState(seed)
+        rows = []
+        for index in range(num_images):
+            label = 'Airplane' if index % 4 else 'Helicopter'
+            for _ in range(rng.randint(1, 6)):
+                rows.append(('airplane{}.jpg'.format(index), 256, 256, label, 1, 2, 3, 4))
+        return pd.DataFrame(rows, columns=['filename', 'width', 'height', 'class', 'xmin', 'ymin', 'xmax', 'ymax'])
+
+    def test_images_are_not_split_and_fraction_is_kept(self):
+        labels = self._labels()
+        is_test = split_labels.split_groups(labels, test_fraction=0.2, seed=3)
+        test_images = set(labels['filename'][is_test])
+        train_images = set(labels['filename'][~is_test])
+        self.assertFalse(test_images & train_images)
+        self.assertAlmostEqual(len(test_images) / 500.0, 0.2, delta=0.03)
+        helicopters = labels[labels['class'] == 'Helicopter']
+        helicopter_test = set(helicopters['filename'][is_test[labels['class'] == 'Helicopter']])
+        self.assertAlmostEqual(len(helicopter_test) / float(helicopters['filename'].nunique()), 0.2, delta=0.05)
+
+    def test_seed_makes_split_reproducible(self):
+        labels = self._labels()
+        first = split_labels.split_groups(labels, seed=7)
+        self.assertTrue((first == split_labels.split_groups(labels, seed=7)).all())
+        self.assertFalse((first == split_labels.split_groups(labels, seed=8)).all())
+
+    def test_duplicate_groups_stay_together(self):
+        labels = self._labels(num_images=100)
+        groups = pd.Series(['airplane{}.jpg'.format(index - index % 2) for index in range(100)],
+                           index=['airplane{}.jpg'.format(index) for index in range(100)])
+        is_test = split_labels.split_groups(labels, test_fraction=0.3, seed=1, groups=groups)
+        test_images = set(labels['filename'][is_test])
+        for index in range(0, 100, 2):
+            self.assertEqual('airplane{}.jpg'.format(index) in test_images,
+                             'airplane{}.jpg'.format(index + 1) in test_images)
+
+    def test_record_args_forward_label_options(self):
+        args = argparse.Namespace(image_dir='images', num_shards=2, num_workers=1, box_policy='drop',
+                                  label_map_path='labels.pbtxt', case_sensitive_labels=False,
+                                  skip_unknown_classes=True)
+        self.assertEqual(split_labels.record_args(args, 'train.csv', 'train.record'),
+                         ['--csv_input=train.csv', '--output_path=train.record', '--image_dir=images',
+                          '--num_shards=2', '--num_workers=1', '--box_policy=drop',
+                          '--label_map_path=labels.pbtxt', '--skip_unknown_classes'])
@@ -0,0 +1,67 @@
+import os
+import shutil
+import struct
+import tempfile
+import unittest
+
+import tfrecord_io
+
+
+def _frame(data):
+    # The reader ignores the checksums, so zeros will do.
+    return struct.pack('<Q', len(data)) + b'\0' * 4 + data + b'\0' * 4
+
+
+class TFRecordIOTest(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def _write(self, name, records):
+        path = os.path.join(self.temp_dir, name)
+        with open(path, 'wb') as fid:
+            for record in records:
+                fid.write(_frame(record))
+        return path
+
+    def test_iter_records(self):
+        path = self._write('train.record', [b'first', b'', b'x' * 1000])
+        self.assertEqual(list(tfrecord_io.iter_records(path)), [b'first', b'', b'x' * 1000])
+
+    def test_truncated_record(self):
+        path = self._write('train.record', [b'first', b'second'])
+        with open(path, 'r+b') as fid:
+            fid.truncate(os.path.getsize(path) - 6)
+        records = tfrecord_io.iter_records(path)
+        self.assertEqual(next(records), b'first')
+        with self.assertRaises(tfrecord_io.CorruptRecordError):
+            next(records)
+
+    def test_sharded_records_in_batches(self):
+        self._write('train.record-00001-of-00002', [b'c', b'd', b'e'])
+        self._write('train.record-00000-of-00002', [b'a', b'b'])
+        paths = tfrecord_io.record_paths(os.path.join(self.temp_dir, 'train.record'))
+        self.assertEqual([os.path.basename(path) for path in paths],
+                         ['train.record-00000-of-00002', 'train.record-00001-of-00002'])
+        self.assertEqual(list(tfrecord_io.iter_batches(paths, 2)), [[b'a', b'b'], [b'c', b'd'], [b'e']])
+        with self.assertRaises(IOError):
+            tfrecord_io.record_paths(os.path.join(self.temp_dir, 'test.record'))
+
+    def test_crc32c(self):
+        self.assertEqual(tfrecord_io.crc32c(b'123456789'), 0xe3069283)
+        self.assertEqual(tfrecord_io.crc32c(b''), 0)
+
+    def test_writer_round_trip(self):
+        path = os.path.join(self.temp_dir, 'train.record')
+        with tfrecord_io.RecordWriter(path) as writer:
+            writer.write(b'first')
+            writer.write(b'')
+        self.assertEqual(list(tfrecord_io.iter_records(path)), [b'first', b''])
+        with open(path, 'rb') as fid:
+            data = fid.read()
+        length_crc, = struct.unpack('<I', data[8:12])
+        data_crc, = struct.unpack('<I', data[17:21])
+        self.assertEqual(length_crc, tfrecord_io.masked_crc32c(struct.pack('<Q', 5)))
+        self.assertEqual(data_crc, tfrecord_io.masked_crc32c(b'first'))
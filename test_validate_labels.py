@@ -0,0 +1,72 @@
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+
+import label_store
+import validate_labels
+
+column_names = ['filename', 'width', 'height', 'class', 'xmin', 'ymin', 'xmax', 'ymax']
+
+
+def _labels():
+    return pd.DataFrame([
+        ('a.jpg', 100, 100, 'airplane', 10, 10, 50, 50),
+        ('a.jpg', 100, 100, 'airplane', -5, 10, 120, 50),
+        ('a.jpg', 100, 100, 'airplane', 60, 10, 50, 50),
+        ('a.jpg', 100, 100, 'airplane', 200, 10, 250, 50),
+        ('b.jpg', 0, 100, 'airplane', 1, 1, 5, 5),
+        ('c.jpg', 100, 100, 'airplane', 5, 5, 5, 10),
+        ('c.jpg', 200, 100, 'airplane', 5, 5, 10, 10),
+    ], columns=column_names)
+
+
+class ValidateLabelsTest(unittest.TestCase):
+    def test_box_problems(self):
+        problems = validate_labels.box_problems(_labels())
+        self.assertEqual(np.flatnonzero(problems['out_of_bounds']).tolist(), [1, 3, 4])
+        self.assertEqual(np.flatnonzero(problems['inverted']).tolist(), [2])
+        self.assertEqual(np.flatnonzero(problems['bad_image_size']).tolist(), [4])
+        self.assertEqual(np.flatnonzero(problems['zero_area']).tolist(), [5])
+        self.assertEqual(np.flatnonzero(problems['inconsistent_image_size']).tolist(), [6])
+
+    def test_clip_policy(self):
+        valid, issues = validate_labels.validate_boxes(_labels(), policy='clip')
+        self.assertEqual(valid.index.tolist(), [0, 1])
+        self.assertEqual(valid.loc[1, ['xmin', 'ymin', 'xmax', 'ymax']].tolist(), [0, 10, 100, 50])
+        self.assertEqual(issues.index.tolist(), [1, 2, 3, 4, 5, 6])
+        self.assertEqual(issues['action'].tolist(), ['clipped'] + ['dropped'] * 5)
+        # The report keeps the boxes as they were.
+        self.assertEqual(issues.loc[1, 'xmin'], -5)
+        self.assertEqual(issues.loc[4, 'problem'], 'bad_image_size out_of_bounds')
+        self.assertIn('Clipped 1 and dropped 5', validate_labels.summarize_issues(issues))
+
+    def test_drop_and_fail_policies(self):
+        valid, issues = validate_labels.validate_boxes(_labels(), policy='drop')
+        self.assertEqual(valid.index.tolist(), [0])
+        self.assertEqual(set(issues['action']), {'dropped'})
+        with self.assertRaises(validate_labels.InvalidBoxError):
+            validate_labels.validate_boxes(_labels(), policy='fail')
+        with self.assertRaises(ValueError):
+            validate_labels.validate_boxes(_labels(), policy='ignore')
+
+    def test_valid_labels_are_returned_unchanged(self):
+        labels = _labels().iloc[:1]
+        valid, issues = validate_labels.validate_boxes(labels, policy='fail')
+        self.assertIs(valid, labels)
+        self.assertEqual(len(issues), 0)
+        self.assertEqual(validate_labels.summarize_issues(issues), 'All boxes are valid.')
+
+    def test_label_store_boxes(self):
+        temp_dir = tempfile.mkdtemp()
+        try:
+            label_store.write_label_store(_labels().iloc[:1], temp_dir)
+            store = label_store.LabelStore(temp_dir)
+            self.assertFalse(validate_labels.has_invalid_boxes(validate_labels.store_box_frame(store)))
+            label_store.write_label_store(_labels().iloc[:2], temp_dir)
+            store = label_store.LabelStore(temp_dir)
+            self.assertTrue(validate_labels.has_invalid_boxes(validate_labels.store_box_frame(store)))
+        finally:
+            shutil.rmtree(temp_dir)
@@ -168,3 +168,114 @@ class XMLToCSVTest(unittest.TestCase):
         self.assertEqual(airplane_df.values.tolist()[0], ['airplane1.png', 256, 256, 'airplane', 96, 96, 128, 128])
         self.assertEqual(airplane_df.values.tolist()[1], ['airplane2.png', 256, 256, 'airplane', 128, 128, 194, 194])
         shutil.rmtree(tmpdirname)
+
+    def test_parallel_matches_serial(self):
+        xml_template = """
+        <annotation verified="yes">
+            <folder>images</folder>
+            <filename>airplane{0}.png</filename>
+            <size>
+                <width>256</width>
+                <height>128</height>
+                <depth>3</depth>
+            </size>
+            <object>
+                <name>airplane</name>
+                <pose>Unspecified</pose>
+                <truncated>0</truncated>
+                <difficult>0</difficult>
+                <bndbox>
+                    <xmin>{0}</xmin>
+                    <ymin>{1}</ymin>
+                    <xmax>{2}</xmax>
+                    <ymax>{3}</ymax>
+                </bndbox>
+            </object>
+        </annotation>
+        """
+        with tempfile.TemporaryDirectory() as tmpdirname:
+            for index in range(10):
+                xml = ET.fromstring(xml_template.format(index, index + 1, index + 20, index + 30))
+                ET.ElementTree(xml).write(os.path.join(tmpdirname, 'test_airplane_{}.xml'.format(index)))
+            serial_df = xml_to_csv.xml_to_csv(tmpdirname)
+            parallel_df = xml_to_csv.xml_to_csv(tmpdirname, num_workers=2, chunk_size=3)
+            self.assertEqual(len(parallel_df), 10)
+            self.assertTrue(serial_df.equals(parallel_df))
+
+    def test_incremental_index_reparses_changed_files(self):
+        xml_template = """
+        <annotation verified="yes">
+            <filename>airplane{0}.png</filename>
+            <size>
+                <width>256</width>
+                <height>256</height>
+                <depth>3</depth>
+            </size>
+            <object>
+                <name>airplane</name>
+                <pose>Unspecified</pose>
+                <truncated>0</truncated>
+                <difficult>0</difficult>
+                <bndbox>
+                    <xmin>{1}</xmin>
+                    <ymin>{1}</ymin>
+                    <xmax>200</xmax>
+                    <ymax>200</ymax>
+                </bndbox>
+            </object>
+        </annotation>
+        """
+        with tempfile.TemporaryDirectory() as tmpdirname:
+            annotation_dir = os.path.join(tmpdirname, 'annotations')
+            os.mkdir(annotation_dir)
+            index_path = os.path.join(tmpdirname, 'index.json')
+
+            def write(index, xmin):
+                xml = ET.fromstring(xml_template.format(index, xmin))
+                ET.ElementTree(xml).write(os.path.join(annotation_dir, 'test_airplane_{}.xml'.format(index)))
+
+            for index in range(3):
+                write(index, 10)
+            airplane_df, num_parsed = xml_to_csv.xml_to_csv_incremental(annotation_dir, index_path)
+            self.assertEqual(num_parsed, 3)
+            self.assertTrue(airplane_df.equals(xml_to_csv.xml_to_csv(annotation_dir)))
+
+            airplane_df, num_parsed = xml_to_csv.xml_to_csv_incremental(annotation_dir, index_path)
+            self.assertEqual(num_parsed, 0)
+            self.assertTrue(airplane_df.equals(xml_to_csv.xml_to_csv(annotation_dir)))
+
+            write(1, 123)
+            os.remove(os.path.join(annotation_dir, 'test_airplane_2.xml'))
+            airplane_df, num_parsed = xml_to_csv.xml_to_csv_incremental(annotation_dir, index_path)
+            self.assertEqual(num_parsed, 1)
+            self.assertEqual(len(airplane_df), 2)
+            self.assertTrue(airplane_df.equals(xml_to_csv.xml_to_csv(annotation_dir)))
+
+    def test_parsers_read_fields_by_tag_name(self):
+        xml_file_reordered = """
+        <annotation verified="yes">
+            <size>
+                <depth>3</depth>
+                <height>128</height>
+                <width>256</width>
+            </size>
+            <filename>airplane1.png</filename>
+            <object>
+                <bndbox>
+                    <ymax>128</ymax>
+                    <xmax>120</xmax>
+                    <ymin>96</ymin>
+                    <xmin>90</xmin>
+                </bndbox>
+                <difficult>0</difficult>
+                <name>airplane</name>
+            </object>
+        </annotation>
+        """
+        with tempfile.TemporaryDirectory() as tmpdirname:
+            xml_file = os.path.join(tmpdirname, 'test_airplane_one.xml')
+            ET.ElementTree(ET.fromstring(xml_file_reordered)).write(xml_file)
+            parsers = [name for name in xml_to_csv.PARSERS if name != 'lxml' or xml_to_csv.lxml_etree is not None]
+            for parser in parsers:
+                self.assertEqual(xml_to_csv.parse_xml(xml_file, parser),
+                                 [('airplane1.png', 256, 128, 'airplane', 90, 96, 120, 128)])
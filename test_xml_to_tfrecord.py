@@ -0,0 +1,102 @@
+import os
+import PIL
+import numpy as np
+import tensorflow as tf
+from xml.etree import ElementTree as ET
+
+import xml_to_tfrecord
+
+
+class XMLToTFRecordTest(tf.test.TestCase):
+    xml_template = """
+    <annotation verified="yes">
+        <folder>images</folder>
+        <filename>{0}</filename>
+        <size>
+            <width>256</width>
+            <height>256</height>
+            <depth>3</depth>
+        </size>
+        <object>
+            <name>airplane</name>
+            <pose>Unspecified</pose>
+            <truncated>0</truncated>
+            <difficult>0</difficult>
+            <bndbox>
+                <xmin>64</xmin>
+                <ymin>64</ymin>
+                <xmax>192</xmax>
+                <ymax>192</ymax>
+            </bndbox>
+        </object>
+    </annotation>
+    """
+
+    def test_buffered_keeps_order_and_raises(self):
+        self.assertListEqual(list(xml_to_tfrecord.buffered(iter(range(100)), 4)), list(range(100)))
+
+        def failing():
+            yield 1
+            raise IOError('disk gone')
+        with self.assertRaises(IOError):
+            list(xml_to_tfrecord.buffered(failing(), 4))
+
+    def test_stream_records(self):
+        """Stream every xml file into one example, round-robin over the shards."""
+        annotation_dir = os.path.join(self.get_temp_dir(), 'annotations')
+        os.mkdir(annotation_dir)
+        image = PIL.Image.fromarray(np.random.rand(256, 256, 3), 'RGB')
+        for index in range(4):
+            image_file_name = 'tmp_airplane_image_{}.jpg'.format(index)
+            image.save(os.path.join(self.get_temp_dir(), image_file_name))
+            xml = ET.fromstring(self.xml_template.format(image_file_name))
+            ET.ElementTree(xml).write(os.path.join(annotation_dir, 'airplane_{}.xml'.format(index)))
+
+        output_path = os.path.join(self.get_temp_dir(), 'airplane.record')
+        count = xml_to_tfrecord.stream_records(annotation_dir, self.get_temp_dir(), output_path,
+                                               num_shards=2, num_workers=2, queue_size=2)
+        self.assertEqual(count, 4)
+
+        filenames = []
+        for shard in range(2):
+            for record in tf.python_io.tf_record_iterator('{}-{:05d}-of-00002'.format(output_path, shard)):
+                example = tf.train.Example.FromString(record)
+                filenames.append(example.features.feature['image/filename'].bytes_list.value[0])
+                self.assertListEqual(list(example.features.feature['image/object/bbox/xmin'].float_list.value),
+                                     [0.25])
+        self.assertListEqual(sorted(filenames), [
+            'tmp_airplane_image_{}.jpg'.format(index).encode('utf-8') for index in range(4)])
+        self.assertFalse([name for name in os.listdir(self.get_temp_dir()) if name.endswith('.tmp')])
+
+    def test_failed_stream_leaves_no_record(self):
+        """Keep a partly written record under its temporary name."""
+        annotation_dir = os.path.join(self.get_temp_dir(), 'broken_annotations')
+        os.mkdir(annotation_dir)
+        xml = ET.fromstring(self.xml_template.format('missing_image.jpg'))
+        ET.ElementTree(xml).write(os.path.join(annotation_dir, 'missing.xml'))
+
+        output_path = os.path.join(self.get_temp_dir(), 'broken.record')
+        with self.assertRaises(IOError):
+            xml_to_tfrecord.stream_records(annotation_dir, self.get_temp_dir(), output_path)
+        self.assertFalse(os.path.exists(output_path))
+
+    def test_iter_annotation_groups_validates_boxes(self):
+        """Clip a box sticking out of the image and skip a file whose only box is empty."""
+        annotation_dir = os.path.join(self.get_temp_dir(), 'invalid_annotations')
+        os.mkdir(annotation_dir)
+        for name, xmax in (('wide', '300'), ('empty', '64')):
+            xml = ET.fromstring(self.xml_template.format('{}.jpg'.format(name)))
+            xml.find('object/bndbox/xmax').text = xmax
+            ET.ElementTree(xml).write(os.path.join(annotation_dir, '{}.xml'.format(name)))
+
+        issues = []
+        groups = list(xml_to_tfrecord.iter_annotation_groups(annotation_dir, issues=issues))
+        self.assertEqual([group.filename for group in groups], ['wide.jpg'])
+        self.assertListEqual(list(groups[0].object['xmax']), [256])
+        actions = sorted((row['filename'], row['problem'], row['action'])
+                         for issue in issues for _, row in issue.iterrows())
+        self.assertListEqual(actions, [('empty.jpg', 'zero_area', 'dropped'),
+                                       ('wide.jpg', 'out_of_bounds', 'clipped')])
+
+        with self.assertRaises(ValueError):
+            list(xml_to_tfrecord.iter_annotation_groups(annotation_dir, box_policy='fail'))
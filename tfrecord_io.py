@@ -0,0 +1,156 @@
+"""
+TFRecord file framing, without TensorFlow.
+
+Every record is stored as
+
+  uint64 length, uint32 masked crc32c of length, data, uint32 masked crc32c of data
+
+all little-endian. Reading only needs the lengths, so records are streamed
+with a constant amount of memory. The checksums are not verified.
+
+Writing needs the checksums. They are computed by the `crc32c` or
+`google_crc32c` package when one is installed; otherwise `open_writer` uses
+TensorFlow's writer if TensorFlow is installed, and pure Python (a few MB/s,
+with a warning) as the last resort.
+"""
+import os
+import glob
+import struct
+import logging
+
+try:
+    from crc32c import crc32c as _fast_crc32c
+except ImportError:
+    try:
+        from google_crc32c import value as _fast_crc32c
+    except ImportError:
+        _fast_crc32c = None
+
+_LENGTH = struct.Struct('<Q')
+_CRC = struct.Struct('<I')
+_HEADER_BYTES = _LENGTH.size + 4
+_FOOTER_BYTES = 4
+_MASK_DELTA = 0xa282ead8
+
+
+def _crc32c_table():
+    table = []
+    for byte in range(256):
+        crc = byte
+        for _ in range(8):
+            crc = (crc >> 1) ^ (0x82f63b78 if crc & 1 else 0)
+        table.append(crc)
+    return table
+
+
+_CRC32C_TABLE = _crc32c_table()
+_warned_slow_crc32c = False
+
+
+def crc32c(data):
+    """Return the CRC-32C (Castagnoli) checksum of `data`."""
+    if _fast_crc32c is not None:
+        return _fast_crc32c(data)
+    table = _CRC32C_TABLE
+    crc = 0xffffffff
+    for byte in bytearray(data):
+        crc = table[(crc ^ byte) & 0xff] ^ (crc >> 8)
+    return crc ^ 0xffffffff
+
+
+def masked_crc32c(data):
+    crc = crc32c(data)
+    return (((crc >> 15) | (crc << 17)) + _MASK_DELTA) & 0xffffffff
+
+
+class CorruptRecordError(IOError):
+    pass
+
+
+def record_paths(path):
+    """Return the files of the record `path`: the file itself, or its shards written as path-NNNNN-of-NNNNN.
+
+    `path` may also be a glob pattern.
+    """
+    if os.path.isfile(path):
+        return [path]
+    paths = sorted(glob.glob(path)) or sorted(glob.glob('{}-?????-of-?????'.format(path)))
+    if not paths:
+        raise IOError('No records found at {}'.format(path))
+    return paths
+
+
+def iter_records(path):
+    """Yield the serialized records of a single TFRecord file."""
+    with open(path, 'rb') as fid:
+        while True:
+            header = fid.read(_HEADER_BYTES)
+            if not header:
+                return
+            if len(header) < _HEADER_BYTES:
+                raise CorruptRecordError('Truncated record header in {}'.format(path))
+            length, = _LENGTH.unpack_from(header)
+            data = fid.read(length)
+            if len(data) < length or len(fid.read(_FOOTER_BYTES)) < _FOOTER_BYTES:
+                raise CorruptRecordError('Truncated record in {}'.format(path))
+            yield data
+
+
+def iter_batches(paths, batch_size):
+    """Yield lists of up to `batch_size` serialized records from the files in `paths`, in order."""
+    batch = []
+    for path in paths:
+        for record in iter_records(path):
+            batch.append(record)
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+    if batch:
+        yield batch
+
+
+class RecordWriter(object):
+    """Writes serialized records to a local TFRecord file, like tf.python_io.TFRecordWriter."""
+
+    def __init__(self, path):
+        self._fid = open(path, 'wb')
+
+    def write(self, record):
+        length = _LENGTH.pack(len(record))
+        self._fid.write(length)
+        self._fid.write(_CRC.pack(masked_crc32c(length)))
+        self._fid.write(record)
+        self._fid.write(_CRC.pack(masked_crc32c(record)))
+
+    def close(self):
+        self._fid.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def _warn_slow_crc32c():
+    global _warned_slow_crc32c
+    if not _warned_slow_crc32c:
+        _warned_slow_crc32c = True
+        logging.warning('Neither crc32c nor TensorFlow is installed, so record checksums are computed in pure '
+                        'Python at a few MB/s; pip install crc32c to write records much faster')
+
+
+def open_writer(path):
+    """Return the fastest available writer of TFRecord `path`."""
+    if '://' in path:
+        # Remote file systems (gs://, hdfs://) need TensorFlow's writer.
+        import tensorflow as tf
+        return tf.python_io.TFRecordWriter(path)
+    if _fast_crc32c is None:
+        try:
+            import tensorflow as tf
+        except ImportError:
+            _warn_slow_crc32c()
+            return RecordWriter(path)
+        return tf.python_io.TFRecordWriter(path)
+    return RecordWriter(path)
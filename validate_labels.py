@@ -0,0 +1,153 @@
+"""
+Usage:
+  # Check a label csv, clip boxes that stick out of their image, drop the rest of the bad ones:
+  python validate_labels.py --csv_input=data/train_labels.csv --output_path=data/train_labels_valid.csv \
+    --report_path=data/train_labels_issues.csv --policy=clip
+
+Every check runs on whole columns at once, so validating millions of boxes
+takes a fraction of a second. xml_to_csv.py and generate_tfrecord.py run the
+same validation by default.
+"""
+from __future__ import division
+from __future__ import print_function
+
+import argparse
+from collections import OrderedDict, Counter
+
+import numpy as np
+import pandas as pd
+
+# clip: clip boxes that stick out of the image and drop boxes that cannot be fixed.
+# drop: drop every invalid box. fail: raise InvalidBoxError on any invalid box.
+POLICIES = ('clip', 'drop', 'fail')
+DEFAULT_POLICY = 'clip'
+column_name = ['filename', 'width', 'height', 'class', 'xmin', 'ymin', 'xmax', 'ymax']
+BOX_COLUMNS = ['xmin', 'ymin', 'xmax', 'ymax']
+
+
+class InvalidBoxError(ValueError):
+    pass
+
+
+def box_problems(df):
+    """Return an OrderedDict of problem name to a boolean mask over the rows of `df`.
+
+    Rows of one file name are expected to share one positive width and height.
+    Box coordinates must be finite, inside the image and span a positive area.
+    """
+    width = np.asarray(df['width'], dtype=np.float64)
+    height = np.asarray(df['height'], dtype=np.float64)
+    xmin, ymin, xmax, ymax = (np.asarray(df[name], dtype=np.float64) for name in BOX_COLUMNS)
+
+    image_codes, _ = pd.factorize(df['filename'])
+    _, first_rows = np.unique(image_codes, return_index=True)
+    first_width = width[first_rows][image_codes]
+    first_height = height[first_rows][image_codes]
+
+    problems = OrderedDict()
+    # Comparisons with NaN are False, so missing sizes are caught by the negations.
+    problems['bad_image_size'] = ~(width > 0) | ~(height > 0)
+    problems['inconsistent_image_size'] = (width != first_width) | (height != first_height)
+    problems['non_finite'] = ~(np.isfinite(xmin) & np.isfinite(ymin) & np.isfinite(xmax) & np.isfinite(ymax))
+    problems['out_of_bounds'] = (xmin < 0) | (ymin < 0) | (xmax > width) | (ymax > height)
+    problems['inverted'] = (xmin > xmax) | (ymin > ymax)
+    problems['zero_area'] = (xmin == xmax) | (ymin == ymax)
+    return problems
+
+
+def has_invalid_boxes(df):
+    return bool(np.logical_or.reduce(list(box_problems(df).values())).any())
+
+
+def store_box_frame(store):
+    """Return the boxes of a `LabelStore` as a table for `box_problems`.
+
+    Images are keyed by their index rather than their file name, so no
+    strings are built.
+    """
+    boxes_per_image = np.diff(store.image_offsets)
+    data = {
+        'filename': np.repeat(np.arange(len(store)), boxes_per_image),
+        'width': np.repeat(store.image_size[:, 0], boxes_per_image),
+        'height': np.repeat(store.image_size[:, 1], boxes_per_image),
+    }
+    for column, name in enumerate(BOX_COLUMNS):
+        data[name] = store.boxes[:, column]
+    return pd.DataFrame(data)
+
+
+def _problem_labels(problems, rows):
+    labels = np.full(len(rows), '', dtype=object)
+    for name, mask in problems.items():
+        labels = labels + np.where(mask[rows], name + ' ', '')
+    return [label.strip() for label in labels]
+
+
+def validate_boxes(df, policy=DEFAULT_POLICY):
+    """Return (valid rows of `df`, issues) after applying `policy` to the invalid boxes.
+
+    `issues` holds the original invalid rows with the `problem`s found and the
+    `action` taken. With the clip policy, boxes whose only problem is sticking
+    out of the image are clipped to it; they are dropped if nothing is left.
+    """
+    if policy not in POLICIES:
+        raise ValueError('Unknown box policy {}, expected one of {}'.format(policy, ', '.join(POLICIES)))
+    problems = box_problems(df)
+    invalid = np.logical_or.reduce(list(problems.values()))
+    if not invalid.any():
+        return df, pd.DataFrame(columns=list(df.columns) + ['problem', 'action'])
+    if policy == 'fail':
+        raise InvalidBoxError('Invalid boxes: {}'.format(
+            ', '.join('{} ({} boxes)'.format(name, int(mask.sum())) for name, mask in problems.items() if mask.any())))
+
+    # Report the boxes as they were, not as clipped.
+    rows = np.flatnonzero(invalid)
+    issues = df.iloc[rows].copy()
+    drop = invalid
+    if policy == 'clip':
+        unfixable = np.logical_or.reduce([mask for name, mask in problems.items() if name != 'out_of_bounds'])
+        clip = invalid & ~unfixable
+        df = df.copy()
+        for name, limit in (('xmin', 'width'), ('xmax', 'width'), ('ymin', 'height'), ('ymax', 'height')):
+            values = np.asarray(df[name].values)
+            clipped = np.clip(values, 0, np.asarray(df[limit].values)).astype(values.dtype)
+            df[name] = np.where(clip, clipped, values)
+        # A box entirely outside the image is clipped to nothing.
+        empty = ((np.asarray(df['xmin'].values) >= np.asarray(df['xmax'].values)) |
+                 (np.asarray(df['ymin'].values) >= np.asarray(df['ymax'].values)))
+        drop = unfixable | (clip & empty)
+    issues['problem'] = _problem_labels(problems, rows)
+    issues['action'] = np.where(drop[rows], 'dropped', 'clipped')
+    return df[~drop], issues
+
+
+def summarize_issues(issues):
+    """Return a one line summary of the issues found by `validate_boxes`."""
+    if not len(issues):
+        return 'All boxes are valid.'
+    problems = Counter(name for label in issues['problem'] for name in label.split())
+    actions = Counter(issues['action'])
+    return 'Clipped {} and dropped {} invalid boxes: {}'.format(
+        actions['clipped'], actions['dropped'],
+        ', '.join('{} ({} boxes)'.format(name, count) for name, count in problems.most_common()))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Check the boxes of a label csv.')
+    parser.add_argument('--csv_input', required=True, help='Label csv to check')
+    parser.add_argument('--output_path', default='', help='Write the valid (and clipped) labels here')
+    parser.add_argument('--report_path', default='', help='Write the invalid boxes and what was done here')
+    parser.add_argument('--policy', default=DEFAULT_POLICY, choices=POLICIES, help='What to do with invalid boxes')
+    args = parser.parse_args(argv)
+
+    labels = pd.read_csv(args.csv_input)
+    valid, issues = validate_boxes(labels, policy=args.policy)
+    print(summarize_issues(issues))
+    if args.report_path:
+        issues.to_csv(args.report_path, index=None)
+    if args.output_path:
+        valid.to_csv(args.output_path, index=None)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,35 +1,282 @@
 import os
 import glob
+import json
+import argparse
+import multiprocessing
+import functools
 import pandas as pd
 import xml.etree.ElementTree as ET
 
+from annotation_stats import update_stats_file
+from label_store import write_label_store
+from validate_labels import POLICIES, DEFAULT_POLICY, column_name, summarize_issues, validate_boxes
 
-def xml_to_csv(path):
-    xml_list = []
-    for xml_file in glob.glob(path + '/*.xml'):
-        tree = ET.parse(xml_file)
-        root = tree.getroot()
-        for member in root.findall('object'):
-            value = (root.find('filename').text,
-                     int(root.find('size')[0].text),
-                     int(root.find('size')[1].text),
-                     member[0].text,
-                     int(member[4][0].text),
-                     int(member[4][1].text),
-                     int(member[4][2].text),
-                     int(member[4][3].text)
-                     )
-            xml_list.append(value)
-    column_name = ['filename', 'width', 'height', 'class', 'xmin', 'ymin', 'xmax', 'ymax']
+try:
+    from lxml import etree as lxml_etree
+except ImportError:
+    lxml_etree = None
+
+
+INDEX_VERSION = 1
+
+
+def _object_row(member):
+    bndbox = member.find('bndbox')
+    return (member.findtext('name'),
+            int(bndbox.findtext('xmin')),
+            int(bndbox.findtext('ymin')),
+            int(bndbox.findtext('xmax')),
+            int(bndbox.findtext('ymax')))
+
+
+def parse_xml_etree(xml_file):
+    """Parse one VOC file into a full ElementTree and read its fields by tag name."""
+    root = ET.parse(xml_file).getroot()
+    filename = root.findtext('filename')
+    size = root.find('size')
+    width = int(size.findtext('width'))
+    height = int(size.findtext('height'))
+    return [(filename, width, height) + _object_row(member) for member in root.iterfind('object')]
+
+
+def _iterparse_rows(events, release):
+    filename = None
+    width = height = None
+    objects = []
+    for event, elem in events:
+        if event != 'end':
+            continue
+        tag = elem.tag
+        if tag == 'filename' and filename is None:
+            filename = elem.text
+        elif tag == 'size':
+            width = int(elem.findtext('width'))
+            height = int(elem.findtext('height'))
+            release(elem)
+        elif tag == 'object':
+            objects.append(_object_row(elem))
+            release(elem)
+    return [(filename, width, height) + member for member in objects]
+
+
+def parse_xml_iterparse(xml_file):
+    """Parse one VOC file in a single streaming pass, reading its fields by tag name.
+
+    Slower than `parse_xml_etree`, but every object is dropped from the tree
+    once read, so memory stays flat on very large files.
+    """
+    # The start of the root is the only start event needed, but ElementTree
+    # cannot hand out the root otherwise.
+    events = ET.iterparse(xml_file, events=('start', 'end'))
+    _, root = next(events)
+
+    def release(elem):
+        # Everything read so far is a finished child of the root.
+        del root[:]
+    return _iterparse_rows(events, release)
+
+
+def _release_lxml(elem):
+    elem.clear()
+    if elem.tag == 'object':
+        # Drop the objects already read, which lxml keeps attached to the tree.
+        while elem.getprevious() is not None:
+            del elem.getparent()[0]
+
+
+def parse_xml_lxml(xml_file):
+    """Like `parse_xml_iterparse`, using lxml's iterparse restricted to the tags we read."""
+    if lxml_etree is None:
+        raise ImportError('The lxml parser needs the lxml package')
+    return _iterparse_rows(lxml_etree.iterparse(xml_file, events=('end',), tag=('filename', 'size', 'object')),
+                           _release_lxml)
+
+
+PARSERS = {
+    'etree': parse_xml_etree,
+    'iterparse': parse_xml_iterparse,
+    'lxml': parse_xml_lxml,
+}
+DEFAULT_PARSER = 'etree'
+
+
+def parse_xml(xml_file, parser=DEFAULT_PARSER):
+    """Return the (filename, width, height, class, xmin, ymin, xmax, ymax) rows of one VOC file."""
+    return PARSERS[parser](xml_file)
+
+
+def parse_xml_chunk(xml_files, parser=DEFAULT_PARSER):
+    """Parse a batch of VOC files into one list per column, in file order."""
+    columns = [[] for _ in column_name]
+    for xml_file in xml_files:
+        for value in parse_xml(xml_file, parser):
+            for column, item in zip(columns, value):
+                column.append(item)
+    return columns
+
+
+def _chunks(items, chunk_size):
+    for start in range(0, len(items), chunk_size):
+        yield items[start:start + chunk_size]
+
+
+def _pool_map(func, items, num_workers, chunksize=None):
+    pool = multiprocessing.Pool(num_workers)
+    try:
+        return pool.map(func, items, chunksize)
+    finally:
+        pool.close()
+        pool.join()
+
+
+def read_chunks(items, read_chunk, num_workers=1, chunk_size=256):
+    """Read annotation sources into one DataFrame with `column_name` columns.
+
+    `read_chunk` turns a list of sources into one list per column. With
+    `num_workers > 1` the sources are read in a process pool, `chunk_size`
+    per task; chunks are merged in order so the result is identical to the
+    serial run. Every annotation format goes through here.
+    """
+    if num_workers > 1 and len(items) > chunk_size:
+        chunks = _pool_map(read_chunk, list(_chunks(items, chunk_size)), num_workers)
+    else:
+        chunks = [read_chunk(items)]
+
+    if not any(chunk[0] for chunk in chunks):
+        return pd.DataFrame([], columns=column_name)
+    data = {}
+    for index, name in enumerate(column_name):
+        data[name] = [item for chunk in chunks for item in chunk[index]]
+    return pd.DataFrame(data, columns=column_name)
+
+
+def xml_to_csv(path, num_workers=1, chunk_size=256, parser=DEFAULT_PARSER):
+    """Convert every `path/*.xml` annotation into one DataFrame.
+
+    With `num_workers > 1` the files are parsed in a process pool, `chunk_size`
+    files per task. `parser` names one of `PARSERS`.
+    """
+    xml_files = glob.glob(path + '/*.xml')
+    return read_chunks(xml_files, functools.partial(parse_xml_chunk, parser=parser), num_workers, chunk_size)
+
+
+def _file_stat(xml_file):
+    stat = os.stat(xml_file)
+    return stat.st_mtime_ns, stat.st_size
+
+
+def load_index(index_path):
+    """Return the {file name: {'mtime', 'size', 'rows'}} entries stored at `index_path`."""
+    if not os.path.exists(index_path):
+        return {}
+    with open(index_path) as fid:
+        index = json.load(fid)
+    if index.get('version') != INDEX_VERSION:
+        return {}
+    return index['files']
+
+
+def save_index(index_path, files):
+    tmp_path = index_path + '.tmp'
+    with open(tmp_path, 'w') as fid:
+        json.dump({'version': INDEX_VERSION, 'files': files}, fid)
+    os.replace(tmp_path, index_path)
+
+
+def xml_to_csv_incremental(path, index_path, num_workers=1, chunk_size=256, parser=DEFAULT_PARSER):
+    """Same result as `xml_to_csv(path)`, re-parsing only files changed since the last run.
+
+    Parsed rows are cached in a json index at `index_path`, keyed by file name
+    and validated by mtime and size. Files that disappeared are dropped from
+    the index. Returns the DataFrame and the number of files parsed.
+    """
+    cached = load_index(index_path)
+    xml_files = glob.glob(path + '/*.xml')
+    files = {}
+    stale = []
+    for xml_file in xml_files:
+        name = os.path.basename(xml_file)
+        mtime, size = _file_stat(xml_file)
+        entry = cached.get(name)
+        if entry is not None and entry['mtime'] == mtime and entry['size'] == size:
+            files[name] = entry
+        else:
+            files[name] = {'mtime': mtime, 'size': size, 'rows': None}
+            stale.append(xml_file)
+
+    if num_workers > 1 and len(stale) > chunk_size:
+        parsed = _pool_map(PARSERS[parser], stale, num_workers, chunk_size)
+    else:
+        parsed = [parse_xml(xml_file, parser) for xml_file in stale]
+    for xml_file, rows in zip(stale, parsed):
+        files[os.path.basename(xml_file)]['rows'] = [list(row) for row in rows]
+    if stale or len(files) != len(cached):
+        save_index(index_path, files)
+
+    xml_list = [tuple(row) for xml_file in xml_files for row in files[os.path.basename(xml_file)]['rows']]
     xml_df = pd.DataFrame(xml_list, columns=column_name)
-    return xml_df
+    return xml_df, len(stale)
+
 
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Convert PASCAL VOC xml, COCO json or YOLO txt files into one csv.')
+    parser.add_argument('--annotation_dir', default=os.path.join(os.getcwd(), 'annotations'),
+                        help='Directory containing the annotation files, or a COCO json file')
+    parser.add_argument('--format', default='voc', choices=['voc', 'coco', 'yolo'], help='Annotation format')
+    parser.add_argument('--image_dir', default='',
+                        help='YOLO only: directory of the images, for their sizes (default: annotation_dir)')
+    parser.add_argument('--class_names', default='',
+                        help='YOLO only: file with one class name per line (default: annotation_dir/classes.txt)')
+    parser.add_argument('--output_path', default='airplane_labels.csv', help='Path to output csv or label store')
+    parser.add_argument('--output_format', default='csv', choices=['csv', 'store'],
+                        help='Write a csv file, or a memory-mappable label store directory')
+    parser.add_argument('--num_workers', type=int, default=1,
+                        help='Number of parser processes (1 parses serially)')
+    parser.add_argument('--chunk_size', type=int, default=256,
+                        help='Number of annotation files handed to a worker at a time')
+    parser.add_argument('--index_path', default='',
+                        help='Cache parsed rows in this json index and only re-parse changed files')
+    parser.add_argument('--parser', default=DEFAULT_PARSER, choices=sorted(PARSERS),
+                        help='xml parser backend: etree is fastest, iterparse and lxml stream very large files '
+                             'in flat memory')
+    parser.add_argument('--box_policy', default=DEFAULT_POLICY, choices=POLICIES,
+                        help='Clip boxes sticking out of the image and drop other invalid boxes, drop all, or fail')
+    parser.add_argument('--validation_report', default='',
+                        help='Write the invalid boxes and what was done with them to this csv')
+    parser.add_argument('--stats_path', default='',
+                        help='Add the boxes of images not counted yet to this annotation_stats json state')
+    args = parser.parse_args(argv)
 
-def main():
-    image_path = os.path.join(os.getcwd(), 'annotations')
-    xml_df = xml_to_csv(image_path)
-    xml_df.to_csv('airplane_labels.csv', index=None)
-    print('Successfully converted xml to csv.')
+    if args.format != 'voc':
+        if args.index_path:
+            parser.error('--index_path only works with --format=voc')
+        # Imported here because annotation_readers itself imports this module.
+        from annotation_readers import read_annotations
+        xml_df = read_annotations(args.annotation_dir, args.format, num_workers=args.num_workers,
+                                  chunk_size=args.chunk_size, image_dir=args.image_dir or None,
+                                  class_names_path=args.class_names or None)
+    elif args.index_path:
+        xml_df, num_parsed = xml_to_csv_incremental(args.annotation_dir, args.index_path,
+                                                    num_workers=args.num_workers, chunk_size=args.chunk_size,
+                                                    parser=args.parser)
+        print('Parsed {} changed xml files.'.format(num_parsed))
+    else:
+        xml_df = xml_to_csv(args.annotation_dir, num_workers=args.num_workers, chunk_size=args.chunk_size,
+                            parser=args.parser)
+    xml_df, issues = validate_boxes(xml_df, args.box_policy)
+    print(summarize_issues(issues))
+    if args.validation_report:
+        issues.to_csv(args.validation_report, index=None)
+    if args.stats_path:
+        stats = update_stats_file(xml_df, args.stats_path)
+        print('Box statistics of {} images saved to {}.'.format(len(stats.image_boxes), args.stats_path))
+    if args.output_format == 'store':
+        write_label_store(xml_df, args.output_path)
+        print('Successfully converted {} annotations to a label store.'.format(args.format))
+    else:
+        xml_df.to_csv(args.output_path, index=None)
+        print('Successfully converted {} annotations to csv.'.format(args.format))
 
 
-main()
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,165 @@
+"""
+Usage:
+  # Stream the xml annotations straight into TFRecords, without an intermediate csv:
+  python xml_to_tfrecord.py --annotation_dir=annotations --image_dir=images --output_path=train.record
+
+  # Build the examples on 4 processes and write 10 shards:
+  python xml_to_tfrecord.py --annotation_dir=annotations --image_dir=images --output_path=train.record \
+    --num_workers=4 --num_shards=10
+"""
+from __future__ import division
+from __future__ import print_function
+from __future__ import absolute_import
+
+import os
+import glob
+import queue
+import argparse
+import threading
+import multiprocessing
+
+import numpy as np
+import pandas as pd
+
+from generate_tfrecord import GroupData, add_example_arguments, bounded_imap, example_options_from_args, publish, \
+    serialize_example, serialize_examples, shard_path, temporary_path
+from label_map import LabelMap
+from tfrecord_io import open_writer
+from validate_labels import POLICIES, DEFAULT_POLICY, column_name, has_invalid_boxes, summarize_issues, \
+    validate_boxes
+from xml_to_csv import parse_xml
+
+_END = object()
+
+
+def iter_annotation_groups(annotation_dir, box_policy=DEFAULT_POLICY, issues=None):
+    """Yield one GroupData of column arrays per xml file, parsing files lazily.
+
+    The boxes of every file are checked with `validate_boxes` and `box_policy`;
+    the issues found are appended to the `issues` list. Files left without
+    boxes are skipped.
+    """
+    for xml_file in glob.iglob(os.path.join(annotation_dir, '*.xml')):
+        rows = parse_xml(xml_file)
+        if not rows:
+            continue
+        columns = dict((name, np.asarray(values)) for name, values in zip(column_name, zip(*rows)))
+        if has_invalid_boxes(columns):
+            valid, file_issues = validate_boxes(pd.DataFrame(columns, columns=column_name), box_policy)
+            if issues is not None:
+                issues.append(file_issues)
+            if not len(valid):
+                continue
+            columns = dict((name, np.asarray(valid[name].tolist())) for name in column_name)
+        yield GroupData(rows[0][0], columns)
+
+
+def buffered(iterable, queue_size):
+    """Run `iterable` on a background thread, at most `queue_size` items ahead of the consumer."""
+    items = queue.Queue(maxsize=queue_size)
+    failure = []
+
+    def produce():
+        try:
+            for item in iterable:
+                items.put(item)
+        except Exception as error:
+            failure.append(error)
+        finally:
+            items.put(_END)
+
+    producer = threading.Thread(target=produce)
+    producer.daemon = True
+    producer.start()
+    while True:
+        item = items.get()
+        if item is _END:
+            break
+        yield item
+    producer.join()
+    if failure:
+        raise failure[0]
+
+
+def _serialize(args):
+    group, path, example_options = args
+    return serialize_example(group, path, **example_options)
+
+
+def stream_records(annotation_dir, path, output_path, num_shards=1, num_workers=1, queue_size=64,
+                   example_options=None, num_prefetch=0, box_policy=DEFAULT_POLICY, issues=None):
+    """Parse, build and write the examples of `annotation_dir` as a bounded pipeline.
+
+    Xml files are parsed on a producer thread, examples are built on the
+    calling thread or on `num_workers` processes, and the i-th example is
+    written to shard i % num_shards as soon as it is ready. At most
+    `queue_size` items wait between two stages, so memory does not grow with
+    the dataset. Without workers, `num_prefetch` image reads are kept in
+    flight. Boxes are validated while parsing, see `iter_annotation_groups`.
+    Files are written under a temporary name and only renamed to their final
+    name once every example is written. Returns the number of examples
+    written.
+    """
+    example_options = example_options or {}
+    groups = buffered(iter_annotation_groups(annotation_dir, box_policy, issues), queue_size)
+    if num_shards > 1:
+        output_paths = [shard_path(output_path, shard, num_shards) for shard in range(num_shards)]
+    else:
+        output_paths = [output_path]
+    tmp_paths = [temporary_path(shard_output) for shard_output in output_paths]
+    writers = [open_writer(tmp_path) for tmp_path in tmp_paths]
+    pool = multiprocessing.Pool(num_workers) if num_workers > 1 else None
+    try:
+        if pool is not None:
+            tasks = ((group, path, example_options) for group in groups)
+            serialized_examples = bounded_imap(pool, _serialize, tasks, queue_size)
+        else:
+            serialized_examples = serialize_examples(groups, path, example_options, num_prefetch)
+        count = 0
+        for serialized in serialized_examples:
+            writers[count % len(writers)].write(serialized)
+            count += 1
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+        for writer in writers:
+            writer.close()
+    for tmp_path, shard_output in zip(tmp_paths, output_paths):
+        publish(tmp_path, shard_output)
+    return count
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Stream PASCAL VOC xml files and their images into TFRecords.')
+    parser.add_argument('--annotation_dir', default='', help='Directory containing the PASCAL VOC xml files')
+    add_example_arguments(parser)
+    parser.add_argument('--queue_size', type=int, default=64,
+                        help='Maximum number of items buffered between two pipeline stages')
+    parser.add_argument('--box_policy', default=DEFAULT_POLICY, choices=POLICIES,
+                        help='Clip boxes sticking out of the image and drop other invalid boxes, drop all, or fail')
+    parser.add_argument('--validation_report', default='',
+                        help='Write the invalid boxes and what was done with them to this csv')
+    args = parser.parse_args(argv)
+    if args.prefetch and args.num_workers > 1:
+        # Worker processes build one example per task and do not prefetch.
+        parser.error('--prefetch only works with --num_workers=1')
+
+    label_map = LabelMap.from_file(args.label_map_path, case_sensitive=args.case_sensitive_labels)
+    example_options = example_options_from_args(args, label_map)
+    issues = []
+    count = stream_records(args.annotation_dir, args.image_dir, args.output_path,
+                           num_shards=args.num_shards, num_workers=args.num_workers,
+                           queue_size=args.queue_size, example_options=example_options,
+                           num_prefetch=args.prefetch, box_policy=args.box_policy, issues=issues)
+    if issues:
+        issues = pd.concat(issues, ignore_index=True)
+        print(summarize_issues(issues))
+        if args.validation_report:
+            issues.to_csv(args.validation_report, index=None)
+    output_path = os.path.join(os.getcwd(), args.output_path)
+    print('Successfully created {} TFRecords: {}'.format(count, output_path))
+
+
+if __name__ == '__main__':
+    main()